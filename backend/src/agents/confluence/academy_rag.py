@@ -1,6 +1,8 @@
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from atlassian import Confluence
 from azure.core.credentials import AzureKeyCredential
@@ -13,15 +15,18 @@ from requests.auth import HTTPBasicAuth
 from semantic_kernel.functions import kernel_function
 
 from backend.src.agents.confluence.model.base import ConfluencePageModel
-from backend.src.mongodb.client import METADATA_STORE_CLIENT
+from backend.src.agents.confluence.rerank import Passage, Reranker
+from backend.src.embeddings.pipeline import EmbeddingPipeline
+from backend.src.mongodb.client import get_metadata_store
 from backend.src.utils.config import Settings
+from backend.src.utils.trace import annotate_span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ingestions")
 
 
 class ConfluenceIngestion:
-    def __init__(self, metadata_store=METADATA_STORE_CLIENT):
+    def __init__(self, metadata_store=None):
         self.auth = HTTPBasicAuth(
             Settings.CONFLUENCE_USERNAME, Settings.CONFLUENCE_API_KEY
         )
@@ -31,19 +36,25 @@ class ConfluenceIngestion:
             username=Settings.CONFLUENCE_USERNAME,
             password=Settings.CONFLUENCE_API_KEY,
         )
-        self.confluence_content = metadata_store.confluence_content
+        self.metadata_store = metadata_store or get_metadata_store()
         self.AZURE_SEARCH_SERVICE_ENDPOINT = (
             Settings.AZURE_SEARCH_SERVICE_ENDPOINT
         )
         self.AZURE_SEARCH_API_KEY = Settings.AZURE_SEARCH_API_KEY
 
-    def fetch_all_pages_from_db(self) -> List[Dict]:
+    async def afetch_all_pages_from_db(self) -> List[Dict]:
         """
-        Get all pages that have been retrieved from Confluence.
+        Stream the pages already retrieved from Confluence, keeping only the
+        fields needed to compare them with the remote ones.
         """
         logger.info("Fetching all pages from metadata store...")
-        pages = self.confluence_content.find({})
-        return pages
+        return [
+            page
+            async for page in self.metadata_store.iter_documents(
+                "confluence_content",
+                projection={"_id": 0, "page_id": 1, "last_update": 1},
+            )
+        ]
 
     def fetch_all_pages_from_source(
         self, space_key: str = "GDA", limit: int = 50
@@ -124,37 +135,6 @@ class ConfluenceIngestion:
 
         return pages_to_add, pages_to_update
 
-    def add_pages_to_local(self, pages_to_add: List[Dict]) -> None:
-        """
-        Add new pages to the metadata store.
-        """
-        logger.info("Adding new pages to metadata store...")
-        result = self.confluence_content.insert_many(pages_to_add)
-        if result:
-            logger.info(
-                f"Added {len(pages_to_add)} new pages to the metadata store."
-            )
-        else:
-            logger.error("Failed to add new pages to the metadata store.")
-
-    def update_pages_in_local(self, pages_to_update: List[Dict]) -> None:
-        """
-        Update existing pages in the metadata store.
-        """
-        logger.info("Updating existing pages in metadata store...")
-        for page in pages_to_update:
-            result = self.confluence_content.update_one(
-                {"page_id": page["page_id"]}, {"$set": page}
-            )
-            if result:
-                logger.info(
-                    f"Updated page {page['id']} in the metadata store."
-                )
-            else:
-                logger.error(
-                    f"Failed to update page {page['id']} in the metadata store."
-                )
-
     def index_data_in_azure(self, pages_to_index: List[Dict]) -> None:
         """
         Index the data in Azure Cognitive Search.
@@ -219,47 +199,76 @@ class ConfluenceIngestion:
 
         return search_client
 
-    def update_content_process(self):
+    async def aupdate_content_process(self):
         """
-        Update the content in the metadata store.
+        Update the content in the metadata store without blocking the event
+        loop: store I/O is awaited and the Confluence and Azure Search
+        clients, which are synchronous, run in worker threads. The changed
+        pages are embedded while they are indexed.
         """
         logger.info("Updating content in metadata store...")
-        local_pages = self.fetch_all_pages_from_db()
-        remote_pages = self.fetch_all_pages_from_source()
+        local_pages, remote_pages = await asyncio.gather(
+            self.afetch_all_pages_from_db(),
+            asyncio.to_thread(self.fetch_all_pages_from_source),
+        )
         pages_to_add, pages_to_update = self.comapre_remote_and_local_content(
             old_pages=local_pages,
             new_pages=remote_pages,
         )
-
-        (
-            self.add_pages_to_local(pages_to_add=pages_to_add)
-            if pages_to_add
-            else None
-        )
-        (
-            self.update_pages_in_local(pages_to_update=pages_to_update)
-            if pages_to_update
-            else None
+        written = await self.metadata_store.bulk_upsert(
+            "confluence_content",
+            pages_to_add + pages_to_update,
+            key="page_id",
         )
         logger.info(
-            f"""Added {len(pages_to_add)} new pages and\
-                updated {len(pages_to_update)} pages in the metadata store.
-            """
+            f"Wrote {written} pages ({len(pages_to_add)} new) in the "
+            "metadata store."
         )
-        search_client = self.index_data_in_azure(
-            pages_to_index=pages_to_add + pages_to_update
+        indexing = asyncio.to_thread(
+            self.index_data_in_azure,
+            pages_to_index=pages_to_add + pages_to_update,
         )
-        logger.info(
-            f"""Indexed {len(pages_to_add) + len(pages_to_update)} pages in Azure Search.
-            """
+        if not Settings.EMBEDDINGS_ENABLED:
+            return await indexing
+        # Only the changed pages are split again, and their unchanged
+        # passages are served by the embedding cache.
+        search_client, passages = await asyncio.gather(
+            indexing,
+            EmbeddingPipeline(metadata_store=self.metadata_store).embed_pages(
+                pages_to_add + pages_to_update
+            ),
         )
+        logger.info(f"Embedded the {passages} passages of the changed pages.")
         return search_client
 
 
 class SearchPlugin:
 
-    def __init__(self, search_client: SearchClient):
+    def __init__(
+        self,
+        search_client: SearchClient,
+        reranker: Optional[Reranker] = None,
+        candidates: int = Settings.RETRIEVAL_CANDIDATES,
+    ):
         self.search_client = search_client
+        self.reranker = reranker or Reranker()
+        self.candidates = candidates
+
+    def _retrieve(
+        self, query: str
+    ) -> Tuple[List[Dict], List[Passage], Dict[str, float]]:
+        """Search, then rerank, returning the timings of each stage."""
+        start = time.perf_counter()
+        results = list(
+            self.search_client.search(
+                query,
+                top=self.candidates,
+                select=["id", "title", "content"],
+            )
+        )
+        search_ms = (time.perf_counter() - start) * 1000
+        passages, timings = self.reranker.rerank(query, results)
+        return results, passages, {"search_ms": search_ms, **timings}
 
     @kernel_function(
         name="build_augmented_prompt",
@@ -278,14 +287,25 @@ class SearchPlugin:
 
     @kernel_function(
         name="retrieve_documents",
-        description="Retrieve documents from the Azure Search service.",
+        description=(
+            "Retrieve the passages of the internal Confluence pages most "
+            "relevant to a query, with the link of their page."
+        ),
     )
-    def get_retrieval_context(self, query: str) -> str:
-        results = self.search_client.search(
-            query,
-            top=2,
+    async def get_retrieval_context(self, query: str) -> str:
+        # The search client and the reranker are both blocking.
+        results, passages, timings = await asyncio.to_thread(
+            self._retrieve, query
+        )
+        annotate_span(**{stage: round(ms, 1) for stage, ms in timings.items()})
+        logger.info(
+            f"Retrieved {len(passages)} passages from {len(results)} pages: "
+            + ", ".join(f"{stage} {ms:.1f}" for stage, ms in timings.items())
+        )
+        return "\n\n".join(
+            f"Document: {passage.title}\n"
+            f"Link: {Settings.CONFLUENCE_URL}/pages/viewpage.action"
+            f"?pageId={passage.page_id}\n"
+            f"{passage.text}"
+            for passage in passages
         )
-        context_strings = []
-        for result in results:
-            context_strings.append(f"Document: {result['content']}")
-        return context_strings
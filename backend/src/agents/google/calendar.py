@@ -1,20 +1,58 @@
+import asyncio
 import logging
-import os
-import pickle
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from datetime import datetime, time, timedelta
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
-import dateparser
 import pytz
 from dateutil.tz import gettz
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from pydantic import BaseModel
 from semantic_kernel.functions import kernel_function
 
+from backend.src.agents.google.client_manager import (
+    AUTHORIZATION_REQUIRED, GoogleClientManager, get_google_client_manager)
+from backend.src.agents.google.date_normalizer import normalize_datetime
+from backend.src.agents.google.scheduler import (BusyIndex,
+                                                 SchedulingConstraints,
+                                                 place_sessions)
+
 logger = logging.getLogger(__name__)
 
+# Google Calendar accepts at most 50 calls in one batch request.
+BATCH_SIZE = 50
+# Long horizons are queried for free/busy in windows of this many days.
+FREEBUSY_WINDOW_DAYS = 60
+
+
+class StudySession(BaseModel):
+    summary: str
+    start_datetime: str
+    end_datetime: str
+    description: Optional[str] = None
+
+
+def to_iso(date_str: str, timezone: str) -> str:
+    return normalize_datetime(date_str, timezone).isoformat()
+
+
+def event_body(
+    summary: str,
+    start_datetime: str,
+    end_datetime: str,
+    timezone: str,
+    description: Optional[str] = None,
+) -> Dict[str, Any]:
+    event_data = {
+        "summary": summary,
+        "start": {"dateTime": to_iso(start_datetime, timezone),
+                  "timeZone": timezone},
+        "end": {"dateTime": to_iso(end_datetime, timezone),
+                "timeZone": timezone},
+    }
+    if description:
+        event_data["description"] = description
+    return event_data
+
 
 class GoogleCalendarPlugin:
     """
@@ -24,112 +62,160 @@ class GoogleCalendarPlugin:
 
     def __init__(
             self,
-            credentials_file: str = 'credentials.json',
-            token_file: str = 'token_calendar.pickle',
-            scopes: Optional[List[str]] = None):
+            client_manager: Optional[GoogleClientManager] = None):
         """
         Initializes the GoogleCalendarPlugin.
 
         Args:
-            credentials_file (str): Path to the Google API credentials JSON file.
-            token_file (str): Path to the file where authentication tokens will be stored.
-            scopes (list): List of OAuth scopes required for Calendar API access.
-                           Defaults to ['https://www.googleapis.com/auth/calendar']
-                           which allows read/write access to all calendars.
+            client_manager (GoogleClientManager): Provides the Calendar service
+                of the current user, with the scope
+                'https://www.googleapis.com/auth/calendar' which allows
+                read/write access to all calendars.
+                Defaults to the manager shared with the other Google plugins.
         """
-        self.credentials_file = credentials_file
-        self.token_file = token_file
-        # Using the broader calendar scope for both read and write
-        self.scopes = scopes if scopes else [
-            'https://www.googleapis.com/auth/calendar']
-        self.service = self._get_calendar_service()
-
-    def _get_calendar_service(self):
+        self.client_manager = client_manager or get_google_client_manager()
+
+    @property
+    def service(self):
         """
-        Authenticates with the Google Calendar API and returns a service object.
-        It handles token storage to avoid re-authentication on subsequent runs.
+        Calendar service of the user of the current request, None if they
+        have not granted access. Blocking: only used in worker threads.
         """
-        creds = None
-        if os.path.exists(self.token_file):
-            with open(self.token_file, 'rb') as token:
-                creds = pickle.load(token)
-
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                try:
-                    flow = InstalledAppFlow.from_client_secrets_file(
-                        self.credentials_file, self.scopes)
-                    creds = flow.run_local_server(port=0)
-                except FileNotFoundError:
-                    logger.info(
-                        f"Error: '{self.credentials_file}' not found. Please ensure your Google API credentials file is in the correct directory.")
-                    return None
-                except Exception as e:
-                    logger.info(
-                        f"An error occurred during authentication flow: {e}")
-                    return None
-            with open(self.token_file, 'wb') as token:
-                pickle.dump(creds, token)
-
-        try:
-            service = build('calendar', 'v3', credentials=creds)
-            logger.info(
-                "Google Calendar API service initialized successfully.")
-            return service
-        except HttpError as error:
-            logger.info(
-                f"An error occurred while initializing Calendar service: {error}")
-            return None
+        return self.client_manager.service('calendar', 'v3')
 
     @kernel_function(
         description="Creates a new calendar event.",
         name="CreateCalendarEvent"
     )
-    def create_event(
+    async def create_event(
         self,
         summary: str,
         start_datetime: str,
         end_datetime: str,
         timezone: str = "Europe/Paris"
     ) -> str:
+        if not await self.client_manager.aget_credentials():
+            return AUTHORIZATION_REQUIRED
+        event_data = event_body(
+            summary, start_datetime, end_datetime, timezone)
 
-        def to_iso(date_str: str, default_time: str) -> str:
-            parsed = dateparser.parse(
-                date_str,
-                settings={
-                    'TIMEZONE': timezone,
-                    'RETURN_AS_TIMEZONE_AWARE': True,
-                    'PREFER_DATES_FROM': 'future'
-                }
-            )
-            if not parsed:
-                raise ValueError(f"Could not parse date string: {date_str}")
-            return parsed.isoformat()
+        # The client is blocking: the request runs in a worker thread to keep
+        # the event loop free.
+        created_event = await asyncio.to_thread(
+            lambda: self.service.events().insert(
+                calendarId="primary", body=event_data).execute()
+        )
+        return f"Event '{created_event.get('summary')}' created on {created_event.get('start').get('dateTime')}"
+
+    @kernel_function(
+        description=(
+            "Schedules all the study sessions of a learning path in the "
+            "calendar at once. Use it instead of calling "
+            "CreateCalendarEvent for each session."
+        ),
+        name="CreateStudyPlan"
+    )
+    async def create_study_plan(
+        self,
+        sessions: Annotated[
+            List[StudySession],
+            "The study sessions, each with a summary, start and end "
+            "date/time and an optional description."
+        ],
+        timezone: str = "Europe/Paris",
+        calendar_id: str = 'primary',
+    ) -> List[Dict[str, Any]]:
+        """
+        Creates one calendar event per study session, sending the inserts
+        through the Google batch endpoint, up to 50 per round trip.
 
-        start_iso = to_iso(start_datetime, "start")
-        end_iso = to_iso(end_datetime, "end")
+        Args:
+            sessions (List[StudySession]): The sessions to schedule.
+            timezone (str): Timezone of the session dates.
+            calendar_id (str): The calendar to add the sessions to.
 
-        event_data = {
-            "summary": summary,
-            "start": {"dateTime": start_iso, "timeZone": timezone},
-            "end": {"dateTime": end_iso, "timeZone": timezone},
-        }
+        Returns:
+            List[Dict[str, Any]]: One result per session, in order, with its
+                                  'status' ('created' or 'error') and the
+                                  event 'id' and 'link' or the 'error'.
+        """
+        results = [
+            {'index': index, 'summary': session.summary}
+            for index, session in enumerate(sessions)
+        ]
+        if not await self.client_manager.aget_credentials():
+            logger.info("No calendar access. Cannot create study plan.")
+            for result in results:
+                result.update(status='error', error=AUTHORIZATION_REQUIRED)
+            return results
 
-        created_event = self.service.events().insert(
-            calendarId="primary", body=event_data).execute()
-        return f"Event '{created_event.get('summary')}' created on {created_event.get('start').get('dateTime')}"
+        bodies = {}
+        for index, session in enumerate(sessions):
+            try:
+                bodies[index] = event_body(
+                    session.summary,
+                    session.start_datetime,
+                    session.end_datetime,
+                    timezone,
+                    session.description,
+                )
+            except ValueError as e:
+                results[index].update(status='error', error=str(e))
+
+        await asyncio.to_thread(
+            self._insert_events, bodies, results, calendar_id)
+        created = sum(result.get('status') == 'created' for result in results)
+        logger.info(f"Study plan: {created}/{len(sessions)} events created.")
+        return results
+
+    def _insert_events(
+        self,
+        bodies: Dict[int, Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        calendar_id: str,
+    ) -> None:
+        """Insert events in batches, recording each outcome in results."""
+        service = self.service
+
+        def on_response(request_id, response, exception):
+            result = results[int(request_id)]
+            if exception is not None:
+                result.update(status='error', error=str(exception))
+            else:
+                result.update(
+                    status='created',
+                    id=response.get('id'),
+                    start_time=response.get('start', {}).get('dateTime'),
+                    link=response.get('htmlLink'),
+                )
+
+        items = list(bodies.items())
+        for offset in range(0, len(items), BATCH_SIZE):
+            chunk = items[offset:offset + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=on_response)
+            for index, body in chunk:
+                batch.add(
+                    service.events().insert(
+                        calendarId=calendar_id, body=body),
+                    request_id=str(index),
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.info(f"An error occurred while creating events: {e}")
+                for index, _ in chunk:
+                    results[index].setdefault('status', 'error')
+                    results[index].setdefault('error', str(e))
 
     @kernel_function(
         description="Retrieves calendar events within a specified time range.",
         name="ListCalendarEvents"
     )
-    def list_events(self,
-                    start_datetime_iso: str,
-                    end_datetime_iso: str,
-                    calendar_id: str = 'primary',
-                    max_results: int = 10) -> List[Dict[str, Any]]:
+    async def list_events(self,
+                          start_datetime_iso: str,
+                          end_datetime_iso: str,
+                          calendar_id: str = 'primary',
+                          max_results: int = 10) -> List[Dict[str, Any]]:
         """
         Retrieves a list of events from the specified Google Calendar within a given time range.
 
@@ -144,22 +230,24 @@ class GoogleCalendarPlugin:
         Returns:
             List[Dict[str, Any]]: A list of dictionaries, each representing an event with 'summary',
                                   'start_time', 'end_time', 'location', 'description', and 'id'.
-                                  Returns an empty list if no events are found or an error occurs.
+                                  Returns an empty list if no events are found or an error occurs,
+                                  and a single {'error'} entry if the user has not granted access.
         """
-        if not self.service:
-            logger.info(
-                "Calendar service not initialized. Cannot list events.")
-            return []
+        if not await self.client_manager.aget_credentials():
+            logger.info("No calendar access. Cannot list events.")
+            return [{'error': AUTHORIZATION_REQUIRED}]
 
         try:
-            events_result = self.service.events().list(
-                calendarId=calendar_id,
-                timeMin=start_datetime_iso,
-                timeMax=end_datetime_iso,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+            events_result = await asyncio.to_thread(
+                lambda: self.service.events().list(
+                    calendarId=calendar_id,
+                    timeMin=start_datetime_iso,
+                    timeMax=end_datetime_iso,
+                    maxResults=max_results,
+                    singleEvents=True,
+                    orderBy='startTime'
+                ).execute()
+            )
             events = events_result.get('items', [])
 
             if not events:
@@ -194,6 +282,120 @@ class GoogleCalendarPlugin:
             logger.info(f"An unexpected error occurred: {e}")
             return []
 
+    @kernel_function(
+        description=(
+            "Finds free slots in the calendar for the study sessions of a "
+            "learning path, within working hours and a daily limit. Pass "
+            "the result to CreateStudyPlan to book them."
+        ),
+        name="FindStudySlots"
+    )
+    async def find_study_slots(
+        self,
+        durations_minutes: Annotated[
+            List[int],
+            "Duration in minutes of each session, in the order to schedule "
+            "them, e.g. [60, 60, 90]."
+        ],
+        horizon_days: int = 28,
+        working_hours_start: str = "09:00",
+        working_hours_end: str = "18:00",
+        max_sessions_per_day: int = 1,
+        include_weekends: bool = False,
+        timezone: str = "Europe/Paris",
+        calendar_id: str = 'primary',
+    ) -> Dict[str, Any]:
+        """
+        Fetches free/busy once for the whole horizon and places the
+        sessions deterministically at the earliest free slots.
+
+        Args:
+            durations_minutes (List[int]): Duration of each session.
+            horizon_days (int): Number of days, from now, to search.
+            working_hours_start (str): Earliest session start, HH:MM.
+            working_hours_end (str): Latest session end, HH:MM.
+            max_sessions_per_day (int): Maximum sessions placed on one day.
+            include_weekends (bool): Whether sessions may fall on weekends.
+            timezone (str): Timezone of the working hours and results.
+            calendar_id (str): The calendar whose busy times are avoided.
+
+        Returns:
+            Dict[str, Any]: 'slots', a list of {'start_datetime',
+                            'end_datetime'} in ISO 8601, and 'unplaced', the
+                            number of sessions that did not fit.
+        """
+        constraints = SchedulingConstraints(
+            timezone=timezone,
+            day_start=time.fromisoformat(working_hours_start),
+            day_end=time.fromisoformat(working_hours_end),
+            working_days=frozenset(range(7 if include_weekends else 5)),
+            max_sessions_per_day=max_sessions_per_day,
+        )
+        # Sessions start on a quarter hour.
+        now = datetime.now(constraints.tz)
+        horizon_start = now.replace(second=0, microsecond=0) + timedelta(
+            minutes=15 - now.minute % 15)
+        horizon_end = horizon_start + timedelta(days=horizon_days)
+
+        try:
+            busy = await asyncio.to_thread(
+                self._fetch_busy, horizon_start, horizon_end, calendar_id)
+        except HttpError as error:
+            logger.info(f"An error occurred while querying free/busy: {error}")
+            return {'slots': [], 'unplaced': len(durations_minutes),
+                    'error': str(error)}
+        if busy is None:
+            return {'slots': [], 'unplaced': len(durations_minutes),
+                    'error': AUTHORIZATION_REQUIRED}
+
+        slots = place_sessions(
+            BusyIndex(busy),
+            [timedelta(minutes=minutes) for minutes in durations_minutes],
+            horizon_start,
+            horizon_end,
+            constraints,
+        )
+        return {
+            'slots': [
+                {'start_datetime': start.isoformat(),
+                 'end_datetime': end.isoformat()}
+                for start, end in slots
+            ],
+            'unplaced': len(durations_minutes) - len(slots),
+        }
+
+    def _fetch_busy(
+        self,
+        horizon_start: datetime,
+        horizon_end: datetime,
+        calendar_id: str,
+    ) -> Optional[List[Tuple[datetime, datetime]]]:
+        """Busy intervals of a calendar over the horizon, from free/busy."""
+        service = self.service
+        if not service:
+            logger.info(
+                "Calendar service not initialized. Cannot query free/busy.")
+            return None
+
+        busy = []
+        window_start = horizon_start
+        while window_start < horizon_end:
+            window_end = min(
+                horizon_end,
+                window_start + timedelta(days=FREEBUSY_WINDOW_DAYS))
+            response = service.freebusy().query(body={
+                'timeMin': window_start.isoformat(),
+                'timeMax': window_end.isoformat(),
+                'items': [{'id': calendar_id}],
+            }).execute()
+            for period in response['calendars'][calendar_id].get('busy', []):
+                busy.append((
+                    datetime.fromisoformat(period['start']),
+                    datetime.fromisoformat(period['end']),
+                ))
+            window_start = window_end
+        return busy
+
     def get_iso_datetime_for_today(self, time_of_day: str = "start"):
         """
         Returns the ISO 8601 datetime string for the start or end of today.
@@ -0,0 +1,278 @@
+"""
+Google API clients and per-user OAuth tokens.
+
+Grant a user access once, on a machine with a browser:
+    python -m backend.src.agents.google.client_manager <user_id>
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import google_auth_httplib2
+import httplib2
+import requests
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from backend.src.utils.config import Settings
+from backend.src.utils.request_context import current_user_id
+
+logger = logging.getLogger(__name__)
+
+# One consent covers every Google plugin of the agent.
+SCOPES = [
+    "https://www.googleapis.com/auth/gmail.modify",
+    "https://www.googleapis.com/auth/calendar",
+]
+# Returned to the model by the plugins when the user has no usable token.
+AUTHORIZATION_REQUIRED = (
+    "Google authorization required: the user has not granted access to "
+    "their Google account yet."
+)
+
+
+class GoogleClientManager:
+    """
+    Shared Google API clients for the Gmail and Calendar plugins.
+
+    - Discovery documents are the ones bundled with google-api-python-client
+      (static discovery), parsed once per API and reused for every service.
+    - Credentials are stored per user as JSON in ``token_directory`` and
+      refreshed by a background thread before they expire, so requests
+      never wait for a token refresh. Tokens are only created by
+      ``authorize``, outside of requests: a request of a user without
+      one, or of an anonymous user, gets no credentials.
+    - httplib2 is not thread-safe, so each thread gets its own authorized
+      transport per user, kept alive between calls to reuse connections.
+    """
+
+    def __init__(
+        self,
+        credentials_file: str = Settings.GOOGLE_CREDENTIALS_FILE,
+        token_directory: str = Settings.GOOGLE_TOKEN_DIRECTORY,
+        scopes: Optional[List[str]] = None,
+        refresh_margin: float = Settings.GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS,
+        refresh_interval: float = (
+            Settings.GOOGLE_TOKEN_REFRESH_INTERVAL_SECONDS
+        ),
+    ) -> None:
+        self.credentials_file = credentials_file
+        self.token_directory = token_directory
+        self.scopes = scopes or SCOPES
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.refresh_interval = refresh_interval
+        self._credentials: Dict[str, Credentials] = {}
+        self._documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._refresh_session = requests.Session()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def _resolve_user(self, user_id: Optional[str]) -> Optional[str]:
+        return user_id or current_user_id.get()
+
+    def _token_path(self, user_id: str) -> str:
+        safe_user_id = re.sub(r"[^A-Za-z0-9_.@-]", "_", user_id)
+        return os.path.join(self.token_directory, f"{safe_user_id}.json")
+
+    def _save(self, user_id: str, creds: Credentials) -> None:
+        os.makedirs(self.token_directory, exist_ok=True)
+        path = self._token_path(user_id)
+        with open(f"{path}.tmp", "w") as token:
+            token.write(creds.to_json())
+        os.replace(f"{path}.tmp", path)
+
+    def _needs_refresh(self, creds: Credentials) -> bool:
+        if not creds.refresh_token:
+            return False
+        if not creds.valid or creds.expiry is None:
+            return True
+        # google-auth keeps expiry as a naive UTC datetime.
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - self.refresh_margin <= now
+
+    def _refresh(self, user_id: str, creds: Credentials) -> None:
+        creds.refresh(Request(session=self._refresh_session))
+        self._save(user_id, creds)
+        logger.info(f"Refreshed Google credentials of {user_id}.")
+
+    def authorize(self, user_id: str) -> Optional[Credentials]:
+        """
+        Run the interactive OAuth flow for a user and store the token.
+
+        The flow opens a browser and waits for the consent, so it is never
+        run while serving a request.
+
+        Args:
+            user_id: The user granting access.
+
+        Returns:
+            The new credentials, or None if the flow could not complete.
+        """
+        try:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                self.credentials_file, self.scopes
+            )
+            creds = flow.run_local_server(port=0)
+        except FileNotFoundError:
+            logger.info(
+                f"Error: '{self.credentials_file}' not found. Please ensure"
+                " your Google API credentials file is in the correct"
+                " directory."
+            )
+            return None
+        except Exception as e:
+            logger.info(f"An error occurred during authentication flow: {e}")
+            return None
+        self._save(user_id, creds)
+        return creds
+
+    def get_credentials(self, user_id: Optional[str] = None):
+        """
+        Return the credentials of a user, loading them on first use.
+
+        Blocks on file I/O and, for expiring tokens, on the refresh: call
+        ``aget_credentials`` from the event loop.
+
+        Args:
+            user_id: The user, the one of the current request by default.
+
+        Returns:
+            Valid credentials, or None if the user is anonymous or has not
+            granted access with ``authorize``.
+        """
+        user_id = self._resolve_user(user_id)
+        if user_id is None:
+            return None
+        with self._lock:
+            creds = self._credentials.get(user_id)
+            if creds is None:
+                path = self._token_path(user_id)
+                if not os.path.exists(path):
+                    logger.info(
+                        f"Google authorization required for {user_id}."
+                    )
+                    return None
+                with open(path) as token:
+                    creds = Credentials.from_authorized_user_info(
+                        json.load(token), self.scopes
+                    )
+                self._credentials[user_id] = creds
+            if self._needs_refresh(creds):
+                try:
+                    self._refresh(user_id, creds)
+                except RefreshError as e:
+                    logger.info(f"Could not refresh token of {user_id}: {e}")
+                    del self._credentials[user_id]
+                    return None
+            self._start_refresher()
+        return creds
+
+    async def aget_credentials(self, user_id: Optional[str] = None):
+        """``get_credentials`` run in a worker thread."""
+        return await asyncio.to_thread(
+            self.get_credentials, self._resolve_user(user_id)
+        )
+
+    def service(self, api: str, version: str, user_id: Optional[str] = None):
+        """
+        Return a Google API service acting on behalf of a user.
+
+        Services are cached per thread and user, and share the thread's
+        authorized transport. Blocking like ``get_credentials``, so only
+        called from worker threads.
+
+        Args:
+            api: The API name, e.g. "gmail".
+            version: The API version, e.g. "v1".
+            user_id: The user, the one of the current request by default.
+
+        Returns:
+            The service resource, or None if the user has no credentials.
+        """
+        user_id = self._resolve_user(user_id)
+        creds = self.get_credentials(user_id)
+        if creds is None:
+            return None
+
+        services = self._local.__dict__.setdefault("services", {})
+        key = (user_id, api, version)
+        if key not in services:
+            transports = self._local.__dict__.setdefault("transports", {})
+            if user_id not in transports:
+                transports[user_id] = google_auth_httplib2.AuthorizedHttp(
+                    creds, http=httplib2.Http(timeout=30)
+                )
+            services[key] = build_from_document(
+                self._document(api, version), http=transports[user_id]
+            )
+        return services[key]
+
+    def _document(self, api: str, version: str) -> Dict[str, Any]:
+        if (api, version) not in self._documents:
+            self._documents[api, version] = json.loads(
+                get_static_doc(api, version)
+            )
+        return self._documents[api, version]
+
+    def _start_refresher(self) -> None:
+        if self._refresher is not None or not self.refresh_interval:
+            return
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="google-token-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            with self._lock:
+                expiring = [
+                    (user_id, creds)
+                    for user_id, creds in self._credentials.items()
+                    if self._needs_refresh(creds)
+                ]
+            for user_id, creds in expiring:
+                try:
+                    with self._lock:
+                        self._refresh(user_id, creds)
+                except Exception as e:
+                    logger.error(
+                        f"Background refresh failed for {user_id}: {e}"
+                    )
+
+    def close(self) -> None:
+        self._stop.set()
+        self._refresh_session.close()
+
+
+@lru_cache(maxsize=1)
+def get_google_client_manager() -> GoogleClientManager:
+    """Return the process-wide Google client manager."""
+    return GoogleClientManager()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Grant Google access.")
+    parser.add_argument("user_id", help="The user granting access.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if GoogleClientManager().authorize(args.user_id) is None:
+        raise SystemExit(1)
+    logger.info(f"Stored the Google token of {args.user_id}.")
+
+
+if __name__ == "__main__":
+    main()
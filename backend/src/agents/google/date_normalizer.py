@@ -0,0 +1,70 @@
+import logging
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from dateparser.date import DateDataParser
+from dateutil.tz import gettz
+
+from backend.src.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _parser(timezone: str) -> DateDataParser:
+    """
+    Parser of natural-language dates for a timezone, built once.
+
+    Restricting the languages skips dateparser's language detection, which
+    otherwise tries every locale it knows on each phrase it cannot parse.
+    """
+    return DateDataParser(
+        languages=Settings.DATE_PARSER_LANGUAGES,
+        settings={
+            "TIMEZONE": timezone,
+            "RETURN_AS_TIMEZONE_AWARE": True,
+            "PREFER_DATES_FROM": "future",
+        },
+    )
+
+
+@lru_cache(maxsize=1024)
+def _parse_phrase(text: str, timezone: str, minute: int) -> Optional[datetime]:
+    # ``minute`` only takes part in the cache key: relative phrases such as
+    # "tomorrow at 1pm" are resolved again once the minute has changed.
+    return _parser(timezone).get_date_data(text).date_obj
+
+
+def _parse_iso(text: str, timezone: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=gettz(timezone))
+    return parsed
+
+
+def normalize_datetime(text: str, timezone: str) -> datetime:
+    """
+    Parse a date/time given as ISO 8601 or in natural language.
+
+    Strict ISO 8601 is tried first; other phrases go through a
+    restricted-language dateparser, and their results are cached.
+
+    Args:
+        text: The date, e.g. "2025-06-01T14:00:00" or "tomorrow at 1pm".
+        timezone: Timezone of the dates that do not specify one.
+
+    Returns:
+        A timezone-aware datetime.
+    """
+    text = text.strip()
+    parsed = _parse_iso(text, timezone) or _parse_phrase(
+        text, timezone, int(time.time() // 60)
+    )
+    if parsed is None:
+        raise ValueError(f"Could not parse date string: {text}")
+    return parsed
@@ -1,78 +1,156 @@
+import asyncio
 import base64
+import contextvars
 import logging
+import mimetypes
 import os
-import pickle
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.header import Header
+from email.message import Message
 from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from email.policy import SMTP
+from email.utils import formataddr, getaddresses, parseaddr
+from typing import IO, Annotated, Any, Dict, List, Optional
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
 from semantic_kernel.functions import kernel_function
 
+from backend.src.agents.google.client_manager import (
+    AUTHORIZATION_REQUIRED, GoogleClientManager, get_google_client_manager)
+from backend.src.utils.config import Settings
+
 logger = logging.getLogger(__name__)
 
+# Gmail accepts up to 100 calls per batch but throttles large batches.
+BATCH_SIZE = 50
+# Resumable uploads are sent in chunks of this size (a multiple of 256 KiB).
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+# Bytes read per base64 line group: 57 bytes encode to one 76-char line.
+ENCODE_READ_SIZE = 57 * 1024
+# Attachments encoded in memory up to this size, then in a temporary file.
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+_send_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_send_pool() -> ThreadPoolExecutor:
+    global _send_pool
+    if _send_pool is None:
+        _send_pool = ThreadPoolExecutor(
+            max_workers=Settings.GMAIL_SEND_WORKERS,
+            thread_name_prefix='gmail-send',
+        )
+    return _send_pool
+
+
+def encode_attachment_part(file_path: str, boundary: str) -> IO[bytes]:
+    """
+    Write the MIME part of an attachment, base64-encoded while the file is
+    read in chunks, so the file is never loaded in memory at once.
+
+    Returns:
+        A spooled file positioned at its start.
+    """
+    filename = os.path.basename(file_path)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    # Message quotes the file name and encodes it as RFC 2231 if needed.
+    headers = Message()
+    headers.add_header('Content-Type', mimetype, name=filename)
+    headers['Content-Transfer-Encoding'] = 'base64'
+    headers.add_header('Content-Disposition', 'attachment', filename=filename)
+    part = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    part.write(f'--{boundary}\r\n'.encode())
+    part.write(headers.as_bytes(policy=SMTP))
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(ENCODE_READ_SIZE):
+            part.write(base64.encodebytes(chunk).replace(b'\n', b'\r\n'))
+    part.write(f'--{boundary}--\r\n'.encode())
+    part.seek(0)
+    return part
+
+
+def format_recipient(to: str) -> str:
+    """
+    Validate a recipient and format it for the To header.
+
+    Raises:
+        ValueError: If it contains line breaks, which would let it inject
+            headers, or is not a single email address.
+    """
+    if '\r' in to or '\n' in to:
+        raise ValueError(f"Invalid recipient: {to!r}")
+    addresses = getaddresses([to])
+    name, address = parseaddr(to)
+    if (
+        len(addresses) != 1
+        or '@' not in address
+        or any(c in address for c in ' ,;<>')
+    ):
+        raise ValueError(f"Invalid recipient: {to!r}")
+    return formataddr((name, address))
+
+
+def write_message(
+    out: IO[bytes],
+    to: str,
+    subject: str,
+    message_text: str,
+    boundary: str,
+    attachment_part: Optional[IO[bytes]] = None,
+) -> None:
+    """
+    Write an RFC 822 message to ``out``, copying the pre-encoded
+    attachment part, if any, by chunks.
+
+    Raises:
+        ValueError: If ``to`` is not a valid recipient.
+    """
+    subject = Header(subject, "utf-8").encode(linesep='\r\n')
+    out.write(
+        f'To: {format_recipient(to)}\r\n'
+        f'Subject: {subject}\r\n'
+        'MIME-Version: 1.0\r\n'
+        f'Content-Type: multipart/mixed; boundary="{boundary}"\r\n'
+        '\r\n'
+        f'--{boundary}\r\n'.encode()
+    )
+    out.write(MIMEText(message_text, 'plain', 'utf-8').as_bytes())
+    out.write(b'\r\n')
+    if attachment_part is None:
+        out.write(f'--{boundary}--\r\n'.encode())
+    else:
+        attachment_part.seek(0)
+        shutil.copyfileobj(attachment_part, out)
+
 
 class GmailPlugin:
-    def __init__(
-            self, credentials_file='credentials.json',
-            token_file='token_gmail.pickle', scopes=None):
+    def __init__(self, client_manager: Optional[GoogleClientManager] = None):
         """
         Initializes the GmailPlugin.
 
         Args:
-            credentials_file (str): Path to the Google API credentials JSON file.
-            token_file (str): Path to the file where authentication tokens will be stored.
-            scopes (list): List of OAuth scopes required for Gmail API access.
-                           Defaults to ['https://www.googleapis.com/auth/gmail.modify']
-                           which allows reading, writing, and deleting emails.
+            client_manager (GoogleClientManager): Provides the Gmail service of
+                the current user, with the scope
+                'https://www.googleapis.com/auth/gmail.modify' which allows
+                reading, writing, and deleting emails.
+                Defaults to the manager shared with the other Google plugins.
         """
-        self.credentials_file = credentials_file
-        self.token_file = token_file
-        self.scopes = scopes if scopes else [
-            'https://www.googleapis.com/auth/gmail.modify']
-        self.service = self._get_gmail_service()
+        self.client_manager = client_manager or get_google_client_manager()
         self.user_id = 'me'  # 'me' refers to the authenticated user
 
-    def _get_gmail_service(self):
+    @property
+    def service(self):
         """
-        Authenticates with the Gmail API and returns a service object.
-        It handles token storage to avoid re-authentication on subsequent runs.
+        Gmail service of the user of the current request, None if they have
+        not granted access. Blocking: only used in worker threads.
         """
-        creds = None
-        if os.path.exists(self.token_file):
-            with open(self.token_file, 'rb') as token:
-                creds = pickle.load(token)
-
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                try:
-                    flow = InstalledAppFlow.from_client_secrets_file(
-                        self.credentials_file, self.scopes)
-                    creds = flow.run_local_server(port=0)
-                except FileNotFoundError:
-                    logger.info(
-                        f"Error: '{self.credentials_file}' not found. Please ensure your Gmail API credentials file is in the correct directory.")
-                    return None
-                except Exception as e:
-                    logger.info(
-                        f"An error occurred during authentication flow: {e}")
-                    return None
-            with open(self.token_file, 'wb') as token:
-                pickle.dump(creds, token)
-
-        try:
-            service = build('gmail', 'v1', credentials=creds)
-            logger.info("Gmail API service initialized successfully.")
-            return service
-        except HttpError as error:
-            logger.info(
-                f"An error occurred while initializing Gmail service: {error}")
-            return None
+        return self.client_manager.service('gmail', 'v1')
 
     @kernel_function(
         name="create_message",
@@ -88,14 +166,10 @@ class GmailPlugin:
             message_text (str): The text of the email message.
 
         Returns:
-            dict: An object containing a base64url encoded email object, or None if service is not available.
+            dict: An object containing a base64url encoded email object.
         """
-        if not self.service:
-            logger.info(
-                "Gmail service not initialized. Cannot create message.")
-            return None
         message = MIMEText(message_text)
-        message['to'] = to
+        message['to'] = format_recipient(to)
         message['from'] = self.user_id  # Sender is the authenticated user
         message['subject'] = subject
         return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
@@ -115,14 +189,10 @@ class GmailPlugin:
             file_path (str): Path to the file to be attached.
 
         Returns:
-            dict: An object containing a base64url encoded email object, or None if service is not available.
+            dict: An object containing a base64url encoded email object, or None if the file cannot be attached.
         """
-        if not self.service:
-            logger.info(
-                "Gmail service not initialized. Cannot create message with attachment.")
-            return None
         message = MIMEMultipart()
-        message['to'] = to
+        message['to'] = format_recipient(to)
         message['from'] = self.user_id  # Sender is the authenticated user
         message['subject'] = subject
 
@@ -148,7 +218,7 @@ class GmailPlugin:
         name="send_email",
         description="Send an email message. The message must be created using create_message or create_message_with_attachment.",
     )
-    def send_email(self, message: dict) -> dict:
+    async def send_email(self, message: dict) -> dict:
         """
         Send an email message.
 
@@ -156,16 +226,200 @@ class GmailPlugin:
             message (dict): Message object to be sent (created by create_message or create_message_with_attachment).
 
         Returns:
-            dict: Sent Message object, or None if sending failed.
+            dict: Sent Message object, None if sending failed, or an
+                  {'error'} if the user has not granted access.
         """
-        if not self.service:
-            logger.info("Gmail service not initialized. Cannot send email.")
-            return None
+        if not await self.client_manager.aget_credentials():
+            logger.info("No Gmail access. Cannot send email.")
+            return {'error': AUTHORIZATION_REQUIRED}
         try:
-            sent_message = self.service.users().messages().send(
-                userId=self.user_id, body=message).execute()
+            sent_message = await asyncio.to_thread(
+                lambda: self.service.users().messages().send(
+                    userId=self.user_id, body=message).execute()
+            )
             logger.info(f"Message Id: {sent_message['id']} sent successfully!")
             return sent_message
         except HttpError as error:
             logger.info(f"An error occurred while sending message: {error}")
             return None
+
+    @kernel_function(
+        name="send_bulk_email",
+        description="Send the same email, optionally with an attachment, to many recipients at once, e.g. a learning path summary or a reminder to several learners. Returns the status of each recipient.",
+    )
+    async def send_bulk_email(
+        self,
+        recipients: Annotated[List[str], "Email addresses of the receivers."],
+        subject: str,
+        message_text: str,
+        file_path: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Send one message per recipient.
+
+        Messages without a large attachment go through the Gmail batch
+        endpoint, up to 50 per round trip. Larger ones are streamed to the
+        resumable upload endpoint by a pool of worker threads, the
+        attachment being encoded once for all recipients.
+
+        Args:
+            recipients (List[str]): Email addresses of the receivers.
+            subject (str): Subject of the email.
+            message_text (str): The text of the email message.
+            file_path (str): Optional path to a file to attach.
+
+        Returns:
+            List[Dict[str, Any]]: One entry per recipient with its 'to',
+                                  'status' ('sent' or 'error') and the
+                                  message 'id' or the 'error'.
+        """
+        if not await self.client_manager.aget_credentials():
+            logger.info("No Gmail access. Cannot send email.")
+            return [
+                {'to': to, 'status': 'error', 'error': AUTHORIZATION_REQUIRED}
+                for to in recipients
+            ]
+        if file_path and not os.path.exists(file_path):
+            logger.info(f"Error: Attachment file not found at '{file_path}'.")
+            return [
+                {'to': to, 'status': 'error',
+                 'error': f"Attachment not found: {file_path}"}
+                for to in recipients
+            ]
+
+        results = [{'to': to} for to in recipients]
+        for result in results:
+            try:
+                format_recipient(result['to'])
+            except ValueError as e:
+                result.update(status='error', error=str(e))
+        pending = [result for result in results if 'status' not in result]
+        boundary = f'=={uuid.uuid4().hex}=='
+        attachment_part = None
+        try:
+            if file_path:
+                attachment_part = await asyncio.to_thread(
+                    encode_attachment_part, file_path, boundary)
+            if (
+                file_path
+                and os.path.getsize(file_path)
+                > Settings.GMAIL_RESUMABLE_THRESHOLD_BYTES
+            ):
+                await self._upload_messages(
+                    pending, subject, message_text, boundary, attachment_part)
+            else:
+                await asyncio.to_thread(
+                    contextvars.copy_context().run,
+                    self._send_batches,
+                    pending, subject, message_text, boundary, attachment_part,
+                )
+        finally:
+            if attachment_part is not None:
+                attachment_part.close()
+
+        sent = sum(result.get('status') == 'sent' for result in results)
+        logger.info(f"Bulk email: {sent}/{len(results)} messages sent.")
+        return results
+
+    def _send_batches(
+        self,
+        results: List[Dict[str, Any]],
+        subject: str,
+        message_text: str,
+        boundary: str,
+        attachment_part: Optional[IO[bytes]],
+    ) -> None:
+        """Send small messages through the batch endpoint."""
+        service = self.service
+
+        def on_response(request_id, response, exception):
+            result = results[int(request_id)]
+            if exception is not None:
+                result.update(status='error', error=str(exception))
+            else:
+                result.update(status='sent', id=response.get('id'))
+
+        indexed = list(enumerate(results))
+        for offset in range(0, len(indexed), BATCH_SIZE):
+            chunk = indexed[offset:offset + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=on_response)
+            for index, result in chunk:
+                with tempfile.SpooledTemporaryFile(
+                        max_size=SPOOL_MAX_SIZE) as message:
+                    write_message(
+                        message, result['to'], subject, message_text,
+                        boundary, attachment_part)
+                    message.seek(0)
+                    raw = base64.urlsafe_b64encode(message.read()).decode()
+                batch.add(
+                    service.users().messages().send(
+                        userId=self.user_id, body={'raw': raw}),
+                    request_id=str(index),
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.info(f"An error occurred while sending messages: {e}")
+                for _, result in chunk:
+                    result.setdefault('status', 'error')
+                    result.setdefault('error', str(e))
+
+    async def _upload_messages(
+        self,
+        results: List[Dict[str, Any]],
+        subject: str,
+        message_text: str,
+        boundary: str,
+        attachment_part: IO[bytes],
+    ) -> None:
+        """Stream large messages to the resumable upload endpoint."""
+        # Messages are only built once a worker can take them, to bound the
+        # number of copies. They all copy the shared attachment part, so
+        # its reads are serialised.
+        slots = asyncio.Semaphore(Settings.GMAIL_SEND_WORKERS)
+        lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+
+        async def upload(result: Dict[str, Any]) -> None:
+            async with slots:
+                await send(result)
+
+        async def send(result: Dict[str, Any]) -> None:
+            message = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            try:
+                async with lock:
+                    await asyncio.to_thread(
+                        write_message, message, result['to'], subject,
+                        message_text, boundary, attachment_part)
+                message.seek(0)
+                sent_message = await loop.run_in_executor(
+                    _get_send_pool(),
+                    contextvars.copy_context().run,
+                    self._upload_message,
+                    message,
+                )
+                result.update(status='sent', id=sent_message.get('id'))
+            except Exception as e:
+                logger.info(
+                    f"An error occurred while sending to {result['to']}: {e}")
+                result.update(status='error', error=str(e))
+            finally:
+                message.close()
+
+        await asyncio.gather(*(upload(result) for result in results))
+
+    def _upload_message(self, message: IO[bytes]) -> dict:
+        request = self.service.users().messages().send(
+            userId=self.user_id,
+            body={},
+            media_body=MediaIoBaseUpload(
+                message,
+                mimetype='message/rfc822',
+                chunksize=UPLOAD_CHUNK_SIZE,
+                resumable=True,
+            ),
+        )
+        response = None
+        while response is None:
+            _, response = request.next_chunk()
+        return response
@@ -0,0 +1,149 @@
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from dateutil.tz import gettz
+
+logger = logging.getLogger(__name__)
+
+Interval = Tuple[datetime, datetime]
+
+
+class BusyIndex:
+    """
+    Sorted, non-overlapping busy intervals of a calendar.
+
+    Overlapping and touching intervals are merged when the index is built,
+    so the earliest free start after any instant is found with one binary
+    search instead of a scan of the whole calendar.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]) -> None:
+        merged: List[List[datetime]] = []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def earliest_free(
+        self,
+        after: datetime,
+        duration: timedelta,
+        before: Optional[datetime] = None,
+    ) -> Optional[datetime]:
+        """
+        Return the earliest start, not before ``after``, of a free slot
+        lasting ``duration`` and ending by ``before``; None if there is
+        none.
+        """
+        candidate = after
+        # The interval starting last at or before the candidate may still
+        # be running.
+        index = bisect_right(self.starts, candidate) - 1
+        if index >= 0 and self.ends[index] > candidate:
+            candidate = self.ends[index]
+        index += 1
+        while (
+            index < len(self.starts)
+            and self.starts[index] < candidate + duration
+        ):
+            candidate = max(candidate, self.ends[index])
+            if before is not None and candidate + duration > before:
+                return None
+            index += 1
+        if before is not None and candidate + duration > before:
+            return None
+        return candidate
+
+
+@dataclass
+class SchedulingConstraints:
+    timezone: str = "Europe/Paris"
+    day_start: time = time(9, 0)
+    day_end: time = time(18, 0)
+    # Monday is 0, Sunday is 6.
+    working_days: FrozenSet[int] = frozenset(range(5))
+    max_sessions_per_day: int = 1
+    # Break kept between two sessions of the same day.
+    min_gap: timedelta = timedelta(minutes=15)
+    tz: tzinfo = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tz = gettz(self.timezone)
+        if self.tz is None:
+            raise ValueError(f"Unknown timezone: {self.timezone}")
+        if self.day_end <= self.day_start:
+            raise ValueError("The working day must end after it starts.")
+
+    def window(self, day: date) -> Optional[Interval]:
+        """Working hours of a day, None if it is not a working day."""
+        if day.weekday() not in self.working_days:
+            return None
+        return (
+            datetime.combine(day, self.day_start, tzinfo=self.tz),
+            datetime.combine(day, self.day_end, tzinfo=self.tz),
+        )
+
+
+def place_sessions(
+    busy: BusyIndex,
+    durations: List[timedelta],
+    horizon_start: datetime,
+    horizon_end: datetime,
+    constraints: SchedulingConstraints,
+) -> List[Interval]:
+    """
+    Greedily place sessions, in order, at the earliest free slots.
+
+    Each day takes at most ``max_sessions_per_day`` sessions within its
+    working hours. Every search is a binary search followed by a walk over
+    the busy intervals of that working day only, so months of dense
+    calendar cost about O((days + sessions) * log(busy intervals)).
+
+    Args:
+        busy: The busy intervals of the calendar.
+        durations: Duration of each session, in the order to schedule them.
+        horizon_start: No session starts earlier.
+        horizon_end: No session ends later.
+        constraints: Working hours, days, timezone and daily limit.
+
+    Returns:
+        The (start, end) of the sessions that could be placed, in order;
+        fewer than requested when the horizon is too busy.
+    """
+    placed: List[Interval] = []
+    day = horizon_start.astimezone(constraints.tz).date()
+    last_day = horizon_end.astimezone(constraints.tz).date()
+    while len(placed) < len(durations) and day <= last_day:
+        window = constraints.window(day)
+        day += timedelta(days=1)
+        if window is None:
+            continue
+        cursor = max(window[0], horizon_start)
+        window_end = min(window[1], horizon_end)
+        for _ in range(constraints.max_sessions_per_day):
+            if len(placed) == len(durations):
+                break
+            duration = durations[len(placed)]
+            start = busy.earliest_free(cursor, duration, before=window_end)
+            if start is None:
+                break
+            start = start.astimezone(constraints.tz)
+            placed.append((start, start + duration))
+            cursor = start + duration + constraints.min_gap
+    if len(placed) < len(durations):
+        logger.info(
+            f"Placed {len(placed)} of {len(durations)} sessions before "
+            f"{horizon_end.isoformat()}."
+        )
+    return placed
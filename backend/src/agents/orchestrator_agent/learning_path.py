@@ -0,0 +1,187 @@
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from semantic_kernel.functions import kernel_function
+
+from backend.src.utils.request_context import current_session
+
+logger = logging.getLogger(__name__)
+
+
+# Every field is required: structured outputs in strict mode reject
+# optional fields and defaults.
+class Resource(BaseModel):
+    title: str
+    url: str
+    # "confluence", "academy", "web", "book", "video"...
+    kind: str
+    internal: bool
+
+
+class Module(BaseModel):
+    title: str
+    description: str
+    duration_hours: float
+    # Titles of the earlier modules to complete first.
+    prerequisites: list[str]
+    resources: list[Resource]
+
+
+class LearningPath(BaseModel):
+    goal: str
+    summary: str
+    modules: list[Module]
+
+    @property
+    def total_hours(self) -> float:
+        return sum(module.duration_hours for module in self.modules)
+
+
+class PartialJSONParser:
+    """
+    Incremental parser of a JSON document received in chunks.
+
+    Each character is scanned once, keeping track of the open containers
+    and of the last position where the text can be cut and closed into
+    valid JSON: after a complete value, before a comma or after an opening
+    bracket. ``snapshot`` parses the text up to that position, so values
+    are only ever seen complete, never a half-received string or number.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[str] = []
+        self._length = 0
+        # Closing characters of the open containers, innermost last.
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key_expected = False
+        self._string_is_key = False
+        self._safe = 0
+        self._safe_closers = ""
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def _mark_safe(self, position: int) -> None:
+        self._safe = position
+        self._safe_closers = "".join(reversed(self._stack))
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Add a chunk of the document.
+
+        Returns:
+            Whether an object was completed within the chunk.
+        """
+        closed_object = False
+        for offset, char in enumerate(chunk):
+            position = self._length + offset
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if not self._string_is_key:
+                        self._mark_safe(position + 1)
+            elif char == '"':
+                self._in_string = True
+                self._string_is_key = (
+                    self._key_expected
+                    and bool(self._stack)
+                    and self._stack[-1] == "}"
+                )
+            elif char in "{[":
+                self._stack.append("}" if char == "{" else "]")
+                self._key_expected = char == "{"
+                self._mark_safe(position + 1)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                self._key_expected = False
+                self._mark_safe(position + 1)
+                closed_object = closed_object or char == "}"
+            elif char == ",":
+                self._mark_safe(position)
+                self._key_expected = bool(self._stack) and (
+                    self._stack[-1] == "}"
+                )
+            elif char == ":":
+                self._key_expected = False
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        return closed_object
+
+    def snapshot(self) -> Tuple[Any, int]:
+        """
+        Parse the complete part of the document received so far.
+
+        Returns:
+            The value, None before anything complete was received, and the
+            number of containers still open around its last element.
+        """
+        if not self._safe:
+            return None, 0
+        closed = self.text[: self._safe] + self._safe_closers
+        return json.loads(closed), len(self._safe_closers)
+
+
+class LearningPathStream:
+    """
+    Turns the streamed JSON of a learning path into the modules completed
+    so far, so they can be rendered before the whole path is generated.
+    """
+
+    def __init__(self) -> None:
+        self.parser = PartialJSONParser()
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Module]:
+        """Return the modules completed by this chunk, in order."""
+        if not self.parser.feed(chunk):
+            return []
+        partial, depth = self.parser.snapshot()
+        if not isinstance(partial, dict):
+            return []
+        modules = partial.get("modules") or []
+        # Deeper than the modules array means the last module is still
+        # being generated.
+        complete = len(modules) - 1 if depth > 2 else len(modules)
+        ready = []
+        for data in modules[self.emitted : complete]:
+            try:
+                ready.append(Module.model_validate(data))
+            except ValidationError as e:
+                logger.warning(f"Skipping invalid learning path module: {e}")
+        self.emitted = max(self.emitted, complete)
+        return ready
+
+    def result(self) -> LearningPath:
+        """Validate the whole document once the stream has ended."""
+        return LearningPath.model_validate_json(self.parser.text)
+
+
+class LearningPathPlugin:
+    """Gives the tools access to the learning path of the session."""
+
+    @kernel_function(
+        name="GetLearningPath",
+        description=(
+            "Return the learning path generated in this conversation, with "
+            "its modules, their durations in hours, prerequisites and "
+            "resources. Use it to schedule study sessions or to email the "
+            "path instead of writing the path again."
+        ),
+    )
+    def get_learning_path(self) -> str:
+        path: Optional[LearningPath] = getattr(
+            current_session.get(), "learning_path", None
+        )
+        if path is None:
+            return "No learning path has been generated in this session."
+        return path.model_dump_json()
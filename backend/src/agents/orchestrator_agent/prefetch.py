@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import re
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import (Any, AsyncIterator, Awaitable, Callable, Collection, Dict,
+                    List, Optional)
+
+from semantic_kernel import Kernel
+from semantic_kernel.exceptions import (KernelFunctionNotFoundError,
+                                        KernelPluginNotFoundError)
+from semantic_kernel.filters import FunctionInvocationContext
+from semantic_kernel.functions import FunctionResult, KernelArguments
+
+from backend.src.utils.keywords import tokenize
+from backend.src.utils.request_context import current_prefetch
+from backend.src.utils.trace import annotate_span, trace_span
+
+logger = logging.getLogger(__name__)
+
+# A learning intent followed by its subject, e.g. "a learning path for
+# data science" or "how do I become a data engineer".
+LEARNING_INTENT = re.compile(
+    r"\b(?:learn(?:ing)?(?:\s+paths?)?|stud(?:y|ying)|master(?:ing)?|"
+    r"get(?:ting)?\s+(?:started|better)|become|roadmap|upskill(?:ing)?|"
+    r"training|courses?|apprendre|formation)\b"
+    r"(?:\s+(?:about|on|in|into|for|to|with|at|of|an?|the|some|more|sur|"
+    r"en|de|la|le|les|des|un|une))*"
+    r"\s+(?P<topic>[^.?!,;:\n]+)",
+    re.IGNORECASE,
+)
+# Words ending the subject: deadlines, motives, requests about the answer,
+# and the conjunctions and verbs of a second clause.
+TOPIC_END = re.compile(
+    r"\s+(?:because|since|so|as|and|but|then|before|by|within|until|"
+    r"for my|for a|for the|in \d+|in (?:a|one|two|three|six) |next|this|"
+    r"please|with (?:a|my)|want|need|would|could|should|will|"
+    r"pour|afin|avant|en \d+|et)\b.*$",
+    re.IGNORECASE,
+)
+# Words a subject does not start with: "what training do you recommend"
+# asks for advice, it does not name a topic.
+NOT_TOPIC_START = re.compile(
+    r"^(?:do|does|did|you|would|could|should|can|will|is|are|i|we|it|"
+    r"that|which|me|us)\b",
+    re.IGNORECASE,
+)
+MAX_TOPIC_WORDS = 6
+# Keywords about the schedule or the answer, not a subject to learn.
+NON_TOPIC_TERMS = {
+    "session", "plan", "slot", "schedule", "time", "hour", "day", "week",
+    "month", "year", "last", "next", "today", "tomorrow", "module",
+    "resource", "path", "link", "more", "that", "them", "recommend",
+    "suggest", "send", "need", "would", "should", "could", "will",
+}
+
+
+def extract_topic(message: str) -> Optional[str]:
+    """
+    Subject of a learning request, found with a few patterns rather than a
+    model call, or None when the message does not ask to learn something.
+    """
+    match = None
+    for match in LEARNING_INTENT.finditer(message or ""):
+        pass
+    if match is None:
+        return None
+    topic = match["topic"]
+    # "a roadmap to learn React": the subject follows the last intent.
+    while (inner := LEARNING_INTENT.match(topic)) is not None:
+        topic = inner["topic"]
+    topic = " ".join(TOPIC_END.sub("", topic).split()[:MAX_TOPIC_WORDS])
+    if NOT_TOPIC_START.match(topic):
+        return None
+    terms = set(tokenize(topic))
+    return topic if terms and not terms <= NON_TOPIC_TERMS else None
+
+
+def overlap(topic: str, query: str) -> float:
+    """Share of the keywords of the topic that the query contains."""
+    terms = set(tokenize(topic))
+    if not terms:
+        return 0.0
+    return len(terms & set(tokenize(query))) / len(terms)
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # Failures of calls the model never asked for are not worth a warning.
+    if not task.cancelled():
+        task.exception()
+
+
+class PrefetchBatch:
+    """The prefetched calls of one request, each served at most once."""
+
+    def __init__(self, topic: str, tasks: Dict[str, asyncio.Task]) -> None:
+        self.topic = topic
+        self.tasks = tasks
+        self.served: List[str] = []
+
+    def take(self, name: str) -> Optional[asyncio.Task]:
+        task = self.tasks.pop(name, None)
+        if task is not None:
+            self.served.append(name)
+        return task
+
+    def cancel(self) -> List[str]:
+        """Cancel the calls the model did not ask for, returning them."""
+        for task in self.tasks.values():
+            task.cancel()
+        wasted = list(self.tasks)
+        self.tasks.clear()
+        return wasted
+
+
+class Prefetcher:
+    """
+    Speculatively calls the retrieval functions of a learning request.
+
+    When a message asks to learn a topic, the functions are called with
+    the topic as query while the Host makes its first completion, and the
+    function filter answers the calls the model then makes on the same
+    topic from these results, saving their round trip.
+
+    Args:
+        kernel: The Host kernel, whose filters also apply to the
+            prefetched calls.
+        functions: Fully qualified names, plugin-function, of functions
+            taking a ``query``.
+        min_overlap: Share of the topic keywords the model's query must
+            contain to be served the prefetched result.
+    """
+
+    def __init__(
+        self,
+        kernel: Kernel,
+        functions: Collection[str],
+        min_overlap: float = 0.5,
+    ) -> None:
+        self.kernel = kernel
+        self.functions = []
+        for name in functions:
+            plugin_name, function_name = name.split("-", 1)
+            try:
+                function = kernel.get_function(plugin_name, function_name)
+            except (KernelPluginNotFoundError, KernelFunctionNotFoundError):
+                logger.warning(f"Cannot prefetch unknown function {name}.")
+                continue
+            if "query" not in {p.name for p in function.parameters}:
+                logger.warning(f"Cannot prefetch {name}: no query parameter.")
+                continue
+            self.functions.append(name)
+        self.min_overlap = min_overlap
+        self.stats: Counter = Counter()
+
+    async def _call(self, name: str, topic: str) -> Any:
+        plugin_name, function_name = name.split("-", 1)
+        with trace_span("prefetch", name, input_preview=topic):
+            result = await self.kernel.invoke(
+                plugin_name=plugin_name,
+                function_name=function_name,
+                arguments=KernelArguments(query=topic),
+            )
+        return result.value if result is not None else None
+
+    def start(
+        self, message: str, allowed: Optional[Collection[str]] = None
+    ) -> Optional[PrefetchBatch]:
+        """
+        Start the calls for the topic of a message, if it has one.
+
+        Args:
+            allowed: Functions advertised to the model for the turn, None
+                for all of them.
+        """
+        topic = extract_topic(message)
+        functions = [
+            name
+            for name in self.functions
+            if allowed is None or name in allowed
+        ]
+        if topic is None or not functions:
+            return None
+        self.stats["batches"] += 1
+        self.stats["started"] += len(functions)
+        logger.info(f"Prefetching {', '.join(functions)} for {topic!r}.")
+        tasks = {}
+        for name in functions:
+            tasks[name] = asyncio.create_task(self._call(name, topic))
+            tasks[name].add_done_callback(_retrieve_exception)
+        return PrefetchBatch(topic, tasks)
+
+    @asynccontextmanager
+    async def run(
+        self, message: str, allowed: Optional[Collection[str]] = None
+    ) -> AsyncIterator[Optional[PrefetchBatch]]:
+        """Prefetch for the request run in the context."""
+        # The calls start before the batch is current, so they do not
+        # serve themselves.
+        batch = self.start(message, allowed)
+        current_prefetch.set(batch)
+        try:
+            yield batch
+        finally:
+            current_prefetch.set(None)
+            if batch is not None:
+                wasted = batch.cancel()
+                self.stats["wasted"] += len(wasted)
+                logger.info(
+                    f"Prefetch for {batch.topic!r}: served "
+                    f"{batch.served or 'nothing'}, wasted {wasted or 'nothing'}."
+                )
+
+    async def function_filter(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        """
+        function_invocation filter answering the model from the prefetched
+        calls of the request when it asks about the same topic.
+        """
+        batch = current_prefetch.get()
+        name = f"{context.function.plugin_name}-{context.function.name}"
+        if batch is None or name not in batch.tasks:
+            await next(context)
+            return
+        query = str(context.arguments.get("query") or "")
+        if overlap(batch.topic, query) < self.min_overlap:
+            self.stats["missed"] += 1
+            await next(context)
+            return
+
+        task = batch.take(name)
+        try:
+            value = await task
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Prefetched {name} failed, calling it: {e!r}")
+            await next(context)
+            return
+        self.stats["served"] += 1
+        annotate_span(prefetched=True, prefetch_topic=batch.topic)
+        context.result = FunctionResult(
+            function=context.function.metadata, value=value
+        )
@@ -1,35 +1,52 @@
+import asyncio
 import json
 import logging
 import os
+import time
+import uuid
 from collections.abc import AsyncIterable
-from typing import Awaitable, Callable, Optional
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import ValidationError
 from semantic_kernel import Kernel
 from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from semantic_kernel.connectors.ai.chat_completion_client_base import \
+    ChatCompletionClientBase
 from semantic_kernel.connectors.ai.function_choice_behavior import \
     FunctionChoiceBehavior
-from semantic_kernel.connectors.ai.open_ai import (
-    AzureChatCompletion, OpenAIChatPromptExecutionSettings)
-from semantic_kernel.connectors.mcp import MCPStdioPlugin
-from semantic_kernel.contents import FunctionCallContent, FunctionResultContent
+from semantic_kernel.connectors.ai.prompt_execution_settings import \
+    PromptExecutionSettings
+from semantic_kernel.contents import (AuthorRole, ChatHistory,
+                                      FunctionCallContent,
+                                      FunctionResultContent)
 from semantic_kernel.contents.chat_message_content import ChatMessageContent
 from semantic_kernel.contents.streaming_chat_message_content import \
     StreamingChatMessageContent
 from semantic_kernel.filters import FunctionInvocationContext
 from semantic_kernel.functions.kernel_arguments import KernelArguments
 
-from backend.src.agents.bing_seach.bing_search_agent import BingSearch
 from backend.src.agents.bing_seach.search_prompt_instructions import \
     PROMPT as WEB_SEARCH_PROMPT
-from backend.src.agents.confluence.academy_rag import (ConfluenceIngestion,
-                                                       SearchPlugin)
-from backend.src.agents.google.calendar import GoogleCalendarPlugin
-from backend.src.agents.google.gmail import GmailPlugin
 from backend.src.agents.orchestrator_agent.instructions_system import \
     GLOBAL_PROMPT
+from backend.src.agents.orchestrator_agent.learning_path import (
+    LearningPath, LearningPathPlugin, LearningPathStream)
+from backend.src.agents.orchestrator_agent.prefetch import Prefetcher
+from backend.src.agents.orchestrator_agent.session_state import (SessionState,
+                                                                 SessionStore)
+from backend.src.agents.orchestrator_agent.tool_router import ToolRouter
+from backend.src.agents.profile_builder.profile import (Profile,
+                                                        ProfilePlugin,
+                                                        ProfileStore)
 from backend.src.agents.profile_builder.profile_builder_instructions import \
     PROMPT as PROFILE_BUILDER_PROMPT
+from backend.src.llm.routing import (FAST, LARGE, PROFILE_ROUTE,
+                                     RoutedChatCompletion)
+from backend.src.utils.config import Settings
+from backend.src.utils.request_context import (current_session, current_trace,
+                                               current_user_id)
+from backend.src.utils.trace import RequestTrace, trace_filter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,36 +60,130 @@ CONFLUENCE_USERNAME = os.getenv("CONFLUENCE_USERNAME")
 CONFLUENCE_API_KEY = os.getenv("CONFLUENCE_API_KEY")
 
 SERVICE_ID = "agent"
-
-
-class Profile(BaseModel):
-    current_position: str
-    target_role: str
-    learning_obstacles: str
-    time_limit: str
-    preferred_learning_style: list[str]
+PROFILE_SERVICE_ID = "profile_builder"
+PROFILE_BUILDER_PLUGIN = "Profile_Builder_Agent"
+# Argument carrying the learner profile of the turn to the Host agent.
+LEARNER_PROFILE = "learner_profile"
+# Formatted once: the start of every Host prompt, shared by all sessions.
+HOST_INSTRUCTIONS = GLOBAL_PROMPT.format(WEB_SEARCH_PROMPT=WEB_SEARCH_PROMPT)
+
+
+class HostAgent(ChatCompletionAgent):
+    """
+    Chat completion agent adding the learner profile, when known, as a
+    system message right after its instructions.
+
+    Its prompts are laid out for the provider's prompt cache: the
+    instructions and the tool definitions, the same bytes for every
+    session, then the profile and the conversation, which only grow
+    within a session.
+    """
+
+    async def format_instructions(
+        self, kernel: Kernel, arguments: Optional[KernelArguments] = None
+    ) -> Optional[str]:
+        # Sent as they are rather than rendered as a template with the
+        # arguments of the turn, which could change them from one turn to
+        # the next.
+        return self.instructions
+
+    async def _prepare_agent_chat_history(
+        self, history: ChatHistory, kernel: Kernel, arguments: KernelArguments
+    ) -> ChatHistory:
+        chat_history = await super()._prepare_agent_chat_history(
+            history, kernel, arguments
+        )
+        profile = arguments.get(LEARNER_PROFILE)
+        if profile:
+            chat_history.messages.insert(
+                1 if self.instructions else 0,
+                ChatMessageContent(role=AuthorRole.SYSTEM, content=profile),
+            )
+        return chat_history
+
+
+class SessionThread(ChatHistoryAgentThread):
+    """
+    Agent thread appending the messages of a turn to the chat history of
+    a session state in place.
+
+    ChatHistoryAgentThread replaces an empty chat history, which is falsy,
+    by a new one, so the first turn of a session would never be kept.
+    """
+
+    def __init__(self, state: SessionState) -> None:
+        super().__init__(
+            chat_history=state.chat_history, thread_id=state.session_id
+        )
+        self._chat_history = state.chat_history
+
+
+def _create_chat_completion(deployment_name: Optional[str], service_id: str):
+    """
+    Service calling a deployment, through the cassette when one is set.
+    """
+    # The OpenAI connectors load the realtime and Azure identity clients,
+    # so they are imported with the first kernel rather than at startup.
+    from backend.src.llm.cassette import (CassetteChatCompletion,
+                                          get_cassette)
+    from backend.src.llm.chat_completion import \
+        RateLimitedAzureChatCompletion
+
+    cassette = get_cassette()
+    service = None
+    if cassette is None or cassette.mode != "replay":
+        service = RateLimitedAzureChatCompletion(
+            service_id=service_id,
+            api_key=AZURE_AI_INFERENCE_API_KEY,
+            deployment_name=deployment_name,
+            endpoint=AZURE_AI_INFERENCE_ENDPOINT,
+        )
+    if cassette is not None:
+        service = CassetteChatCompletion(
+            service_id=service_id,
+            ai_model_id=deployment_name or service_id,
+            cassette=cassette,
+            inner=service,
+        )
+    return service
 
 
 def _create_kernel_with_chat_completion(
+    services: Dict[str, ChatCompletionClientBase],
     service_id: str = SERVICE_ID,
 ) -> Kernel:
+    """
+    Kernel whose ``service_id`` service routes the Host calls to the fast
+    or the large deployment, and whose PROFILE_SERVICE_ID one sends the
+    Profile Builder calls to the deployment of the profile route.
+
+    Args:
+        services: Service of each tier, "fast" and "large".
+    """
     kernel = Kernel()
-    kernel.add_service(
-        AzureChatCompletion(
-            service_id=service_id,
-            api_key=AZURE_AI_INFERENCE_API_KEY,
-            deployment_name=API_DEPLOYMENT_NAME,
-            endpoint=AZURE_AI_INFERENCE_ENDPOINT,
+    for routed_service_id, route in (
+        (service_id, None),
+        (PROFILE_SERVICE_ID, PROFILE_ROUTE),
+    ):
+        kernel.add_service(
+            RoutedChatCompletion(
+                service_id=routed_service_id,
+                ai_model_id=API_DEPLOYMENT_NAME or routed_service_id,
+                services=services,
+                rules=Settings.MODEL_ROUTES,
+                route=route,
+            )
         )
-    )
     return kernel
 
 
-intermediate_steps: list[ChatMessageContent] = []
-
-
-async def handle_intermediate_steps(message: ChatMessageContent) -> None:
-    intermediate_steps.append(message)
+def _included_functions(arguments: KernelArguments) -> Optional[List[str]]:
+    """Functions the settings of a turn restrict the model to, None if all."""
+    for settings in (arguments.execution_settings or {}).values():
+        behavior = settings.function_choice_behavior
+        if behavior is not None and behavior.filters:
+            return behavior.filters.get("included_functions")
+    return None
 
 
 async def logger_filter(
@@ -91,26 +202,116 @@ async def logger_filter(
 
 
 class ChatAgentHandler:
-    def __init__(self, user_id: str):
+    def __init__(
+        self,
+        user_id: str,
+        session_store: Optional[SessionStore] = None,
+        profile_store: Optional[ProfileStore] = None,
+    ):
         self.user_id = user_id
         self.agent = None
-        self.thread: Optional[ChatHistoryAgentThread] = None
+        # Conversation state lives in the session store, so the handler can
+        # be shared by every request and any worker can resume a session.
+        self.sessions = session_store or SessionStore()
+        self.profiles = profile_store or ProfileStore()
+        self.default_session_id = f"session_{uuid.uuid4().hex}"
         self.initialized = False
+        # Requests arriving before the agent is ready wait for the first
+        # one to build it rather than each ingesting the content again.
+        self._initialise_lock = asyncio.Lock()
         self.confluence_plugin = None
-        self.intermediate_streaming_steps: list[ChatMessageContent] = []
-
-    async def handle_streaming_intermediate_steps(
-        self, message: ChatMessageContent
-    ) -> None:
-        self.intermediate_streaming_steps.append(message.items)
+        self.host_settings: Optional[PromptExecutionSettings] = None
+        self.tool_router: Optional[ToolRouter] = None
+        self.prefetcher: Optional[Prefetcher] = None
+
+    def _create_services(self) -> Dict[str, ChatCompletionClientBase]:
+        """Chat completion service of each tier of the model routes."""
+        services = {LARGE: _create_chat_completion(API_DEPLOYMENT_NAME, LARGE)}
+        if Settings.FAST_MODEL_DEPLOYMENT_NAME:
+            services[FAST] = _create_chat_completion(
+                Settings.FAST_MODEL_DEPLOYMENT_NAME, FAST
+            )
+        return services
+
+    async def _create_content_plugins(self) -> Dict[str, Any]:
+        """
+        Plugins serving the learning content, by plugin name: the web
+        search, the Confluence MCP server and the search of the ingested
+        pages, which is brought up to date first.
+        """
+        from semantic_kernel.connectors.mcp import MCPStdioPlugin
+
+        from backend.src.agents.bing_seach.bing_search_agent import BingSearch
+        from backend.src.agents.confluence.academy_rag import (
+            ConfluenceIngestion, SearchPlugin)
+        from backend.src.llm.cassette import get_cassette
+
+        cassette = get_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            # Tool results come from the cassette: nothing is ingested and
+            # the MCP server is replaced by the functions it recorded.
+            search_client = None
+            mcp_plugin = cassette.replay_plugin(
+                "internal_content_mcp", "Confluence plugin for Atlassian"
+            )
+        else:
+            search_client = (
+                await ConfluenceIngestion().aupdate_content_process()
+            )
+            self.confluence_plugin = MCPStdioPlugin(
+                name="atlassian",
+                description="Confluence plugin for Atlassian",
+                command="docker",
+                args=[
+                    "run",
+                    "-i",
+                    "--rm",
+                    "-e",
+                    "CONFLUENCE_URL",
+                    "-e",
+                    "CONFLUENCE_USERNAME",
+                    "-e",
+                    "CONFLUENCE_API_TOKEN",
+                    "ghcr.io/sooperset/mcp-atlassian:latest",
+                ],
+                env={
+                    "CONFLUENCE_URL": CONFLUENCE_URL,
+                    "CONFLUENCE_USERNAME": CONFLUENCE_USERNAME,
+                    "CONFLUENCE_API_TOKEN": CONFLUENCE_API_KEY,
+                },
+            )
+
+            await self.confluence_plugin.__aenter__()
+            mcp_plugin = self.confluence_plugin
+
+        return {
+            "learning_path_building_external_content_web": BingSearch(),
+            "internal_content_mcp": mcp_plugin,
+            "internal_content_rag": SearchPlugin(search_client=search_client),
+        }
 
     async def initialise(self):
         if self.initialized:
             return
-
-        kernel = _create_kernel_with_chat_completion()
-        settings = OpenAIChatPromptExecutionSettings()
-        # settings.response_format = Profile
+        async with self._initialise_lock:
+            if not self.initialized:
+                await self._initialise()
+
+    async def _initialise(self):
+        # The plugins pull in the Azure, Atlassian, Google and MCP clients,
+        # which are only needed once the agent serves its first message.
+        from semantic_kernel.connectors.ai.open_ai import \
+            OpenAIChatPromptExecutionSettings
+
+        from backend.src.agents.google.calendar import GoogleCalendarPlugin
+        from backend.src.agents.google.gmail import GmailPlugin
+        from backend.src.agents.skill_graph.plugin import SkillGraphPlugin
+        from backend.src.llm.cassette import get_cassette
+
+        kernel = _create_kernel_with_chat_completion(self._create_services())
+        settings = OpenAIChatPromptExecutionSettings(
+            service_id=PROFILE_SERVICE_ID
+        )
 
         profile_builder = ChatCompletionAgent(
             kernel=kernel,
@@ -119,43 +320,12 @@ class ChatAgentHandler:
             arguments=KernelArguments(settings=settings),
         )
 
-        search_client = ConfluenceIngestion().update_content_process()
-        self.confluence_plugin = MCPStdioPlugin(
-            name="atlassian",
-            description="Confluence plugin for Atlassian",
-            command="docker",
-            args=[
-                "run",
-                "-i",
-                "--rm",
-                "-e",
-                "CONFLUENCE_URL",
-                "-e",
-                "CONFLUENCE_USERNAME",
-                "-e",
-                "CONFLUENCE_API_TOKEN",
-                "ghcr.io/sooperset/mcp-atlassian:latest",
-            ],
-            env={
-                "CONFLUENCE_URL": CONFLUENCE_URL,
-                "CONFLUENCE_USERNAME": CONFLUENCE_USERNAME,
-                "CONFLUENCE_API_TOKEN": CONFLUENCE_API_KEY,
-            },
-        )
-
-        await self.confluence_plugin.__aenter__()
-
-        kernel.add_plugin(
-            BingSearch(),
-            plugin_name="learning_path_building_external_content_web",
-        )
-        kernel.add_plugin(profile_builder, plugin_name="Profile_Builder_Agent")
+        content_plugins = await self._create_content_plugins()
+        for plugin_name, plugin in content_plugins.items():
+            kernel.add_plugin(plugin, plugin_name=plugin_name)
+        kernel.add_plugin(profile_builder, plugin_name=PROFILE_BUILDER_PLUGIN)
         kernel.add_plugin(
-            self.confluence_plugin, plugin_name="internal_content_mcp"
-        )
-        kernel.add_plugin(
-            SearchPlugin(search_client=search_client),
-            plugin_name="internal_content_rag",
+            ProfilePlugin(self.profiles), plugin_name="learner_profile_plugin"
         )
         kernel.add_plugin(
             GmailPlugin(),
@@ -165,35 +335,182 @@ class ChatAgentHandler:
             GoogleCalendarPlugin(),
             plugin_name="google_calendar_plugin",
         )
+        kernel.add_plugin(
+            LearningPathPlugin(),
+            plugin_name="learning_path_plugin",
+        )
+        kernel.add_plugin(
+            SkillGraphPlugin(),
+            plugin_name="skill_graph_plugin",
+        )
 
+        kernel.add_filter("function_invocation", trace_filter)
         kernel.add_filter("function_invocation", logger_filter)
+        if Settings.PREFETCH_ENABLED:
+            self.prefetcher = Prefetcher(
+                kernel,
+                Settings.PREFETCH_FUNCTIONS,
+                min_overlap=Settings.PREFETCH_MIN_OVERLAP,
+            )
+            kernel.add_filter(
+                "function_invocation", self.prefetcher.function_filter
+            )
+        cassette = get_cassette()
+        if cassette is not None:
+            kernel.add_filter("function_invocation", cassette.function_filter)
 
         settings = kernel.get_prompt_execution_settings_from_service_id(
             service_id=SERVICE_ID
         )
         settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
-        self.agent = ChatCompletionAgent(
+        self.host_settings = settings
+        if Settings.TOOL_ROUTER_ENABLED:
+            self.tool_router = ToolRouter(
+                kernel,
+                top_k=Settings.TOOL_ROUTER_TOP_K,
+                always_include=Settings.TOOL_ROUTER_ALWAYS_INCLUDE,
+            )
+            self.tool_router.index()
+        self.agent = HostAgent(
             kernel=kernel,
             name="Host",
-            instructions=GLOBAL_PROMPT.format(
-                WEB_SEARCH_PROMPT=WEB_SEARCH_PROMPT
-            ),
+            instructions=HOST_INSTRUCTIONS,
             arguments=KernelArguments(settings=settings),
         )
         self.initialized = True
 
-    async def handle_message(self, message: str) -> str:
+    def _turn_arguments(
+        self,
+        message: str,
+        state: SessionState,
+        response_format: Optional[type] = None,
+    ) -> KernelArguments:
+        """
+        Build the per-turn arguments: the tools the router picked for this
+        message, without the Profile Builder when the learner's profile is
+        fresh, the profile itself and, if given, the structured answer
+        format.
+
+        The tools are those of every turn of the session so far and the
+        Profile Builder is left out or not for the whole session, as of its
+        first turn: the tool definitions head the prompt, so any change to
+        them is a miss of the prompt cache for the whole prompt.
+
+        The settings are always copied: the agent merges the arguments of a
+        turn into its default ones, so settings changed for one turn would
+        otherwise leak into the next.
+        """
+        settings = self.host_settings.model_copy()
+        filters = {}
+        if self.tool_router:
+            selection = self.tool_router.route(message)
+            state.offered_functions = sorted(
+                set(state.offered_functions).union(selection.functions)
+            )
+            if len(state.offered_functions) < selection.total_functions:
+                filters["included_functions"] = state.offered_functions
+        profile = Profile.model_validate(state.profile or {})
+        if state.excluded_plugins is None:
+            state.excluded_plugins = (
+                [PROFILE_BUILDER_PLUGIN] if profile.is_fresh() else []
+            )
+        if state.excluded_plugins:
+            filters["excluded_plugins"] = state.excluded_plugins
+        if filters:
+            settings.function_choice_behavior = FunctionChoiceBehavior.Auto(
+                filters=filters
+            )
+        if response_format is not None:
+            # model_copy skips the validator that flags structured output.
+            settings = settings.model_copy(
+                update={
+                    "response_format": response_format,
+                    "structured_json_response": True,
+                }
+            )
+        arguments = KernelArguments(settings=settings)
+        if state.profile:
+            arguments[LEARNER_PROFILE] = profile.to_prompt()
+        return arguments
+
+    def _prefetch(
+        self, message: str, state: SessionState, arguments: KernelArguments
+    ) -> AbstractAsyncContextManager:
+        """
+        Prefetch the retrieval of the message's topic during the turn.
+
+        Learners without a fresh profile are sent to the Profile Builder
+        first, so nothing is prefetched for them.
+        """
+        profile = Profile.model_validate(state.profile or {})
+        if self.prefetcher is None or not profile.is_fresh():
+            return nullcontext()
+        return self.prefetcher.run(
+            message, allowed=_included_functions(arguments)
+        )
+
+    async def _load_session(
+        self,
+        session_id: Optional[str],
+        user_id: Optional[str],
+        trace: Optional[RequestTrace] = None,
+    ) -> tuple[SessionState, SessionThread, RequestTrace]:
+        state = await self.sessions.load(
+            session_id or self.default_session_id, user_id or self.user_id
+        )
+        if state.profile is None and state.user_id:
+            profile = await self.profiles.load(state.user_id)
+            if profile is not None:
+                state.profile = profile.model_dump(mode="json")
+        trace = trace or RequestTrace()
+        trace.session_id = state.session_id
+        current_user_id.set(state.user_id)
+        current_session.set(state)
+        current_trace.set(trace)
+        return state, SessionThread(state), trace
+
+    async def handle_message(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        trace: Optional[RequestTrace] = None,
+    ) -> Tuple[str, List[str]]:
+        """
+        Answer a message of a session.
+
+        Args:
+            trace: Trace recording the LLM and tool calls of the request,
+                a new one by default.
+
+        Returns:
+            The answer and the names of the functions called.
+        """
         await self.initialise()
-        intermediate_steps.clear()
+        state, thread, trace = await self._load_session(
+            session_id, user_id, trace
+        )
+        intermediate_steps: list[ChatMessageContent] = []
+
+        async def on_intermediate_message(message: ChatMessageContent):
+            intermediate_steps.append(message)
+
         function_calling = []
         output_text = ""
-        async for response in self.agent.invoke(
-            messages=message,
-            thread=self.thread,
-            on_intermediate_message=handle_intermediate_steps,
-        ):
-            output_text += str(response)
-            self.thread = response.thread
+        start = time.perf_counter()
+        arguments = self._turn_arguments(message, state)
+        async with self._prefetch(message, state, arguments):
+            async for response in self.agent.invoke(
+                messages=message,
+                thread=thread,
+                on_intermediate_message=on_intermediate_message,
+                arguments=arguments,
+            ):
+                output_text += str(response)
+        logger.info(
+            f"Response generated in {time.perf_counter() - start:.2f}s"
+        )
+        logger.info(trace.finish().summary())
         logger.info(f"# {response.name}: {response.content}")
         logger.info("\nIntermediate Steps:")
         for msg in intermediate_steps:
@@ -214,26 +531,114 @@ class ChatAgentHandler:
                             f"Function Call:> {fcc.name} with arguments: {fcc.arguments}"
                         )
                         function_calling.append(fcc.name)
+                        state.record_tool_call(fcc.name, fcc.arguments)
             else:
                 logger.info(f"{msg.role}: {msg.content}")
+        await self.sessions.save(state)
         return output_text, function_calling
 
     async def handle_message_streaming(
-        self, message: str
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
     ) -> AsyncIterable[StreamingChatMessageContent]:
         await self.initialise()
+        state, thread, trace = await self._load_session(session_id, user_id)
+        intermediate_steps = []
+
+        async def on_intermediate_message(message: ChatMessageContent):
+            intermediate_steps.append(message.items)
+
+        start = time.perf_counter()
+        first_token = True
+        arguments = self._turn_arguments(message, state)
+        async with self._prefetch(message, state, arguments):
+            async for result in self.agent.invoke_stream(
+                messages=message,
+                thread=thread,
+                on_intermediate_message=on_intermediate_message,
+                arguments=arguments,
+            ):
+                if first_token and result.content:
+                    first_token = False
+                    logger.info(
+                        "Time to first token: "
+                        f"{time.perf_counter() - start:.2f}s"
+                    )
+                yield f"data: {result.content}\n\nlogs: {intermediate_steps}\n\n"
+        logger.info(trace.finish().summary())
+        yield f"event: trace\ndata: {trace.model_dump_json()}\n\n"
+        await self.sessions.save(state)
+
+    async def handle_learning_path_streaming(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterable[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate a learning path as structured output, streaming each
+        module as soon as its JSON is complete.
+
+        Yields:
+            ("module", {"index", "module"}) events, then one
+            ("learning_path", path) event, or ("error", {"detail"}) if the
+            answer is not a valid learning path, and the ("trace", trace)
+            of the request. The path is stored in the session for the
+            tools of the next turns.
+        """
+        await self.initialise()
+        state, thread, trace = await self._load_session(session_id, user_id)
 
-        async for result in self.agent.invoke_stream(
-            messages=message,
-            thread=self.thread,
-            on_intermediate_message=self.handle_streaming_intermediate_steps,
-        ):
-            yield f"data: {result.content}\n\nlogs: {self.intermediate_streaming_steps}\n\n"
-            self.thread = result.thread
+        stream = LearningPathStream()
+        index = 0
+        start = time.perf_counter()
+        arguments = self._turn_arguments(
+            message, state, response_format=LearningPath
+        )
+        async with self._prefetch(message, state, arguments):
+            async for result in self.agent.invoke_stream(
+                messages=message, thread=thread, arguments=arguments
+            ):
+                for module in stream.feed(str(result)):
+                    if index == 0:
+                        logger.info(
+                            "Time to first module: "
+                            f"{time.perf_counter() - start:.2f}s"
+                        )
+                    yield "module", {
+                        "index": index,
+                        "module": module.model_dump(),
+                    }
+                    index += 1
+        try:
+            state.learning_path = stream.result()
+        except ValidationError as e:
+            logger.error(f"Invalid learning path: {e}")
+            yield "error", {"detail": "The learning path could not be built."}
+        else:
+            yield "learning_path", state.learning_path.model_dump()
+        logger.info(trace.finish().summary())
+        yield "trace", trace.model_dump(mode="json")
+        await self.sessions.save(state)
+
+    async def get_learning_path(
+        self, session_id: str, user_id: Optional[str] = None
+    ) -> Optional[LearningPath]:
+        state = await self.sessions.load(session_id, user_id or self.user_id)
+        return state.learning_path
+
+    async def end_session(
+        self, session_id: Optional[str] = None, user_id: Optional[str] = None
+    ) -> None:
+        state = await self.sessions.load(
+            session_id or self.default_session_id, user_id or self.user_id
+        )
+        await self.sessions.delete(state.session_id)
 
     async def cleanup(self):
-        if self.thread:
-            await self.thread.delete()
+        await self.end_session()
 
         if self.confluence_plugin:
             try:
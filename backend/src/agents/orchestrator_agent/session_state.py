@@ -0,0 +1,156 @@
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import orjson
+from pydantic import BaseModel, Field
+from semantic_kernel.contents import ChatHistory
+
+from backend.src.agents.orchestrator_agent.learning_path import LearningPath
+from backend.src.mongodb.base import BaseMetadataStore
+from backend.src.mongodb.client import get_metadata_store
+from backend.src.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionAccessDenied(Exception):
+    """Raised when a user asks for a session owned by someone else."""
+
+    def __init__(self, session_id: str) -> None:
+        super().__init__(f"Session {session_id} belongs to another user.")
+        self.session_id = session_id
+
+
+class SessionConflict(Exception):
+    """Raised when another turn saved a session since it was loaded."""
+
+    def __init__(self, session_id: str) -> None:
+        super().__init__(
+            f"Session {session_id} was updated by another request."
+        )
+        self.session_id = session_id
+
+
+class ToolTrace(BaseModel):
+    name: str
+    arguments: Optional[str] = None
+    called_at: datetime = Field(default_factory=datetime.now)
+
+
+class SessionState(BaseModel):
+    """Everything a worker needs to resume a conversation."""
+
+    session_id: str
+    user_id: Optional[str] = None
+    chat_history: ChatHistory = Field(default_factory=ChatHistory)
+    profile: Optional[Dict[str, Any]] = None
+    learning_path: Optional[LearningPath] = None
+    tool_traces: List[ToolTrace] = Field(default_factory=list)
+    # Tools offered to the Host so far, kept from turn to turn so that the
+    # tool definitions heading the prompt stay in the prompt cache.
+    offered_functions: List[str] = Field(default_factory=list)
+    excluded_plugins: Optional[List[str]] = None
+    # Number of saves, checked on save so that concurrent turns of the
+    # session cannot overwrite each other.
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    def record_tool_call(self, name: str, arguments: Any = None) -> None:
+        self.tool_traces.append(
+            ToolTrace(
+                name=name,
+                arguments=(
+                    str(arguments)[: Settings.SESSION_TOOL_ARGUMENTS_CHARS]
+                    if arguments is not None
+                    else None
+                ),
+            )
+        )
+        del self.tool_traces[: -Settings.SESSION_MAX_TOOL_TRACES]
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the state compactly: message metadata (usage, logprobs,
+        ids) is dropped, tool results that are not JSON values are stored
+        as the text the model saw, and the JSON is zlib-compressed.
+        """
+        data = self.model_dump(mode="json", exclude_none=True, fallback=str)
+        for message in data["chat_history"].get("messages", []):
+            message.pop("metadata", None)
+        return zlib.compress(orjson.dumps(data))
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "SessionState":
+        return cls.model_validate(orjson.loads(zlib.decompress(payload)))
+
+
+class SessionStore:
+    """
+    Loads and saves conversation state through a metadata store, by
+    default the process-wide one, resolved on first use.
+    """
+
+    def __init__(
+        self, metadata_store: Optional[BaseMetadataStore] = None
+    ) -> None:
+        self._metadata_store = metadata_store
+
+    @property
+    def metadata_store(self) -> BaseMetadataStore:
+        if self._metadata_store is None:
+            self._metadata_store = get_metadata_store()
+        return self._metadata_store
+
+    async def load(
+        self, session_id: str, user_id: Optional[str] = None
+    ) -> SessionState:
+        """
+        Resume a session of ``user_id``, or start it if it is unknown.
+
+        Raises:
+            SessionAccessDenied: If the session belongs to another user,
+                anonymous sessions included.
+        """
+        payload = await self.metadata_store.load_session(session_id)
+        if payload is None:
+            logger.info(f"Starting new session {session_id}.")
+            return SessionState(session_id=session_id, user_id=user_id)
+        state = SessionState.from_bytes(payload)
+        if state.user_id != user_id:
+            logger.warning(
+                f"Refused session {session_id} of {state.user_id} to "
+                f"{user_id}."
+            )
+            raise SessionAccessDenied(session_id)
+        logger.info(
+            f"Resumed session {session_id} with "
+            f"{len(state.chat_history.messages)} messages."
+        )
+        return state
+
+    async def save(self, state: SessionState) -> None:
+        """
+        Save a session, unless another turn saved it since it was loaded.
+
+        Raises:
+            SessionConflict: If the stored session is no longer the one
+                the state was loaded from.
+        """
+        state.updated_at = datetime.now()
+        state.version += 1
+        if not await self.metadata_store.save_session(
+            state.session_id,
+            state.user_id,
+            state.to_bytes(),
+            state.version - 1,
+        ):
+            state.version -= 1
+            logger.warning(
+                f"Session {state.session_id} was saved concurrently."
+            )
+            raise SessionConflict(state.session_id)
+
+    async def delete(self, session_id: str) -> None:
+        await self.metadata_store.delete_session(session_id)
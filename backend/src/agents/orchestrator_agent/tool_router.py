@@ -0,0 +1,187 @@
+import logging
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from semantic_kernel import Kernel
+from semantic_kernel.connectors.ai.function_calling_utils import \
+    kernel_function_metadata_to_function_call_format
+from semantic_kernel.functions.kernel_function_metadata import \
+    KernelFunctionMetadata
+
+from backend.src.utils.keywords import tokenize
+from backend.src.utils.tokens import estimate_json_tokens
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters, tuned for short documents such as function descriptions.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+@dataclass
+class ToolEntry:
+    fully_qualified_name: str
+    terms: Counter
+    length: int
+    schema_tokens: int
+
+
+@dataclass
+class ToolSelection:
+    """The functions advertised to the model for a single turn."""
+
+    functions: List[str]
+    total_functions: int
+    total_tokens: int
+    selected_tokens: int
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.total_tokens - self.selected_tokens
+
+
+class ToolRouter:
+    """
+    Picks the subset of kernel functions relevant to a user message.
+
+    Every registered function is indexed once by its plugin name, function
+    name, description and parameter descriptions. Each turn the message is
+    scored against that index with BM25 and only the best matches (plus the
+    functions that must always be available) are sent to the model.
+    """
+
+    def __init__(
+        self,
+        kernel: Kernel,
+        top_k: int = 8,
+        always_include: Sequence[str] = (),
+        min_score: float = 0.5,
+    ) -> None:
+        self.kernel = kernel
+        self.top_k = top_k
+        self.always_include = list(always_include)
+        self.min_score = min_score
+        self.entries: Dict[str, ToolEntry] = {}
+        self.idf: Dict[str, float] = {}
+        self.avg_length = 0.0
+        self.total_tokens = 0
+
+    @staticmethod
+    def _describe(metadata: KernelFunctionMetadata) -> str:
+        parts = [
+            metadata.plugin_name or "",
+            metadata.name,
+            metadata.description or "",
+        ]
+        for param in metadata.parameters:
+            parts.append(param.name or "")
+            parts.append(param.description or "")
+        return " ".join(parts)
+
+    def index(self) -> None:
+        """Build the keyword index over the functions of the kernel."""
+        self.entries = {}
+        for metadata in self.kernel.get_full_list_of_function_metadata():
+            terms = Counter(tokenize(self._describe(metadata)))
+            schema = kernel_function_metadata_to_function_call_format(
+                metadata
+            )
+            self.entries[metadata.fully_qualified_name] = ToolEntry(
+                fully_qualified_name=metadata.fully_qualified_name,
+                terms=terms,
+                length=sum(terms.values()),
+                schema_tokens=estimate_json_tokens(schema),
+            )
+
+        document_frequency: Counter = Counter()
+        for entry in self.entries.values():
+            document_frequency.update(entry.terms.keys())
+        count = len(self.entries)
+        self.idf = {
+            term: math.log(1 + (count - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_frequency.items()
+        }
+        self.avg_length = (
+            sum(entry.length for entry in self.entries.values()) / count
+            if count
+            else 0.0
+        )
+        self.total_tokens = sum(
+            entry.schema_tokens for entry in self.entries.values()
+        )
+        logger.info(
+            f"ToolRouter indexed {count} functions "
+            f"(~{self.total_tokens} schema tokens)."
+        )
+
+    def _score(self, query_terms: List[str], entry: ToolEntry) -> float:
+        score = 0.0
+        norm = BM25_K1 * (
+            1 - BM25_B + BM25_B * entry.length / (self.avg_length or 1)
+        )
+        for term in query_terms:
+            freq = entry.terms.get(term)
+            if not freq:
+                continue
+            score += (
+                self.idf[term] * freq * (BM25_K1 + 1) / (freq + norm)
+            )
+        return score
+
+    def route(self, message: str) -> ToolSelection:
+        """
+        Select the functions to advertise for a user message.
+
+        When nothing in the message matches a function description (e.g. a
+        one-letter answer to a profile question), the whole catalogue is
+        kept so the model is never starved of the tool it needs.
+
+        Args:
+            message: The user message of the turn.
+
+        Returns:
+            The selected functions and the schema tokens they cost.
+        """
+        if not self.entries:
+            self.index()
+
+        query_terms = set(tokenize(message))
+        scores = {
+            name: self._score(query_terms, entry)
+            for name, entry in self.entries.items()
+        }
+        ranked = sorted(
+            (name for name, score in scores.items()
+             if score >= self.min_score),
+            key=lambda name: scores[name],
+            reverse=True,
+        )[: self.top_k]
+
+        if not ranked:
+            selected = list(self.entries)
+        else:
+            selected = ranked + [
+                name
+                for name in self.always_include
+                if name in self.entries and name not in ranked
+            ]
+
+        selection = ToolSelection(
+            functions=selected,
+            total_functions=len(self.entries),
+            total_tokens=self.total_tokens,
+            selected_tokens=sum(
+                self.entries[name].schema_tokens for name in selected
+            ),
+            scores={name: round(scores[name], 3) for name in ranked},
+        )
+        logger.info(
+            f"ToolRouter selected {len(selection.functions)}/"
+            f"{selection.total_functions} functions, saving "
+            f"~{selection.saved_tokens} of {selection.total_tokens} "
+            f"prompt tokens: {selection.functions}"
+        )
+        return selection
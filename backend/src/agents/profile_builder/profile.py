@@ -0,0 +1,143 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Annotated, Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from semantic_kernel.functions import kernel_function
+
+from backend.src.mongodb.base import BaseMetadataStore
+from backend.src.mongodb.client import get_metadata_store
+from backend.src.utils.config import Settings
+from backend.src.utils.request_context import current_session, current_user_id
+
+logger = logging.getLogger(__name__)
+
+
+class Profile(BaseModel):
+    current_position: Optional[str] = None
+    target_role: Optional[str] = None
+    learning_obstacles: Optional[str] = None
+    time_limit: Optional[str] = None
+    preferred_learning_style: Optional[list[str]] = None
+    updated_at: Optional[datetime] = None
+
+    @property
+    def is_complete(self) -> bool:
+        return all(
+            getattr(self, name)
+            for name in self.model_fields
+            if name != "updated_at"
+        )
+
+    def is_fresh(
+        self,
+        max_age: timedelta = timedelta(days=Settings.PROFILE_MAX_AGE_DAYS),
+    ) -> bool:
+        """Whether the profile is complete and recent enough to reuse."""
+        return (
+            self.is_complete
+            and self.updated_at is not None
+            and datetime.now() - self.updated_at <= max_age
+        )
+
+    def to_prompt(self) -> str:
+        lines = [
+            f"- {name}: {value}"
+            for name, value in self.model_dump(exclude_none=True).items()
+            if name != "updated_at"
+        ]
+        return (
+            "Learner profile, already collected: do not ask for it again.\n"
+            + "\n".join(lines)
+        )
+
+
+class ProfileStore:
+    """
+    Loads and updates learner profiles through a metadata store, by
+    default the process-wide one, resolved on first use.
+    """
+
+    def __init__(
+        self, metadata_store: Optional[BaseMetadataStore] = None
+    ) -> None:
+        self._metadata_store = metadata_store
+
+    @property
+    def metadata_store(self) -> BaseMetadataStore:
+        if self._metadata_store is None:
+            self._metadata_store = get_metadata_store()
+        return self._metadata_store
+
+    async def load(self, user_id: str) -> Optional[Profile]:
+        data = await self.metadata_store.load_profile(user_id)
+        return Profile.model_validate(data) if data else None
+
+    async def update(self, user_id: str, fields: Dict[str, Any]) -> Profile:
+        """Store the given fields only, leaving the others untouched."""
+        fields = {**fields, "updated_at": datetime.now()}
+        data = await self.metadata_store.update_profile(user_id, fields)
+        return Profile.model_validate(data)
+
+
+class ProfilePlugin:
+    """
+    Saves what the Profile Builder collected for the next sessions, under
+    the user the frontend authenticated for the request.
+    """
+
+    def __init__(self, profile_store: Optional[ProfileStore] = None) -> None:
+        self.profiles = profile_store or ProfileStore()
+
+    @kernel_function(
+        name="SaveProfile",
+        description=(
+            "Save the learner profile once the user confirmed it, or when "
+            "the user changes part of it. Only pass the fields that are new "
+            "or changed."
+        ),
+    )
+    async def save_profile(
+        self,
+        current_position: Annotated[
+            str, "The user's current role or position."
+        ] = "",
+        target_role: Annotated[str, "The role the user prepares for."] = "",
+        learning_obstacles: Annotated[
+            str, "The user's biggest learning challenge."
+        ] = "",
+        time_limit: Annotated[
+            str, "Target timeframe, e.g. '3-6 months'."
+        ] = "",
+        preferred_learning_style: Annotated[
+            Optional[List[str]], "Preferred learning styles."
+        ] = None,
+    ) -> str:
+        fields = {
+            name: value
+            for name, value in {
+                "current_position": current_position,
+                "target_role": target_role,
+                "learning_obstacles": learning_obstacles,
+                "time_limit": time_limit,
+                "preferred_learning_style": preferred_learning_style,
+            }.items()
+            if value
+        }
+        if not fields:
+            return "Nothing to save."
+
+        user_id = current_user_id.get()
+        state = current_session.get()
+        if user_id:
+            profile = await self.profiles.update(user_id, fields)
+        else:
+            # Anonymous users keep their profile for this session only.
+            stored = state.profile if state and state.profile else {}
+            profile = Profile.model_validate(
+                {**stored, **fields, "updated_at": datetime.now()}
+            )
+        if state is not None:
+            state.profile = profile.model_dump(mode="json")
+        logger.info(f"Saved profile fields {sorted(fields)} of {user_id}.")
+        return "Profile saved."
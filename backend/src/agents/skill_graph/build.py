@@ -0,0 +1,222 @@
+"""
+Build the skill graph offline from the curated skills and the Confluence
+pages already ingested in the metadata store.
+
+Example usages:
+python -m backend.src.agents.skill_graph.build
+python -m backend.src.agents.skill_graph.build --no-confluence \
+    --output skill_graph.npz
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+import orjson
+from pydantic import BaseModel
+
+from backend.src.agents.skill_graph.graph import SkillGraph, normalize
+from backend.src.mongodb.base import BaseMetadataStore
+from backend.src.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EFFORT_HOURS = 4.0
+READING_WORDS_PER_MINUTE = 200
+
+
+class ResourceSpec(BaseModel):
+    title: str
+    url: str = ""
+    kind: str = "web"
+    internal: bool = False
+    hours: float = 0.0
+
+
+class SkillSpec(BaseModel):
+    name: str
+    aliases: List[str] = []
+    prerequisites: List[str] = []
+    # Estimated from the resources when not curated.
+    effort_hours: Optional[float] = None
+    resources: List[ResourceSpec] = []
+
+
+def load_spec(path: str) -> List[SkillSpec]:
+    with open(path, "rb") as spec:
+        data = orjson.loads(spec.read())
+    return [SkillSpec.model_validate(skill) for skill in data]
+
+
+def reading_hours(html: str) -> float:
+    words = len(re.sub(r"<[^>]+>", " ", html).split())
+    return words / READING_WORDS_PER_MINUTE / 60
+
+
+async def link_confluence_pages(
+    skills: List[SkillSpec], metadata_store: BaseMetadataStore
+) -> int:
+    """
+    Add the ingested Confluence pages whose title names a skill to the
+    resources of that skill. Returns the number of links added.
+    """
+    keys: Dict[str, List[SkillSpec]] = defaultdict(list)
+    for skill in skills:
+        for name in [skill.name, *skill.aliases]:
+            keys[normalize(name)].append(skill)
+
+    linked = 0
+    async for page in metadata_store.iter_documents(
+        "confluence_content",
+        projection={"_id": 0, "page_id": 1, "title": 1, "body": 1},
+    ):
+        title = f" {normalize(page['title'])} "
+        matched = {
+            id(skill): skill
+            for key, key_skills in keys.items()
+            if f" {key} " in title
+            for skill in key_skills
+        }
+        for skill in matched.values():
+            skill.resources.insert(
+                0,
+                ResourceSpec(
+                    title=page["title"],
+                    url=(
+                        f"{Settings.CONFLUENCE_URL}/pages/viewpage.action"
+                        f"?pageId={page['page_id']}"
+                    ),
+                    kind="confluence",
+                    internal=True,
+                    hours=reading_hours(page.get("body") or ""),
+                ),
+            )
+            linked += 1
+    return linked
+
+
+def topological_order(skills: List[SkillSpec]) -> List[int]:
+    """
+    Order the skills so that prerequisites come first, keeping the order
+    of the spec among independent skills.
+    """
+    index = {normalize(skill.name): i for i, skill in enumerate(skills)}
+    for i, skill in enumerate(skills):
+        for alias in skill.aliases:
+            index.setdefault(normalize(alias), i)
+
+    requires: List[List[int]] = [[] for _ in skills]
+    pending = [0] * len(skills)
+    for i, skill in enumerate(skills):
+        for prerequisite in skill.prerequisites:
+            if normalize(prerequisite) not in index:
+                raise ValueError(
+                    f"Unknown prerequisite {prerequisite!r} of {skill.name}."
+                )
+            requires[index[normalize(prerequisite)]].append(i)
+            pending[i] += 1
+
+    ready = [i for i in range(len(skills)) if not pending[i]]
+    order = []
+    while ready:
+        ready.sort(reverse=True)
+        skill = ready.pop()
+        order.append(skill)
+        for dependent in requires[skill]:
+            pending[dependent] -= 1
+            if not pending[dependent]:
+                ready.append(dependent)
+    if len(order) < len(skills):
+        cycle = [skills[i].name for i in range(len(skills)) if pending[i]]
+        raise ValueError(f"Prerequisite cycle between {cycle}.")
+    return order
+
+
+def build_graph(skills: List[SkillSpec]) -> SkillGraph:
+    order = topological_order(skills)
+    skills = [skills[i] for i in order]
+    position = {normalize(skill.name): i for i, skill in enumerate(skills)}
+
+    alias_keys, alias_targets = [], []
+    for i, skill in enumerate(skills):
+        for alias in skill.aliases:
+            if normalize(alias) not in position:
+                alias_keys.append(normalize(alias))
+                alias_targets.append(i)
+    lookup = {**dict(zip(alias_keys, alias_targets)), **position}
+
+    prereq_indptr, prereq_indices = [0], []
+    resource_indptr, resources = [0], []
+    effort_hours = []
+    for skill in skills:
+        prereq_indices.extend(
+            sorted({lookup[normalize(p)] for p in skill.prerequisites})
+        )
+        prereq_indptr.append(len(prereq_indices))
+        resources.extend(skill.resources)
+        resource_indptr.append(len(resources))
+        effort_hours.append(
+            skill.effort_hours
+            or sum(resource.hours for resource in skill.resources)
+            or DEFAULT_EFFORT_HOURS
+        )
+
+    return SkillGraph(
+        names=np.array([skill.name for skill in skills], dtype=str),
+        effort_hours=np.array(effort_hours, dtype=np.float32),
+        prereq_indptr=np.array(prereq_indptr, dtype=np.int32),
+        prereq_indices=np.array(prereq_indices, dtype=np.int32),
+        alias_keys=np.array(alias_keys, dtype=str),
+        alias_targets=np.array(alias_targets, dtype=np.int32),
+        resource_indptr=np.array(resource_indptr, dtype=np.int32),
+        resource_titles=np.array([r.title for r in resources], dtype=str),
+        resource_urls=np.array([r.url for r in resources], dtype=str),
+        resource_kinds=np.array([r.kind for r in resources], dtype=str),
+        resource_internal=np.array(
+            [r.internal for r in resources], dtype=bool
+        ),
+        resource_hours=np.array(
+            [r.hours for r in resources], dtype=np.float32
+        ),
+    )
+
+
+async def build(
+    spec_path: str, output_path: str, with_confluence: bool = True
+) -> SkillGraph:
+    skills = load_spec(spec_path)
+    if with_confluence:
+        from backend.src.mongodb.client import get_metadata_store
+
+        linked = await link_confluence_pages(skills, get_metadata_store())
+        logger.info(f"Linked {linked} Confluence pages to skills.")
+    graph = build_graph(skills)
+    graph.save(output_path)
+    logger.info(
+        f"Saved {len(graph)} skills, {len(graph.prereq_indices)} "
+        f"prerequisites and {len(graph.resource_titles)} resources to "
+        f"{output_path}."
+    )
+    return graph
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--spec", default=Settings.SKILL_GRAPH_SPEC)
+    parser.add_argument("--output", default=Settings.SKILL_GRAPH_PATH)
+    parser.add_argument(
+        "--no-confluence",
+        action="store_true",
+        help="Only use the curated skills, without the metadata store.",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(build(args.spec, args.output, not args.no_confluence))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import difflib
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.src.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(name: str) -> str:
+    """Lookup key of a skill name: lower case, words separated by spaces."""
+    return " ".join(re.findall(r"[a-z0-9+#]+", name.lower()))
+
+
+class SkillGraph:
+    """
+    Prerequisite graph of skills with their effort and resources, held in
+    compressed sparse row arrays.
+
+    Skills are numbered in topological order (every prerequisite comes
+    before the skills requiring it), so a set of skills is put in learning
+    order by sorting their indices. The prerequisites of skill ``i`` are
+    ``prereq_indices[prereq_indptr[i]:prereq_indptr[i + 1]]`` and its
+    resources, in the ``resource_*`` arrays, are found the same way.
+    """
+
+    ARRAYS = (
+        "names",
+        "effort_hours",
+        "prereq_indptr",
+        "prereq_indices",
+        "alias_keys",
+        "alias_targets",
+        "resource_indptr",
+        "resource_titles",
+        "resource_urls",
+        "resource_kinds",
+        "resource_internal",
+        "resource_hours",
+    )
+
+    def __init__(self, **arrays: np.ndarray) -> None:
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self._lookup: Dict[str, int] = {
+            normalize(str(name)): index
+            for index, name in enumerate(self.names)
+        }
+        self._lookup.update(
+            zip(self.alias_keys.tolist(), self.alias_targets.tolist())
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def load(cls, path: str) -> "SkillGraph":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in cls.ARRAYS})
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path, **{name: getattr(self, name) for name in self.ARRAYS}
+        )
+
+    def find(self, name: str) -> Optional[int]:
+        """Index of a skill by name or alias, tolerating small typos."""
+        key = normalize(name)
+        if key in self._lookup:
+            return self._lookup[key]
+        close = difflib.get_close_matches(key, self._lookup, n=1, cutoff=0.8)
+        return self._lookup[close[0]] if close else None
+
+    def suggest(self, name: str, n: int = 5) -> List[str]:
+        keys = difflib.get_close_matches(
+            normalize(name), self._lookup, n=n, cutoff=0.5
+        )
+        return list(
+            dict.fromkeys(str(self.names[self._lookup[k]]) for k in keys)
+        )
+
+    def prerequisites(self, skill: int) -> np.ndarray:
+        start, end = self.prereq_indptr[skill], self.prereq_indptr[skill + 1]
+        return self.prereq_indices[start:end]
+
+    def closure(self, skills: Iterable[int]) -> np.ndarray:
+        """Mask of the given skills and of all their prerequisites."""
+        mask = np.zeros(len(self), dtype=bool)
+        stack = list(skills)
+        while stack:
+            skill = stack.pop()
+            if mask[skill]:
+                continue
+            mask[skill] = True
+            stack.extend(self.prerequisites(skill).tolist())
+        return mask
+
+    def path(self, known: Sequence[int], target: int) -> np.ndarray:
+        """
+        Skills to learn, in learning order, to reach ``target`` from the
+        ``known`` skills: the prerequisites of the target that the known
+        skills do not already cover, then the target itself.
+        """
+        needed = self.closure([target]) & ~self.closure(known)
+        return np.flatnonzero(needed)
+
+    def resources(self, skill: int) -> List[Dict]:
+        start = self.resource_indptr[skill]
+        end = self.resource_indptr[skill + 1]
+        return [
+            {
+                "title": str(self.resource_titles[i]),
+                "url": str(self.resource_urls[i]),
+                "kind": str(self.resource_kinds[i]),
+                "internal": bool(self.resource_internal[i]),
+                "hours": round(float(self.resource_hours[i]), 2),
+            }
+            for i in range(start, end)
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_skill_graph() -> Optional[SkillGraph]:
+    """Return the graph built offline, None if it has not been built."""
+    if not os.path.exists(Settings.SKILL_GRAPH_PATH):
+        logger.warning(
+            f"No skill graph at {Settings.SKILL_GRAPH_PATH}, run "
+            "python -m backend.src.agents.skill_graph.build to build it."
+        )
+        return None
+    graph = SkillGraph.load(Settings.SKILL_GRAPH_PATH)
+    logger.info(f"Loaded skill graph of {len(graph)} skills.")
+    return graph
@@ -0,0 +1,84 @@
+import logging
+import time
+from typing import Annotated, Any, Dict, Optional
+
+from semantic_kernel.functions import kernel_function
+
+from backend.src.agents.skill_graph.graph import SkillGraph, get_skill_graph
+
+logger = logging.getLogger(__name__)
+
+
+class SkillGraphPlugin:
+    """Plans learning sequences on the skill graph built offline."""
+
+    def __init__(self, graph: Optional[SkillGraph] = None) -> None:
+        self._graph = graph
+
+    @property
+    def graph(self) -> Optional[SkillGraph]:
+        if self._graph is None:
+            self._graph = get_skill_graph()
+        return self._graph
+
+    @kernel_function(
+        name="GetSkillPath",
+        description=(
+            "Return the ordered skills to learn to reach a target skill or "
+            "role from the skills the user already has, with prerequisites, "
+            "estimated hours and curated internal and external resources. "
+            "Call it first when building a learning path, then annotate the "
+            "returned steps instead of planning the order yourself."
+        ),
+    )
+    def get_skill_path(
+        self,
+        target_skill: Annotated[
+            str, "The skill or role to reach, e.g. 'Data engineering'."
+        ],
+        current_skills: Annotated[
+            str,
+            "Comma-separated skills the user already has, e.g. 'Python, SQL'.",
+        ] = "",
+    ) -> Dict[str, Any]:
+        graph = self.graph
+        if graph is None:
+            return {"error": "The skill graph has not been built."}
+
+        start = time.perf_counter()
+        target = graph.find(target_skill)
+        if target is None:
+            return {
+                "error": f"Unknown skill {target_skill!r}.",
+                "suggestions": graph.suggest(target_skill),
+            }
+        known, unknown = [], []
+        for name in filter(None, map(str.strip, current_skills.split(","))):
+            skill = graph.find(name)
+            if skill is None:
+                unknown.append(name)
+            else:
+                known.append(skill)
+
+        steps = [
+            {
+                "skill": str(graph.names[skill]),
+                "effort_hours": round(float(graph.effort_hours[skill]), 1),
+                "prerequisites": [
+                    str(graph.names[p]) for p in graph.prerequisites(skill)
+                ],
+                "resources": graph.resources(skill),
+            }
+            for skill in graph.path(known, target).tolist()
+        ]
+        logger.info(
+            f"Skill path to {graph.names[target]}: {len(steps)} steps in "
+            f"{(time.perf_counter() - start) * 1000:.2f} ms."
+        )
+        return {
+            "target": str(graph.names[target]),
+            "already_known": [str(graph.names[k]) for k in known],
+            "unrecognized_skills": unknown,
+            "steps": steps,
+            "total_hours": round(sum(s["effort_hours"] for s in steps), 1),
+        }
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_USER = "anonymous"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being admitted."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def concurrency_from_quota(
+    tokens_per_minute: int,
+    tokens_per_request: int,
+    request_seconds: float,
+) -> int:
+    """
+    Number of requests that can run at once without exceeding the
+    tokens-per-minute quota of the model deployment.
+
+    A request spends ``tokens_per_request`` tokens over ``request_seconds``,
+    so ``n`` concurrent requests spend ``n * 60 / request_seconds *
+    tokens_per_request`` tokens per minute.
+    """
+    if tokens_per_minute <= 0 or tokens_per_request <= 0:
+        raise ValueError("Quota and tokens per request must be positive.")
+    return max(
+        1,
+        math.floor(
+            tokens_per_minute * request_seconds / (60 * tokens_per_request)
+        ),
+    )
+
+
+class Ticket:
+    """A request waiting for, or holding, an execution slot."""
+
+    def __init__(
+        self, controller: "AdmissionController", user_id: str, deadline: float
+    ) -> None:
+        self.controller = controller
+        self.user_id = user_id
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.granted_at: Optional[float] = None
+        self.released = False
+        self._granted = asyncio.get_running_loop().create_future()
+
+    @property
+    def granted(self) -> bool:
+        return self._granted.done() and not self._granted.cancelled()
+
+    def position(self) -> int:
+        """Number of queued requests that will be admitted before this one."""
+        return self.controller.position(self)
+
+    def _reject(self) -> AdmissionRejected:
+        self.controller.abandon(self)
+        return AdmissionRejected(
+            "Request could not be admitted before its deadline.",
+            retry_after=self.controller.estimated_wait(
+                self.controller.queued
+            ),
+        )
+
+    async def wait(self) -> None:
+        """Wait for a slot, raising AdmissionRejected past the deadline."""
+        async for _ in self.positions(interval=None):
+            pass
+
+    async def positions(
+        self, interval: Optional[float] = 1.0
+    ) -> AsyncIterator[int]:
+        """
+        Yield the queue position every ``interval`` seconds until the
+        ticket is granted a slot.
+
+        Args:
+            interval: Seconds between two position reports, or None to
+                wait silently until the deadline.
+        """
+        try:
+            while not self.granted:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._reject()
+                if interval is not None:
+                    yield self.position()
+                timeout = (
+                    remaining if interval is None
+                    else min(interval, remaining)
+                )
+                await asyncio.wait({self._granted}, timeout=timeout)
+        except asyncio.CancelledError:
+            self.controller.abandon(self)
+            raise
+
+    def release(self) -> None:
+        """Give the slot back, or leave the queue if it was never granted."""
+        if self.released:
+            return
+        self.released = True
+        self.controller.abandon(self)
+
+
+class AdmissionController:
+    """
+    Bounded-concurrency admission with a fair per-user queue.
+
+    At most ``max_concurrency`` requests run at once. Waiting requests are
+    kept in one FIFO per user and admitted round-robin across users, so a
+    single user flooding the API cannot starve the others. Requests whose
+    estimated wait exceeds their deadline are shed up front, and requests
+    still queued when their deadline passes are shed as well.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_size: int,
+        queue_timeout: float,
+        expected_request_seconds: float = 15.0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queues: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        # Exponentially weighted moving average of the time a slot is held.
+        self.avg_request_seconds = expected_request_seconds
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds before the request at ``position`` gets a slot."""
+        return (
+            (position + 1) * self.avg_request_seconds / self.max_concurrency
+        )
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "avg_request_seconds": round(self.avg_request_seconds, 3),
+        }
+
+    def enqueue(
+        self, user_id: Optional[str], timeout: Optional[float] = None
+    ) -> Ticket:
+        """
+        Request a slot for ``user_id``.
+
+        Args:
+            user_id: The user issuing the request, used for fairness.
+            timeout: Seconds the request may wait in the queue, defaults
+                to the controller queue timeout.
+
+        Returns:
+            A ticket, granted immediately when a slot is free.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the estimated wait
+                exceeds the deadline.
+        """
+        user_id = user_id or ANONYMOUS_USER
+        timeout = self.queue_timeout if timeout is None else timeout
+        ticket = Ticket(self, user_id, deadline=time.monotonic() + timeout)
+
+        if self.active < self.max_concurrency and not self.queued:
+            self._grant(ticket)
+            return ticket
+
+        queued = self.queued
+        wait = self.estimated_wait(queued)
+        if queued >= self.max_queue_size or wait > timeout:
+            logger.warning(
+                f"Shedding request from {user_id}: {queued} queued, "
+                f"estimated wait {wait:.1f}s over {timeout:.1f}s deadline."
+            )
+            raise AdmissionRejected(
+                "Server is at capacity, please retry later.",
+                retry_after=wait,
+            )
+
+        self.queues.setdefault(user_id, deque()).append(ticket)
+        logger.info(
+            f"Queued request from {user_id} at position {ticket.position()}."
+        )
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """Position of a queued ticket in the round-robin admission order."""
+        if ticket.granted:
+            return 0
+        queue = self.queues.get(ticket.user_id)
+        if not queue or ticket not in queue:
+            return 0
+        rank = queue.index(ticket)
+        ahead = 0
+        before_user = True
+        for user_id, other in self.queues.items():
+            if user_id == ticket.user_id:
+                before_user = False
+                ahead += rank
+                continue
+            # Each user gets one slot per round; users ahead in the
+            # rotation are also served in the ticket's own round.
+            ahead += min(len(other), rank + 1 if before_user else rank)
+        return ahead
+
+    def abandon(self, ticket: Ticket) -> None:
+        """Release a granted ticket or drop a waiting one from its queue."""
+        if ticket.granted:
+            if ticket.granted_at is not None:
+                held = time.monotonic() - ticket.granted_at
+                self.avg_request_seconds = (
+                    0.8 * self.avg_request_seconds + 0.2 * held
+                )
+                ticket.granted_at = None
+                self.active -= 1
+                self._grant_next()
+            return
+
+        queue = self.queues.get(ticket.user_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self.queues[ticket.user_id]
+        if not ticket._granted.done():
+            ticket._granted.cancel()
+
+    def _grant(self, ticket: Ticket) -> None:
+        self.active += 1
+        ticket.granted_at = time.monotonic()
+        ticket._granted.set_result(True)
+
+    def _grant_next(self) -> None:
+        while self.active < self.max_concurrency and self.queues:
+            user_id, queue = self.queues.popitem(last=False)
+            ticket = queue.popleft()
+            if queue:
+                # Move the user to the back of the rotation.
+                self.queues[user_id] = queue
+            if ticket._granted.done():
+                continue
+            self._grant(ticket)
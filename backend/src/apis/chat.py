@@ -1,32 +1,233 @@
-from typing import AsyncGenerator
+import uuid
+from typing import AsyncGenerator, AsyncIterable, Optional
 
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
 from backend.src.agents.orchestrator_agent.semantic_kernel_agent import \
     ChatAgentHandler
+from backend.src.agents.orchestrator_agent.session_state import (
+    SessionAccessDenied, SessionConflict)
+from backend.src.apis.admission import (AdmissionController,
+                                        AdmissionRejected, Ticket,
+                                        concurrency_from_quota)
+from backend.src.utils.config import Settings
+from backend.src.utils.trace import RequestTrace
+from backend.src.utils.user_token import verify_user_token
 
 app = APIRouter()
 chat_handler = ChatAgentHandler(user_id=None)
 
+if Settings.MAX_CONCURRENT_REQUESTS:
+    max_concurrency = Settings.MAX_CONCURRENT_REQUESTS
+elif Settings.AZURE_OPENAI_TPM_LIMIT:
+    max_concurrency = concurrency_from_quota(
+        tokens_per_minute=(
+            Settings.AZURE_OPENAI_TPM_LIMIT // Settings.WEB_CONCURRENCY
+        ),
+        tokens_per_request=Settings.EXPECTED_TOKENS_PER_REQUEST,
+        request_seconds=Settings.EXPECTED_REQUEST_SECONDS,
+    )
+else:
+    max_concurrency = 8
+
+admission = AdmissionController(
+    max_concurrency=max_concurrency,
+    max_queue_size=Settings.MAX_QUEUED_REQUESTS,
+    queue_timeout=Settings.QUEUE_TIMEOUT_SECONDS,
+    expected_request_seconds=Settings.EXPECTED_REQUEST_SECONDS,
+)
+
 
 class Message(BaseModel):
     text: str
+    session_id: Optional[str] = None
+
+
+def requesting_user(
+    authorization: Optional[str] = Header(default=None),
+) -> Optional[str]:
+    """
+    User vouched for by the frontend with a signed bearer token, None for
+    anonymous requests. A token that does not verify is rejected rather
+    than downgraded to anonymous.
+    """
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    user_id = (
+        verify_user_token(token, Settings.USER_TOKEN_SECRET)
+        if scheme.lower() == "bearer"
+        else None
+    )
+    if user_id is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid user token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(payload).decode()}\n\n"
+
+
+def _forbidden(e: SessionAccessDenied) -> HTTPException:
+    return HTTPException(status_code=403, detail=str(e))
+
+
+def _conflict(e: SessionConflict) -> HTTPException:
+    return HTTPException(status_code=409, detail=str(e))
+
+
+def _admit(user_id: Optional[str]) -> Ticket:
+    try:
+        return admission.enqueue(user_id)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def _learning_path_events(
+    message: Message, user_id: Optional[str]
+) -> AsyncGenerator[str, None]:
+    async for event, payload in chat_handler.handle_learning_path_streaming(
+        message=message.text,
+        session_id=message.session_id,
+        user_id=user_id,
+    ):
+        yield _sse(event, payload)
+
+
+async def _admitted_stream(
+    ticket: Ticket, message: Message, chunks: AsyncIterable[str]
+) -> AsyncGenerator[str, None]:
+    # ``chunks`` is only iterated once the ticket is admitted. The response
+    # releases the ticket as well, in case the stream is never started.
+    try:
+        yield _sse("session", {"session_id": message.session_id})
+        async for position in ticket.positions(
+            interval=Settings.QUEUE_POSITION_INTERVAL_SECONDS
+        ):
+            yield _sse("queue", {"position": position})
+        async for chunk in chunks:
+            yield chunk
+    except AdmissionRejected as e:
+        yield _sse(
+            "error", {"detail": e.reason, "retry_after": e.retry_after}
+        )
+    except (SessionAccessDenied, SessionConflict) as e:
+        yield _sse("error", {"detail": str(e)})
+    finally:
+        ticket.release()
 
 
 @app.post("/ainvoke")
-async def chat_streaming(message: Message):
+async def chat_streaming(
+    message: Message, user_id: Optional[str] = Depends(requesting_user)
+):
+    message.session_id = message.session_id or uuid.uuid4().hex
+    ticket = _admit(user_id)
+    return StreamingResponse(
+        _admitted_stream(
+            ticket,
+            message,
+            chat_handler.handle_message_streaming(
+                message=message.text,
+                session_id=message.session_id,
+                user_id=user_id,
+            ),
+        ),
+        media_type="text/event-stream",
+        background=BackgroundTask(ticket.release),
+    )
+
+
+@app.post("/learning_path/ainvoke")
+async def learning_path_streaming(
+    message: Message, user_id: Optional[str] = Depends(requesting_user)
+):
+    message.session_id = message.session_id or uuid.uuid4().hex
+    ticket = _admit(user_id)
     return StreamingResponse(
-        chat_handler.handle_message_streaming(message=message.text),
+        _admitted_stream(
+            ticket, message, _learning_path_events(message, user_id)
+        ),
         media_type="text/event-stream",
+        background=BackgroundTask(ticket.release),
     )
 
 
 @app.post("/invoke")
-async def chat(message: Message):
-    response, fcc = await chat_handler.handle_message(message.text)
-    return {"response": response, "fcc": fcc}
+async def chat(
+    message: Message, user_id: Optional[str] = Depends(requesting_user)
+):
+    message.session_id = message.session_id or uuid.uuid4().hex
+    trace = RequestTrace(session_id=message.session_id)
+    ticket = _admit(user_id)
+    try:
+        with trace.span("queue", "admission"):
+            await ticket.wait()
+        response, fcc = await chat_handler.handle_message(
+            message.text,
+            session_id=message.session_id,
+            user_id=user_id,
+            trace=trace,
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except SessionAccessDenied as e:
+        raise _forbidden(e)
+    except SessionConflict as e:
+        raise _conflict(e)
+    finally:
+        ticket.release()
+    return {
+        "response": response,
+        "fcc": fcc,
+        "session_id": message.session_id,
+        "trace": trace.model_dump(mode="json"),
+    }
+
+
+@app.delete("/sessions/{session_id}")
+async def end_session(
+    session_id: str, user_id: Optional[str] = Depends(requesting_user)
+):
+    try:
+        await chat_handler.end_session(session_id, user_id)
+    except SessionAccessDenied as e:
+        raise _forbidden(e)
+    return {"message": f"Session {session_id} ended"}
+
+
+@app.get("/sessions/{session_id}/learning_path")
+async def learning_path(
+    session_id: str, user_id: Optional[str] = Depends(requesting_user)
+):
+    try:
+        path = await chat_handler.get_learning_path(session_id, user_id)
+    except SessionAccessDenied as e:
+        raise _forbidden(e)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No learning path.")
+    return path.model_dump()
+
+
+@app.get("/admission")
+async def admission_stats():
+    return admission.stats()
 
 
 @app.post("/cleanup")
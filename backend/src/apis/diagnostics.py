@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from backend.src.llm.routing import get_route_stats
+from backend.src.utils.diagnostics import get_event_loop_monitor
+
+app = APIRouter(prefix="/debug")
+
+
+@app.get("/event_loop")
+async def event_loop_stats(stacks: bool = True, reset: bool = False):
+    monitor = get_event_loop_monitor()
+    stats = monitor.stats(with_stacks=stacks)
+    if reset:
+        monitor.reset()
+    return stats
+
+
+@app.get("/model_routes")
+async def model_route_stats(reset: bool = False):
+    route_stats = get_route_stats()
+    stats = route_stats.stats()
+    if reset:
+        route_stats.reset()
+    return stats
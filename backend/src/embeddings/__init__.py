@@ -0,0 +1,6 @@
+from backend.src.embeddings.azure_openai import AzureOpenAIEmbeddingProvider
+from backend.src.embeddings.base import register_embedding_provider
+from backend.src.embeddings.hashing import HashingEmbeddingProvider
+
+register_embedding_provider("hashing", HashingEmbeddingProvider)
+register_embedding_provider("azure_openai", AzureOpenAIEmbeddingProvider)
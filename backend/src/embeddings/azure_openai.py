@@ -0,0 +1,53 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.src.embeddings.base import BaseEmbeddingProvider
+from backend.src.utils.config import Settings
+
+
+class AzureOpenAIEmbeddingProvider(BaseEmbeddingProvider):
+    """Embeddings of an Azure OpenAI deployment, e.g. text-embedding-3."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        super().__init__(config)
+        # Imported here so the local provider does not load the client.
+        from openai import AsyncAzureOpenAI
+
+        self.deployment = self.config.get(
+            "deployment", "text-embedding-3-small"
+        )
+        self._dimensions = int(self.config.get("dimensions", 1536))
+        # Azure OpenAI accepts up to 2048 inputs per request.
+        self._max_batch_size = int(self.config.get("max_batch_size", 256))
+        self.client = AsyncAzureOpenAI(
+            azure_endpoint=self.config.get(
+                "endpoint", Settings.AZURE_AI_INFERENCE_ENDPOINT
+            ),
+            api_key=self.config.get(
+                "api_key", Settings.AZURE_AI_INFERENCE_API_KEY
+            ),
+            api_version=self.config.get("api_version", "2024-10-21"),
+            max_retries=int(self.config.get("max_retries", 5)),
+        )
+
+    @property
+    def model_id(self) -> str:
+        return f"azure-{self.deployment}-{self._dimensions}"
+
+    @property
+    def dimensions(self) -> int:
+        return self._dimensions
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._max_batch_size
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        response = await self.client.embeddings.create(
+            model=self.deployment,
+            input=texts,
+            dimensions=self._dimensions,
+        )
+        ordered = sorted(response.data, key=lambda item: item.index)
+        return np.array([item.embedding for item in ordered], dtype=np.float32)
@@ -0,0 +1,78 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.src.utils.config import EmbeddingProviderConfig
+
+
+class BaseEmbeddingProvider(ABC):
+    """
+    Base class of the embedding providers.
+
+    Providers turn passages into float32 vectors of ``dimensions`` values
+    and accept up to ``max_batch_size`` passages per call.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        self.config = config or {}
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """
+        Identifies the vectors produced: embeddings are only reused when
+        the model and its dimensions did not change.
+        """
+
+    @property
+    @abstractmethod
+    def dimensions(self) -> int:
+        """Number of values of each vector."""
+
+    @property
+    @abstractmethod
+    def max_batch_size(self) -> int:
+        """Largest number of passages accepted by one call."""
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed at most ``max_batch_size`` passages.
+
+        Returns:
+            A float32 array of shape (len(texts), dimensions).
+        """
+
+
+EMBEDDING_PROVIDER_REGISTRY = {}
+
+
+def register_embedding_provider(provider: str, cls, overwrite=False):
+    """
+    Registers all the available embedding providers.
+
+    Args:
+        provider: The type of the embedding provider to be registered.
+        cls: The embedding provider class to be registered.
+
+    Returns:
+        None
+    """
+    if provider in EMBEDDING_PROVIDER_REGISTRY and not overwrite:
+        taken_by = EMBEDDING_PROVIDER_REGISTRY[provider].__name__
+        raise ValueError(
+            f"Error while registering class {cls.__name__}, {provider} is "
+            f"already taken by {taken_by}"
+        )
+    EMBEDDING_PROVIDER_REGISTRY[provider] = cls
+
+
+def get_embedding_provider_client(
+    config: EmbeddingProviderConfig,
+) -> BaseEmbeddingProvider:
+    if config.provider in EMBEDDING_PROVIDER_REGISTRY:
+        return EMBEDDING_PROVIDER_REGISTRY[config.provider](
+            config=config.config
+        )
+    raise ValueError(f"Unknown embedding provider: {config.provider}")
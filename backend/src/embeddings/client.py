@@ -0,0 +1,16 @@
+from functools import lru_cache
+
+from backend.src.embeddings.base import (BaseEmbeddingProvider,
+                                         get_embedding_provider_client)
+from backend.src.utils.config import load_embedding_provider_config
+
+
+@lru_cache(maxsize=1)
+def get_embedding_provider() -> BaseEmbeddingProvider:
+    """
+    Return the process-wide embedding provider, built on first use.
+
+    Returns:
+        The embedding provider described by EMBEDDING_PROVIDER_CONFIG.
+    """
+    return get_embedding_provider_client(load_embedding_provider_config())
@@ -0,0 +1,56 @@
+import asyncio
+import re
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.src.embeddings.base import BaseEmbeddingProvider
+
+
+class HashingEmbeddingProvider(BaseEmbeddingProvider):
+    """
+    Local embeddings by feature hashing of the words and word pairs.
+
+    No model nor network is needed, so ingestion, retrieval and their
+    benchmarks run offline and deterministically. Passages sharing
+    vocabulary get close vectors; there is no notion of synonyms.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        super().__init__(config)
+        self._dimensions = int(self.config.get("dimensions", 384))
+        self._max_batch_size = int(self.config.get("max_batch_size", 512))
+
+    @property
+    def model_id(self) -> str:
+        return f"hashing-{self._dimensions}"
+
+    @property
+    def dimensions(self) -> int:
+        return self._dimensions
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._max_batch_size
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self._dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(
+                    blake2b(feature.encode(), digest_size=8).digest(), "little"
+                )
+                # The top bit gives the sign, so colliding features tend
+                # to cancel out rather than add up.
+                sign = 1.0 if digest >> 63 else -1.0
+                vectors[row, digest % self._dimensions] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.to_thread(self._embed, texts)
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import logging
+import re
+from html import unescape
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from backend.src.embeddings.base import BaseEmbeddingProvider
+from backend.src.embeddings.client import get_embedding_provider
+from backend.src.embeddings.quantization import DTYPES, dequantize, quantize
+from backend.src.mongodb.base import BaseMetadataStore
+from backend.src.mongodb.client import get_metadata_store
+from backend.src.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_COLLECTION = "embeddings"
+# Hashes looked up per cache query.
+LOOKUP_BATCH_SIZE = 1000
+
+
+def html_to_text(html: str) -> str:
+    return " ".join(unescape(re.sub(r"<[^>]+>", " ", html)).split())
+
+
+def split_passages(
+    text: str,
+    max_words: int = Settings.EMBEDDING_PASSAGE_WORDS,
+    overlap: int = Settings.EMBEDDING_PASSAGE_OVERLAP_WORDS,
+) -> List[str]:
+    """Split a text in passages of ``max_words`` words that overlap."""
+    words = text.split()
+    step = max(max_words - overlap, 1)
+    return [
+        " ".join(words[start : start + max_words])
+        for start in range(0, max(len(words) - overlap, 1), step)
+        if words[start : start + max_words]
+    ]
+
+
+class EmbeddingPipeline:
+    """
+    Embeds passages with a provider, caching the vectors by content hash.
+
+    Passages already embedded by the same model are read back from the
+    ``embeddings`` collection of the metadata store, so a sync only pays
+    for the passages that changed. The others are sent in batches of the
+    provider's maximum size, a bounded number of batches at a time, and
+    stored quantised as soon as each batch returns.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[BaseEmbeddingProvider] = None,
+        metadata_store: Optional[BaseMetadataStore] = None,
+        max_concurrency: int = Settings.EMBEDDING_MAX_CONCURRENCY,
+        dtype: str = Settings.EMBEDDING_DTYPE,
+    ) -> None:
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.provider = provider or get_embedding_provider()
+        self.metadata_store = metadata_store or get_metadata_store()
+        self.dtype = dtype
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def content_hash(self, text: str) -> str:
+        return hashlib.sha256(
+            f"{self.provider.model_id}\n{text}".encode()
+        ).hexdigest()
+
+    async def _load_cached(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        cached = {}
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            async for document in self.metadata_store.iter_documents(
+                EMBEDDINGS_COLLECTION,
+                query={
+                    "_id": {"$in": hashes[start : start + LOOKUP_BATCH_SIZE]}
+                },
+                projection={"vector": 1, "dtype": 1, "scale": 1},
+            ):
+                codes = np.frombuffer(
+                    document["vector"], dtype=DTYPES[document["dtype"]]
+                )
+                cached[document["_id"]] = dequantize(
+                    codes[None, :], np.array([document["scale"]])
+                )[0]
+        return cached
+
+    async def _embed_batch(
+        self, hashes: List[str], texts: List[str]
+    ) -> np.ndarray:
+        async with self._semaphore:
+            vectors = await self.provider.embed(texts)
+        codes, scales = quantize(vectors, self.dtype)
+        await self.metadata_store.bulk_upsert(
+            EMBEDDINGS_COLLECTION,
+            (
+                {
+                    "_id": content_hash,
+                    "model": self.provider.model_id,
+                    "dtype": self.dtype,
+                    "vector": code.tobytes(),
+                    "scale": float(scale),
+                }
+                for content_hash, code, scale in zip(hashes, codes, scales)
+            ),
+            key="_id",
+        )
+        # Return what the cache will give back on the next sync.
+        return dequantize(codes, scales)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed passages, reusing the cached vectors.
+
+        Returns:
+            A float32 array of shape (len(texts), dimensions), in order.
+        """
+        hashes = [self.content_hash(text) for text in texts]
+        unique = list(dict.fromkeys(hashes))
+        vectors = await self._load_cached(unique)
+
+        missing = [h for h in unique if h not in vectors]
+        text_of = dict(zip(hashes, texts))
+        size = self.provider.max_batch_size
+        batches = [missing[i : i + size] for i in range(0, len(missing), size)]
+        results = await asyncio.gather(
+            *(
+                self._embed_batch(batch, [text_of[h] for h in batch])
+                for batch in batches
+            )
+        )
+        for batch, batch_vectors in zip(batches, results):
+            vectors.update(zip(batch, batch_vectors))
+
+        logger.info(
+            f"Embedded {len(missing)} passages in {len(batches)} batches, "
+            f"{len(unique) - len(missing)} from cache."
+        )
+        if not texts:
+            return np.zeros((0, self.provider.dimensions), dtype=np.float32)
+        return np.stack([vectors[h] for h in hashes])
+
+    async def embed_pages(self, pages: Iterable[Dict[str, Any]]) -> int:
+        """
+        Split Confluence pages in passages, embed them and store the
+        passages, with their content hash, on the pages.
+
+        Returns:
+            The number of passages.
+        """
+        documents, texts = [], []
+        for page in pages:
+            passages = split_passages(
+                f"{page['title']}. {html_to_text(page.get('body') or '')}"
+            )
+            documents.append(
+                {
+                    "page_id": page["page_id"],
+                    "passages": [
+                        {
+                            "index": index,
+                            "text": text,
+                            "content_hash": self.content_hash(text),
+                        }
+                        for index, text in enumerate(passages)
+                    ],
+                }
+            )
+            texts.extend(passages)
+        await self.embed(texts)
+        await self.metadata_store.bulk_upsert(
+            "confluence_content", documents, key="page_id"
+        )
+        return len(texts)
@@ -0,0 +1,473 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import Counter
+from functools import lru_cache, reduce
+from typing import (Any, AsyncGenerator, Awaitable, Callable, ClassVar, Dict,
+                    List, Optional)
+
+from pydantic import BaseModel
+from semantic_kernel.connectors.ai.chat_completion_client_base import \
+    ChatCompletionClientBase
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage
+from semantic_kernel.connectors.ai.function_calling_utils import \
+    update_settings_from_function_call_configuration
+from semantic_kernel.connectors.ai.open_ai import \
+    OpenAIChatPromptExecutionSettings
+from semantic_kernel.connectors.ai.prompt_execution_settings import \
+    PromptExecutionSettings
+from semantic_kernel.contents import (AuthorRole, ChatHistory,
+                                      FunctionCallContent,
+                                      FunctionResultContent, TextContent)
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.kernel_content import KernelContent
+from semantic_kernel.contents.streaming_chat_message_content import \
+    StreamingChatMessageContent
+from semantic_kernel.contents.utils.finish_reason import FinishReason
+from semantic_kernel.filters import FunctionInvocationContext
+from semantic_kernel.functions import (FunctionResult, KernelPlugin,
+                                       kernel_function)
+
+from backend.src.llm.fake_chat_completion import stream_message
+from backend.src.utils.config import Settings
+from backend.src.utils.trace import (trace_chat_completion,
+                                     trace_streaming_chat_completion)
+
+logger = logging.getLogger(__name__)
+
+MODES = ("record", "replay", "auto")
+CASSETTE_VERSION = 2
+
+# Values that change from one run to the next without changing the
+# request: session and message ids, and timestamps.
+VOLATILE_PATTERNS = [
+    (
+        re.compile(
+            r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"
+        ),
+        "<id>",
+    ),
+    (re.compile(r"\b[0-9a-f]{32}\b"), "<id>"),
+    (
+        re.compile(
+            r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?"
+            r"(Z|[+-]\d{2}:?\d{2})?\b"
+        ),
+        "<datetime>",
+    ),
+]
+
+
+class CassetteMiss(Exception):
+    """A request was not recorded and the cassette only replays."""
+
+
+def normalize(text: str) -> str:
+    for pattern, replacement in VOLATILE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def canonical_arguments(arguments: Any) -> Any:
+    """Function arguments as a JSON value independent of key order."""
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        except json.JSONDecodeError:
+            return normalize(arguments)
+    return json.loads(normalize(json.dumps(arguments or {}, sort_keys=True)))
+
+
+def request_hash(payload: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def chat_request_key(
+    ai_model_id: str,
+    chat_history: ChatHistory,
+    settings: PromptExecutionSettings,
+) -> str:
+    """
+    Hash of what determines the answer to a chat request: the model, the
+    messages and the response format.
+
+    Function results are represented by the call they answer, their
+    content being replayed from the same cassette, and the tool
+    definitions are left out: they are fixed by the code under test, and
+    the ones of the MCP server are not available offline.
+    """
+    messages = []
+    for message in chat_history.messages:
+        items = []
+        for item in message.items:
+            if isinstance(item, FunctionCallContent):
+                items.append(
+                    {
+                        "call": item.name,
+                        "arguments": canonical_arguments(item.arguments),
+                    }
+                )
+            elif isinstance(item, FunctionResultContent):
+                items.append(
+                    {"result": f"{item.plugin_name}-{item.function_name}"}
+                )
+        messages.append(
+            {
+                "role": message.role.value,
+                "content": normalize(message.content or ""),
+                "items": items,
+            }
+        )
+    response_format = getattr(settings, "response_format", None)
+    if isinstance(response_format, type):
+        response_format = response_format.__name__
+    return request_hash(
+        {
+            "model": ai_model_id,
+            "messages": messages,
+            "response_format": response_format,
+        }
+    )
+
+
+def to_jsonable(value: Any) -> Any:
+    if isinstance(value, KernelContent):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return json.loads(json.dumps(value, default=str))
+
+
+def dump_message(message: ChatMessageContent) -> Dict[str, Any]:
+    usage = message.metadata.get("usage") if message.metadata else None
+    return {
+        "role": message.role.value,
+        "content": message.content or "",
+        "tool_calls": [
+            {"id": item.id, "name": item.name, "arguments": item.arguments}
+            for item in message.items
+            if isinstance(item, FunctionCallContent)
+        ],
+        "finish_reason": (
+            message.finish_reason.value if message.finish_reason else None
+        ),
+        "usage": (
+            {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+            }
+            if usage
+            else None
+        ),
+    }
+
+
+def load_message(
+    recorded: Dict[str, Any], ai_model_id: str
+) -> ChatMessageContent:
+    items = (
+        [TextContent(text=recorded["content"])] if recorded["content"] else []
+    )
+    items += [
+        FunctionCallContent(
+            id=call["id"], name=call["name"], arguments=call["arguments"]
+        )
+        for call in recorded["tool_calls"]
+    ]
+    metadata = {}
+    if recorded["usage"]:
+        metadata["usage"] = CompletionUsage(**recorded["usage"])
+    return ChatMessageContent(
+        role=AuthorRole(recorded["role"]),
+        items=items,
+        ai_model_id=ai_model_id,
+        metadata=metadata,
+        finish_reason=(
+            FinishReason(recorded["finish_reason"])
+            if recorded["finish_reason"]
+            else None
+        ),
+    )
+
+
+class Cassette:
+    """
+    Chat completions and function results recorded to a JSON lines file,
+    keyed by a hash of the normalised request.
+
+    A request recorded several times is replayed in the recorded order,
+    the last answer being repeated once they are used up. The first line
+    holds the version, and each recording is appended as one line, so
+    recording stays cheap as the cassette grows and an interrupted run
+    keeps what it recorded.
+
+    Args:
+        path: The cassette file.
+        mode: "record" starts from an empty cassette and always calls the
+            services, "replay" never calls them and raises CassetteMiss on
+            unknown requests, "auto" replays known requests and records
+            the others.
+    """
+
+    def __init__(self, path: str, mode: str = "auto") -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.interactions: Dict[str, Dict[str, List[Any]]] = {
+            "chat": {},
+            "functions": {},
+        }
+        if mode != "record" and os.path.exists(path):
+            self._load()
+        elif mode == "replay":
+            raise FileNotFoundError(f"No cassette to replay at {path}")
+        else:
+            self._start()
+        self._replayed: Counter = Counter()
+        self.stats: Counter = Counter()
+
+    def lookup(self, kind: str, key: str) -> Optional[Any]:
+        if self.mode == "record":
+            return None
+        recorded = self.interactions[kind].get(key)
+        if not recorded:
+            self.stats[f"{kind}_misses"] += 1
+            if self.mode == "replay":
+                raise CassetteMiss(f"No recorded {kind} request {key[:12]}")
+            return None
+        index = min(self._replayed[key], len(recorded) - 1)
+        self._replayed[key] += 1
+        self.stats[f"{kind}_hits"] += 1
+        return recorded[index]
+
+    def record(self, kind: str, key: str, value: Any) -> None:
+        self.interactions[kind].setdefault(key, []).append(value)
+        self.stats[f"{kind}_recorded"] += 1
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"kind": kind, "key": key, "value": value}))
+            f.write("\n")
+
+    def _start(self) -> None:
+        """Create an empty cassette, replacing any previous one."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            version = json.loads(f.readline() or "{}").get("version")
+            if version != CASSETTE_VERSION:
+                raise ValueError(
+                    f"Cassette {self.path} has version {version}, "
+                    f"expected {CASSETTE_VERSION}: record it again."
+                )
+            line = "\n"
+            for number, line in enumerate(f, 2):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line of an interrupted run may be partial.
+                    logger.warning(
+                        f"Skipped line {number} of cassette {self.path}."
+                    )
+                    continue
+                self.interactions[entry["kind"]].setdefault(
+                    entry["key"], []
+                ).append(entry["value"])
+        if self.mode == "auto" and not line.endswith("\n"):
+            # Recordings must start on a line of their own.
+            with open(self.path, "a") as f:
+                f.write("\n")
+
+    def recorded_functions(self, plugin_name: str) -> List[str]:
+        """Names of the recorded functions of a plugin."""
+        names = {
+            calls[0]["function"]
+            for calls in self.interactions["functions"].values()
+        }
+        return sorted(
+            name.split("-", 1)[1]
+            for name in names
+            if name.startswith(f"{plugin_name}-")
+        )
+
+    def replay_plugin(self, plugin_name: str, description: str = ""):
+        """
+        A plugin with the recorded functions of a plugin that cannot be
+        started offline, such as an MCP server. Their results come from
+        the cassette: the functions themselves are never run.
+        """
+
+        def replayed(name: str):
+            @kernel_function(name=name, description=f"Replayed {name}.")
+            def function() -> str:
+                raise CassetteMiss(f"{plugin_name}-{name} was not recorded")
+
+            return function
+
+        return KernelPlugin(
+            name=plugin_name,
+            description=description,
+            functions=[
+                replayed(name) for name in self.recorded_functions(plugin_name)
+            ],
+        )
+
+    async def function_filter(
+        self,
+        context: FunctionInvocationContext,
+        next: Callable[[FunctionInvocationContext], Awaitable[None]],
+    ) -> None:
+        """
+        function_invocation filter recording and replaying results.
+
+        Calls are keyed by all their arguments rather than by the declared
+        parameters of the function, which replayed functions do not have.
+        """
+        name = f"{context.function.plugin_name}-{context.function.name}"
+        key = request_hash(
+            {
+                "function": name,
+                "arguments": canonical_arguments(
+                    {
+                        key: to_jsonable(value)
+                        for key, value in context.arguments.items()
+                    }
+                ),
+            }
+        )
+        recorded = self.lookup("functions", key)
+        if recorded is not None:
+            context.result = FunctionResult(
+                function=context.function.metadata, value=recorded["value"]
+            )
+            return
+        await next(context)
+        if context.result is not None:
+            self.record(
+                "functions",
+                key,
+                {"function": name, "value": to_jsonable(context.result.value)},
+            )
+
+
+class CassetteChatCompletion(ChatCompletionClientBase):
+    """
+    Chat completion service answering from a cassette, and from the
+    wrapped service for what the cassette does not have, when allowed.
+
+    Without a wrapped service, which is enough to replay, it behaves as an
+    OpenAI chat completion service.
+    """
+
+    SUPPORTS_FUNCTION_CALLING: ClassVar[bool] = True
+
+    cassette: Any
+    inner: Optional[ChatCompletionClientBase] = None
+
+    def get_prompt_execution_settings_class(
+        self,
+    ) -> type[PromptExecutionSettings]:
+        if self.inner is not None:
+            return self.inner.get_prompt_execution_settings_class()
+        return OpenAIChatPromptExecutionSettings
+
+    def _update_function_choice_settings_callback(self):
+        if self.inner is not None:
+            return self.inner._update_function_choice_settings_callback()
+        return update_settings_from_function_call_configuration
+
+    def _reset_function_choice_settings(
+        self, settings: PromptExecutionSettings
+    ) -> None:
+        if self.inner is not None:
+            self.inner._reset_function_choice_settings(settings)
+            return
+        if hasattr(settings, "tool_choice"):
+            settings.tool_choice = None
+        if hasattr(settings, "tools"):
+            settings.tools = None
+
+    def _live(self) -> ChatCompletionClientBase:
+        if self.inner is None:
+            raise CassetteMiss(
+                f"No recorded answer and no service to call for "
+                f"{self.ai_model_id}"
+            )
+        return self.inner
+
+    @trace_chat_completion
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> List[ChatMessageContent]:
+        key = chat_request_key(self.ai_model_id, chat_history, settings)
+        recorded = self.cassette.lookup("chat", key)
+        if recorded is not None:
+            return [load_message(recorded, self.ai_model_id)]
+        messages = await self._live()._inner_get_chat_message_contents(
+            chat_history, settings
+        )
+        self.cassette.record("chat", key, dump_message(messages[0]))
+        return messages
+
+    @trace_streaming_chat_completion
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[List[StreamingChatMessageContent], Any]:
+        key = chat_request_key(self.ai_model_id, chat_history, settings)
+        recorded = self.cassette.lookup("chat", key)
+        if recorded is not None:
+            async for chunks in stream_message(
+                load_message(recorded, self.ai_model_id),
+                function_invoke_attempt,
+            ):
+                yield chunks
+            return
+
+        streamed = []
+        async for (
+            chunks
+        ) in self._live()._inner_get_streaming_chat_message_contents(
+            chat_history, settings, function_invoke_attempt
+        ):
+            streamed.extend(
+                chunk for chunk in chunks if chunk.choice_index == 0
+            )
+            yield chunks
+        if streamed:
+            self.cassette.record(
+                "chat", key, dump_message(reduce(lambda a, b: a + b, streamed))
+            )
+
+
+@lru_cache(maxsize=None)
+def get_cassette() -> Optional[Cassette]:
+    """
+    The process-wide cassette configured in the settings, if any.
+
+    Raises:
+        ValueError: When recording with several workers, each of which
+            would start the cassette anew on its first request.
+    """
+    if not Settings.LLM_CASSETTE_PATH:
+        return None
+    if Settings.LLM_CASSETTE_MODE == "record" and Settings.WEB_CONCURRENCY > 1:
+        raise ValueError(
+            "A cassette can only be recorded with WEB_CONCURRENCY=1, "
+            "use the auto mode to add to it with several workers."
+        )
+    cassette = Cassette(Settings.LLM_CASSETTE_PATH, Settings.LLM_CASSETTE_MODE)
+    logger.info(
+        f"Using the {cassette.mode} cassette {Settings.LLM_CASSETTE_PATH}."
+    )
+    return cassette
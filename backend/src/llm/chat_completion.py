@@ -0,0 +1,169 @@
+import logging
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.connectors.ai.prompt_execution_settings import \
+    PromptExecutionSettings
+from semantic_kernel.contents import ChatHistory, FunctionCallContent
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.streaming_chat_message_content import \
+    StreamingChatMessageContent
+
+from backend.src.llm.prompt_cache import cached_tokens
+from backend.src.llm.rate_limiter import (RateLimiter, get_rate_limiter,
+                                          is_throttled, retry_after_from)
+from backend.src.utils.config import Settings
+from backend.src.utils.tokens import estimate_json_tokens, estimate_tokens
+from backend.src.utils.trace import (trace_chat_completion,
+                                     trace_streaming_chat_completion)
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_request_tokens(
+    chat_history: ChatHistory, settings: PromptExecutionSettings
+) -> int:
+    """
+    Estimate the tokens a chat request is charged against the quota.
+
+    Azure OpenAI counts the prompt (messages and tool definitions) plus
+    the requested completion budget when enforcing tokens-per-minute.
+    """
+    tokens = 0
+    for message in chat_history.messages:
+        tokens += estimate_tokens(message.content or "")
+        for item in message.items:
+            if isinstance(item, FunctionCallContent):
+                tokens += estimate_tokens(str(item.arguments or ""))
+    tools = getattr(settings, "tools", None)
+    if tools:
+        tokens += estimate_json_tokens(tools)
+    max_tokens = (
+        getattr(settings, "max_completion_tokens", None)
+        or getattr(settings, "max_tokens", None)
+        or Settings.EXPECTED_COMPLETION_TOKENS
+    )
+    return tokens + max_tokens
+
+
+def usage_tokens(messages: List[ChatMessageContent]) -> Optional[int]:
+    """Total tokens reported by the service for a response, if any."""
+    for message in messages:
+        usage = message.metadata.get("usage") if message.metadata else None
+        if usage is not None:
+            return (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+    return None
+
+
+class RateLimitedChatCompletionMixin:
+    """
+    Chat completion mixin spending from the deployment rate limiter
+    before each request and retrying throttled requests. The prompt tokens
+    served from the provider's cache are kept in the ``cached_tokens``
+    metadata of the answers.
+
+    Must come before the concrete service class in the bases so that its
+    ``_inner_*`` methods wrap the ones doing the actual HTTP call.
+    """
+
+    def _rate_limiter(self) -> RateLimiter:
+        return get_rate_limiter(self.ai_model_id)
+
+    def _get_metadata_from_chat_response(self, response) -> Dict[str, Any]:
+        metadata = super()._get_metadata_from_chat_response(response)
+        metadata["cached_tokens"] = cached_tokens(response.usage)
+        return metadata
+
+    def _get_metadata_from_streaming_chat_response(
+        self, response
+    ) -> Dict[str, Any]:
+        metadata = super()._get_metadata_from_streaming_chat_response(
+            response
+        )
+        metadata["cached_tokens"] = cached_tokens(response.usage)
+        return metadata
+
+    @trace_chat_completion
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> List[ChatMessageContent]:
+        limiter = self._rate_limiter()
+        estimate = estimate_request_tokens(chat_history, settings)
+        attempt = 0
+        while True:
+            await limiter.acquire(estimate)
+            try:
+                messages = await super()._inner_get_chat_message_contents(
+                    chat_history, settings
+                )
+            except Exception as e:
+                limiter.release(estimate)
+                if not is_throttled(e) or attempt >= limiter.max_retries:
+                    raise
+                delay = limiter.backoff(attempt, retry_after_from(e))
+                logger.warning(
+                    f"{self.ai_model_id} throttled, retry {attempt + 1}/"
+                    f"{limiter.max_retries} in {delay:.2f}s."
+                )
+                limiter.throttled(delay)
+                attempt += 1
+                continue
+            limiter.reconcile(estimate, usage_tokens(messages))
+            return messages
+
+    @trace_streaming_chat_completion
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[List[StreamingChatMessageContent], Any]:
+        limiter = self._rate_limiter()
+        estimate = estimate_request_tokens(chat_history, settings)
+        attempt = 0
+        while True:
+            await limiter.acquire(estimate)
+            started = False
+            actual = None
+            try:
+                async for chunks in (
+                    super()._inner_get_streaming_chat_message_contents(
+                        chat_history, settings, function_invoke_attempt
+                    )
+                ):
+                    started = True
+                    actual = usage_tokens(chunks) or actual
+                    yield chunks
+            except Exception as e:
+                # A stream can only be replayed if nothing was yielded yet,
+                # and is charged once it started.
+                if started:
+                    limiter.reconcile(estimate, actual)
+                    raise
+                limiter.release(estimate)
+                if not is_throttled(e) or attempt >= limiter.max_retries:
+                    raise
+                delay = limiter.backoff(attempt, retry_after_from(e))
+                logger.warning(
+                    f"{self.ai_model_id} throttled, retry {attempt + 1}/"
+                    f"{limiter.max_retries} in {delay:.2f}s."
+                )
+                limiter.throttled(delay)
+                attempt += 1
+                continue
+            limiter.reconcile(estimate, actual)
+            return
+
+
+class RateLimitedAzureChatCompletion(
+    RateLimitedChatCompletionMixin, AzureChatCompletion
+):
+    """AzureChatCompletion aware of the deployment TPM and RPM quotas."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        # Throttled requests are retried by the mixin only, so that every
+        # attempt goes through the limiter.
+        self.client = self.client.with_options(max_retries=0)
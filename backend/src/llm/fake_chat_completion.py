@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict, deque
+from typing import (Any, AsyncGenerator, Callable, ClassVar, Deque, List,
+                    Tuple, Union)
+
+import orjson
+from pydantic import PrivateAttr
+from semantic_kernel.connectors.ai.chat_completion_client_base import \
+    ChatCompletionClientBase
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage
+from semantic_kernel.connectors.ai.function_calling_utils import \
+    update_settings_from_function_call_configuration
+from semantic_kernel.connectors.ai.open_ai import \
+    OpenAIChatPromptExecutionSettings
+from semantic_kernel.connectors.ai.prompt_execution_settings import \
+    PromptExecutionSettings
+from semantic_kernel.contents import (AuthorRole, ChatHistory,
+                                      FunctionCallContent,
+                                      StreamingTextContent)
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.streaming_chat_message_content import \
+    StreamingChatMessageContent
+from semantic_kernel.exceptions import ServiceResponseException
+
+from backend.src.llm.chat_completion import (RateLimitedChatCompletionMixin,
+                                             estimate_request_tokens)
+from backend.src.llm.prompt_cache import (CACHED_TOKENS_INCREMENT,
+                                          MIN_CACHED_TOKENS)
+from backend.src.utils.tokens import estimate_json_tokens, estimate_tokens
+from backend.src.utils.trace import (trace_chat_completion,
+                                     trace_streaming_chat_completion)
+
+Responder = Callable[
+    [ChatHistory, PromptExecutionSettings], Union[str, ChatMessageContent]
+]
+
+
+class FakeRateLimitError(Exception):
+    """Mimics the 429 raised by the OpenAI client when quota is exhausted."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limit exceeded, retry after {retry_after}s.")
+        self.retry_after = retry_after
+
+
+def echo_responder(
+    chat_history: ChatHistory, settings: PromptExecutionSettings
+) -> str:
+    last = next(
+        (
+            message.content
+            for message in reversed(chat_history.messages)
+            if message.role == AuthorRole.USER
+        ),
+        "",
+    )
+    return f"Fake response to: {last}"
+
+
+async def stream_message(
+    answer: ChatMessageContent,
+    function_invoke_attempt: int = 0,
+    chunk_latency: float = 0.0,
+) -> AsyncGenerator[List[StreamingChatMessageContent], Any]:
+    """
+    Stream a complete answer the way the OpenAI connector does: its
+    function calls in one chunk, its text word by word, then its usage.
+    """
+    function_calls = [
+        item for item in answer.items if isinstance(item, FunctionCallContent)
+    ]
+    if function_calls:
+        yield [
+            StreamingChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                choice_index=0,
+                items=function_calls,
+                ai_model_id=answer.ai_model_id,
+                function_invoke_attempt=function_invoke_attempt,
+            )
+        ]
+    words = (answer.content or "").split(" ")
+    for index, word in enumerate(words):
+        if chunk_latency:
+            await asyncio.sleep(chunk_latency)
+        text = word if index == len(words) - 1 else f"{word} "
+        if not text:
+            continue
+        yield [
+            StreamingChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                choice_index=0,
+                items=[StreamingTextContent(choice_index=0, text=text)],
+                ai_model_id=answer.ai_model_id,
+                function_invoke_attempt=function_invoke_attempt,
+            )
+        ]
+    yield [
+        StreamingChatMessageContent(
+            role=AuthorRole.ASSISTANT,
+            choice_index=0,
+            content="",
+            ai_model_id=answer.ai_model_id,
+            metadata={
+                "usage": answer.metadata.get("usage"),
+                "cached_tokens": answer.metadata.get("cached_tokens"),
+            },
+            function_invoke_attempt=function_invoke_attempt,
+        )
+    ]
+
+
+class FakeChatCompletion(ChatCompletionClientBase):
+    """
+    Local chat completion service for tests, load tests and offline runs.
+
+    Answers come from ``responder`` after ``latency`` seconds (a number or
+    a callable sampling a distribution). When ``quota_tpm`` or
+    ``quota_rpm`` are set, the service enforces them over a sliding minute
+    and fails like Azure OpenAI does once they are exhausted. With
+    ``prompt_cache_entries``, it reports the prompt tokens a provider
+    would serve from its prompt cache, keeping that many prompt prefixes.
+    """
+
+    SUPPORTS_FUNCTION_CALLING: ClassVar[bool] = True
+
+    responder: Responder = echo_responder
+    latency: Union[float, Callable[[], float]] = 0.0
+    chunk_latency: float = 0.0
+    quota_tpm: int = 0
+    quota_rpm: int = 0
+    prompt_cache_entries: int = 0
+    calls: int = 0
+    throttled: int = 0
+    _window: Deque[Tuple[float, int]] = PrivateAttr(default_factory=deque)
+    _prefixes: "OrderedDict[str, None]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+
+    def get_prompt_execution_settings_class(
+        self,
+    ) -> type[PromptExecutionSettings]:
+        return OpenAIChatPromptExecutionSettings
+
+    def _update_function_choice_settings_callback(self):
+        return update_settings_from_function_call_configuration
+
+    def _reset_function_choice_settings(
+        self, settings: PromptExecutionSettings
+    ) -> None:
+        if hasattr(settings, "tool_choice"):
+            settings.tool_choice = None
+        if hasattr(settings, "tools"):
+            settings.tools = None
+
+    def _spend_quota(self, tokens: int) -> None:
+        now = time.monotonic()
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+        used = sum(spent for _, spent in self._window)
+        if (self.quota_tpm and used + tokens > self.quota_tpm) or (
+            self.quota_rpm and len(self._window) + 1 > self.quota_rpm
+        ):
+            self.throttled += 1
+            retry_after = 60 - (now - self._window[0][0]) if self._window \
+                else 1.0
+            raise ServiceResponseException(
+                f"{type(self)} service failed to complete the prompt"
+            ) from FakeRateLimitError(round(retry_after, 3))
+        self._window.append((now, tokens))
+
+    def _cached_tokens(
+        self, chat_history: ChatHistory, settings: PromptExecutionSettings
+    ) -> int:
+        """
+        Tokens of the longest prefix of the prompt, its tool definitions
+        then whole messages, that was already sent, counted like the
+        OpenAI deployments do, and remember the prefixes of this prompt.
+        """
+        tools = getattr(settings, "tools", None) or []
+        digest = hashlib.sha256(orjson.dumps(tools, default=str))
+        tokens = estimate_json_tokens(tools) if tools else 0
+        cached = 0
+        for message in chat_history.messages:
+            digest.update(orjson.dumps(message.to_dict(), default=str))
+            tokens += estimate_tokens(message.content or "")
+            tokens += sum(
+                estimate_tokens(str(item.arguments or ""))
+                for item in message.items
+                if isinstance(item, FunctionCallContent)
+            )
+            key = digest.hexdigest()
+            if key in self._prefixes:
+                self._prefixes.move_to_end(key)
+                cached = tokens
+            else:
+                self._prefixes[key] = None
+        while len(self._prefixes) > self.prompt_cache_entries:
+            self._prefixes.popitem(last=False)
+        if cached < MIN_CACHED_TOKENS:
+            return 0
+        return cached // CACHED_TOKENS_INCREMENT * CACHED_TOKENS_INCREMENT
+
+    async def _respond(
+        self, chat_history: ChatHistory, settings: PromptExecutionSettings
+    ) -> ChatMessageContent:
+        prompt_tokens = estimate_request_tokens(chat_history, settings)
+        self._spend_quota(prompt_tokens)
+        self.calls += 1
+        delay = self.latency() if callable(self.latency) else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+
+        answer = self.responder(chat_history, settings)
+        if isinstance(answer, str):
+            answer = ChatMessageContent(
+                role=AuthorRole.ASSISTANT, content=answer
+            )
+        answer.ai_model_id = self.ai_model_id
+        answer.metadata["usage"] = CompletionUsage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=estimate_tokens(answer.content or ""),
+        )
+        if self.prompt_cache_entries:
+            answer.metadata["cached_tokens"] = self._cached_tokens(
+                chat_history, settings
+            )
+        return answer
+
+    @trace_chat_completion
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> List[ChatMessageContent]:
+        return [await self._respond(chat_history, settings)]
+
+    @trace_streaming_chat_completion
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[List[StreamingChatMessageContent], Any]:
+        answer = await self._respond(chat_history, settings)
+        async for chunks in stream_message(
+            answer, function_invoke_attempt, self.chunk_latency
+        ):
+            yield chunks
+
+
+class RateLimitedFakeChatCompletion(
+    RateLimitedChatCompletionMixin, FakeChatCompletion
+):
+    """Fake service behind the client-side rate limiter."""
+
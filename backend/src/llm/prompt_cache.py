@@ -0,0 +1,39 @@
+from typing import Any, Callable, Optional
+
+# Prompt tokens below which the OpenAI deployments do not cache, and the
+# steps the cached prefix grows by beyond.
+MIN_CACHED_TOKENS = 1024
+CACHED_TOKENS_INCREMENT = 128
+
+
+def cached_tokens(usage: Any) -> Optional[int]:
+    """
+    Prompt tokens read from the provider's prompt cache, from the usage of
+    an OpenAI response, None when the service does not report them.
+
+    The Semantic Kernel usage only keeps the prompt and completion tokens.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None)
+
+
+def sorted_tools(callback: Callable[..., None]) -> Callable[..., None]:
+    """
+    Wrap the callback writing the functions offered to the model into the
+    request settings, so that they are offered in name order.
+
+    Tool definitions come before the messages in the cached prompt prefix:
+    ordered by name, the same functions are the same bytes whatever the
+    order the plugins, or the MCP server's tools, were loaded in, and
+    requests of every worker share the cached prefix.
+    """
+
+    def update(configuration, settings, choice_type) -> None:
+        if configuration.available_functions:
+            configuration.available_functions = sorted(
+                configuration.available_functions,
+                key=lambda function: function.fully_qualified_name,
+            )
+        callback(configuration, settings, choice_type)
+
+    return update
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Optional
+
+from backend.src.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously up to its capacity.
+
+    Spending is done by reservation: the amount is deducted immediately,
+    possibly driving the balance negative, and the caller is told how long
+    to wait before the bucket is back in credit. Callers therefore queue up
+    in arrival order instead of all waking up at once when tokens return.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.balance = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.balance = min(
+            self.capacity,
+            self.balance + (now - self.updated_at) * self.refill_per_second,
+        )
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Deduct ``amount`` and return the seconds to wait before using it.
+        """
+        self._refill()
+        self.balance -= min(amount, self.capacity)
+        if self.balance >= 0:
+            return 0.0
+        return -self.balance / self.refill_per_second
+
+    def refund(self, amount: float) -> None:
+        """Give back (or, if negative, take) tokens after the fact."""
+        self._refill()
+        self.balance = min(self.capacity, self.balance + amount)
+
+
+class RateLimiter:
+    """
+    Client-side limiter for one model deployment.
+
+    Requests spend from a tokens-per-minute and a requests-per-minute
+    bucket before being sent. When the service still answers with a
+    throttling error, every caller sharing the limiter is paused until the
+    advertised retry delay has elapsed.
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: int,
+        requests_per_minute: int,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        self.tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+            if tokens_per_minute
+            else None
+        )
+        self.requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60)
+            if requests_per_minute
+            else None
+        )
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.blocked_until = 0.0
+        self.throttled_count = 0
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until ``tokens`` can be spent without exceeding the quota."""
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if wait > 0:
+            logger.info(f"Rate limiter delaying request by {wait:.2f}s.")
+            await asyncio.sleep(wait)
+
+    def reconcile(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token bucket with the usage reported by the service."""
+        if self.tokens and actual is not None:
+            self.tokens.refund(estimated - actual)
+
+    def release(self, tokens: int) -> None:
+        """
+        Give back the tokens of a request the service rejected, e.g. as
+        throttled, which the quota does not charge.
+        """
+        if self.tokens:
+            self.tokens.refund(tokens)
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """
+        Delay before retrying a throttled request: exponential backoff
+        with full jitter, never shorter than the server's Retry-After.
+        """
+        ceiling = min(self.max_backoff, self.base_backoff * 2**attempt)
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def throttled(self, delay: float) -> None:
+        """Pause every caller of this limiter for ``delay`` seconds."""
+        self.throttled_count += 1
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+
+def is_throttled(error: BaseException) -> bool:
+    """Whether an exception, or one of its causes, is an HTTP 429."""
+    while error is not None:
+        if (
+            getattr(error, "status_code", None) == 429
+            or type(error).__name__ == "RateLimitError"
+        ):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_after_from(error: BaseException) -> Optional[float]:
+    """Extract the Retry-After delay, in seconds, from a throttling error."""
+    while error is not None:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return float(retry_after)
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            try:
+                return float(headers["retry-after"])
+            except ValueError:
+                return None
+        error = error.__cause__ or error.__context__
+    return None
+
+
+RATE_LIMITERS: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(deployment_name: str) -> RateLimiter:
+    """
+    Return the limiter of a deployment, shared by every service instance
+    of the process that targets it. Each worker process gets its share of
+    the deployment quota, from MODEL_QUOTAS or else the default one.
+    """
+    if deployment_name not in RATE_LIMITERS:
+        tokens_per_minute, requests_per_minute = Settings.MODEL_QUOTAS.get(
+            deployment_name,
+            (Settings.AZURE_OPENAI_TPM_LIMIT, Settings.AZURE_OPENAI_RPM_LIMIT),
+        )
+        RATE_LIMITERS[deployment_name] = RateLimiter(
+            tokens_per_minute=tokens_per_minute // Settings.WEB_CONCURRENCY,
+            requests_per_minute=(
+                requests_per_minute // Settings.WEB_CONCURRENCY
+            ),
+            max_retries=Settings.RATE_LIMIT_MAX_RETRIES,
+        )
+    return RATE_LIMITERS[deployment_name]
@@ -0,0 +1,382 @@
+import time
+from collections import deque
+from functools import lru_cache
+from typing import (Any, AsyncGenerator, ClassVar, Deque, Dict, List, Optional,
+                    Tuple)
+
+from pydantic import Field
+from semantic_kernel.connectors.ai.chat_completion_client_base import \
+    ChatCompletionClientBase
+from semantic_kernel.connectors.ai.completion_usage import CompletionUsage
+from semantic_kernel.connectors.ai.prompt_execution_settings import \
+    PromptExecutionSettings
+from semantic_kernel.contents import (AuthorRole, ChatHistory,
+                                      FunctionCallContent)
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.contents.streaming_chat_message_content import \
+    StreamingChatMessageContent
+
+from backend.src.llm.prompt_cache import sorted_tools
+from backend.src.utils.config import Settings
+from backend.src.utils.diagnostics import percentile
+from backend.src.utils.request_context import current_model_route
+
+FAST = "fast"
+LARGE = "large"
+# Kinds of LLM calls: the Profile Builder questioning the learner, the
+# Host choosing the tools of a turn and the Host writing its answer.
+PROFILE_ROUTE = "profile"
+TOOL_SELECTION_ROUTE = "tool_selection"
+SYNTHESIS_ROUTE = "synthesis"
+
+
+def classify(
+    chat_history: ChatHistory, settings: PromptExecutionSettings
+) -> str:
+    """
+    Route of a Host call: tool selection when it may call tools and has
+    nothing but the learner's message to go on, synthesis once tool
+    results are in or when a structured answer is expected.
+    """
+    if getattr(settings, "response_format", None) is not None:
+        return SYNTHESIS_ROUTE
+    last = chat_history.messages[-1] if chat_history.messages else None
+    if getattr(settings, "tools", None) and (
+        last is None or last.role == AuthorRole.USER
+    ):
+        return TOOL_SELECTION_ROUTE
+    return SYNTHESIS_ROUTE
+
+
+def usage_cost(
+    deployment: str, prompt_tokens: int, completion_tokens: int
+) -> Optional[float]:
+    """Cost of a call from the MODEL_PRICES, None for unpriced models."""
+    prices = Settings.MODEL_PRICES.get(deployment)
+    if prices is None:
+        return None
+    prompt_price, completion_price = prices
+    return (
+        prompt_tokens * prompt_price + completion_tokens * completion_price
+    ) / 1_000_000
+
+
+def _usage_metadata(messages: List[ChatMessageContent]) -> Dict[str, Any]:
+    """Metadata of the answer carrying the usage, empty if none does."""
+    for message in messages:
+        if message.metadata and message.metadata.get("usage") is not None:
+            return message.metadata
+    return {}
+
+
+class RouteUsage:
+    """What the calls of one route to one deployment took and cost."""
+
+    def __init__(self, max_samples: int) -> None:
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cost: Optional[float] = None
+        self.latencies: Deque[float] = deque(maxlen=max_samples)
+        self.first_chunks: Deque[float] = deque(maxlen=max_samples)
+
+
+class RouteStats:
+    """
+    Calls, latency, tokens and cost of the LLM calls per route and
+    deployment, since the start of the process or the last reset.
+    """
+
+    def __init__(self, max_samples: int = 10000) -> None:
+        self.max_samples = max_samples
+        self.routes: Dict[Tuple[str, str], RouteUsage] = {}
+
+    def record(
+        self,
+        route: str,
+        deployment: str,
+        latency: float,
+        usage: Optional[CompletionUsage] = None,
+        cached_tokens: Optional[int] = None,
+        first_chunk: Optional[float] = None,
+        failed: bool = False,
+    ) -> None:
+        """
+        Account for one call.
+
+        Args:
+            latency: Seconds until the whole answer was received.
+            usage: Tokens reported by the service, if any.
+            cached_tokens: Prompt tokens served from the prompt cache.
+            first_chunk: Seconds until the first chunk of a stream.
+            failed: Whether the call raised.
+        """
+        entry = self.routes.get((route, deployment))
+        if entry is None:
+            entry = self.routes[(route, deployment)] = RouteUsage(
+                self.max_samples
+            )
+        entry.calls += 1
+        entry.latencies.append(round(latency * 1000, 1))
+        if first_chunk is not None:
+            entry.first_chunks.append(round(first_chunk * 1000, 1))
+        if failed:
+            entry.failures += 1
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        entry.prompt_tokens += prompt_tokens
+        entry.completion_tokens += completion_tokens
+        entry.cached_tokens += cached_tokens or 0
+        cost = usage_cost(deployment, prompt_tokens, completion_tokens)
+        if cost is not None:
+            entry.cost = (entry.cost or 0.0) + cost
+
+    def reset(self) -> None:
+        self.routes.clear()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Latency percentiles in milliseconds, tokens, share of the prompt
+        tokens served from the prompt cache and cost per route.
+        """
+        return [
+            {
+                "route": route,
+                "deployment": deployment,
+                "calls": entry.calls,
+                "failures": entry.failures,
+                "prompt_tokens": entry.prompt_tokens,
+                "completion_tokens": entry.completion_tokens,
+                "cached_tokens": entry.cached_tokens,
+                "cache_hit_rate": (
+                    round(entry.cached_tokens / entry.prompt_tokens, 3)
+                    if entry.prompt_tokens
+                    else None
+                ),
+                "cost": (
+                    round(entry.cost, 6) if entry.cost is not None else None
+                ),
+                "latency_ms": {
+                    f"p{q}": percentile(list(entry.latencies), q)
+                    for q in (50, 95)
+                },
+                "first_chunk_ms": {
+                    f"p{q}": percentile(list(entry.first_chunks), q)
+                    for q in (50, 95)
+                },
+            }
+            for (route, deployment), entry in sorted(self.routes.items())
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_route_stats() -> RouteStats:
+    """Return the process-wide accounting of the model routes."""
+    return RouteStats()
+
+
+class RoutedChatCompletion(ChatCompletionClientBase):
+    """
+    Chat completion service sending each call to the deployment of its
+    route, as set by the MODEL_ROUTES rules, and accounting for it.
+
+    Calls are routed one by one, so the tool selection and the synthesis
+    of a same turn can be answered by different deployments. A tool
+    selection answered by the fast deployment without any tool call is
+    asked again to the large one, which then writes the answer. A service
+    with a fixed ``route`` sends all its calls there, e.g. the one of the
+    Profile Builder. Functions are offered to the model in name order.
+
+    Args:
+        services: Service of each tier, "fast" and "large". The "large"
+            one answers the routes of tiers without a service.
+        rules: Tier of each route.
+        route: Route of every call, classified one by one when None.
+    """
+
+    SUPPORTS_FUNCTION_CALLING: ClassVar[bool] = True
+
+    services: Dict[str, ChatCompletionClientBase]
+    rules: Dict[str, str] = Field(default_factory=dict)
+    route: Optional[str] = None
+    stats: Any = Field(default_factory=get_route_stats)
+
+    def get_prompt_execution_settings_class(
+        self,
+    ) -> type[PromptExecutionSettings]:
+        return self.services[LARGE].get_prompt_execution_settings_class()
+
+    def _update_function_choice_settings_callback(self):
+        large = self.services[LARGE]
+        return sorted_tools(large._update_function_choice_settings_callback())
+
+    def _reset_function_choice_settings(
+        self, settings: PromptExecutionSettings
+    ) -> None:
+        self.services[LARGE]._reset_function_choice_settings(settings)
+
+    def _select(
+        self, chat_history: ChatHistory, settings: PromptExecutionSettings
+    ) -> Tuple[str, ChatCompletionClientBase, PromptExecutionSettings]:
+        route = self.route or classify(chat_history, settings)
+        service = self.services.get(
+            self.rules.get(route, LARGE), self.services[LARGE]
+        )
+        # The OpenAI services keep the model of the first call in the
+        # settings, which the function calling loop passes to every call.
+        return (
+            route,
+            service,
+            settings.model_copy(update={"ai_model_id": service.ai_model_id}),
+        )
+
+    def _escalates(
+        self,
+        route: str,
+        service: ChatCompletionClientBase,
+        messages: List[ChatMessageContent],
+    ) -> bool:
+        """
+        Whether a fast tool selection answered without calling a tool: the
+        answer to the learner is then left to the large deployment.
+        """
+        return (
+            route == TOOL_SELECTION_ROUTE
+            and service is not self.services[LARGE]
+            and not any(
+                isinstance(item, FunctionCallContent)
+                for message in messages
+                for item in message.items
+            )
+        )
+
+    def _large(
+        self, settings: PromptExecutionSettings
+    ) -> Tuple[ChatCompletionClientBase, PromptExecutionSettings]:
+        large = self.services[LARGE]
+        return large, settings.model_copy(
+            update={"ai_model_id": large.ai_model_id}
+        )
+
+    async def _call(
+        self,
+        route: str,
+        service: ChatCompletionClientBase,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> List[ChatMessageContent]:
+        previous = current_model_route.get()
+        current_model_route.set(route)
+        start = time.perf_counter()
+        try:
+            messages = await service._inner_get_chat_message_contents(
+                chat_history, settings
+            )
+        except Exception:
+            self.stats.record(
+                route,
+                service.ai_model_id,
+                time.perf_counter() - start,
+                failed=True,
+            )
+            raise
+        finally:
+            current_model_route.set(previous)
+        metadata = _usage_metadata(messages)
+        self.stats.record(
+            route,
+            service.ai_model_id,
+            time.perf_counter() - start,
+            usage=metadata.get("usage"),
+            cached_tokens=metadata.get("cached_tokens"),
+        )
+        return messages
+
+    async def _stream(
+        self,
+        route: str,
+        service: ChatCompletionClientBase,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        function_invoke_attempt: int,
+    ) -> AsyncGenerator[List[StreamingChatMessageContent], Any]:
+        previous = current_model_route.get()
+        current_model_route.set(route)
+        start = time.perf_counter()
+        first_chunk = None
+        metadata: Dict[str, Any] = {}
+        try:
+            async for (
+                chunks
+            ) in service._inner_get_streaming_chat_message_contents(
+                chat_history, settings, function_invoke_attempt
+            ):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                metadata = _usage_metadata(chunks) or metadata
+                yield chunks
+        except Exception:
+            self.stats.record(
+                route,
+                service.ai_model_id,
+                time.perf_counter() - start,
+                first_chunk=first_chunk,
+                failed=True,
+            )
+            raise
+        finally:
+            # Not a token reset: the stream may be closed in another context.
+            current_model_route.set(previous)
+        self.stats.record(
+            route,
+            service.ai_model_id,
+            time.perf_counter() - start,
+            usage=metadata.get("usage"),
+            cached_tokens=metadata.get("cached_tokens"),
+            first_chunk=first_chunk,
+        )
+
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+    ) -> List[ChatMessageContent]:
+        route, service, routed = self._select(chat_history, settings)
+        messages = await self._call(route, service, chat_history, routed)
+        if self._escalates(route, service, messages):
+            large, routed = self._large(settings)
+            messages = await self._call(route, large, chat_history, routed)
+        return messages
+
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: PromptExecutionSettings,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[List[StreamingChatMessageContent], Any]:
+        route, service, routed = self._select(chat_history, settings)
+        stream = self._stream(
+            route, service, chat_history, routed, function_invoke_attempt
+        )
+        if route != TOOL_SELECTION_ROUTE or service is self.services[LARGE]:
+            async for chunks in stream:
+                yield chunks
+            return
+        # A fast tool selection is held back until it is known to call
+        # tools, so that no text of an escalated answer reaches the user.
+        buffered = [chunks async for chunks in stream]
+        if not self._escalates(
+            route, service, [chunk for chunks in buffered for chunk in chunks]
+        ):
+            for chunks in buffered:
+                yield chunks
+            return
+        large, routed = self._large(settings)
+        async for chunks in self._stream(
+            route, large, chat_history, routed, function_invoke_attempt
+        ):
+            yield chunks
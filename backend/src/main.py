@@ -1,11 +1,35 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 
 from backend.src.apis.chat import app as invoke
+from backend.src.utils.config import Settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not Settings.DIAGNOSTICS_ENABLED:
+        yield
+        return
+    from backend.src.utils.diagnostics import get_event_loop_monitor
+
+    monitor = get_event_loop_monitor()
+    monitor.start()
+    try:
+        yield
+    finally:
+        await monitor.stop()
 
-app = FastAPI(title="Learning Path Assistant")
+
+app = FastAPI(title="Learning Path Assistant", lifespan=lifespan)
 app.include_router(invoke)
 
+if Settings.DIAGNOSTICS_ENABLED:
+    from backend.src.apis.diagnostics import app as diagnostics
+
+    app.include_router(diagnostics)
+
 
 @app.get("/")
 async def root():
@@ -13,4 +37,10 @@ async def root():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8080, log_level="info")
\ No newline at end of file
+    uvicorn.run(
+        "backend.src.main:app",
+        host="0.0.0.0",
+        port=8080,
+        log_level="info",
+        workers=Settings.WEB_CONCURRENCY,
+    )
@@ -1,4 +1,6 @@
+from backend.src.mongodb.async_mongo import AsyncMongoMetadataStore
 from backend.src.mongodb.base import register_metadata_store
 from backend.src.mongodb.mongo import MongoMetadataStore
 
 register_metadata_store("mongo", MongoMetadataStore)
+register_metadata_store("async_mongo", AsyncMongoMetadataStore)
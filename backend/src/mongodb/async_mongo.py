@@ -0,0 +1,168 @@
+import logging
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from pymongo import AsyncMongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from backend.src.mongodb.base import BaseMetadataStore
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMongoMetadataStore(BaseMetadataStore):
+    """
+    MongoDB Metadata Store on the native asyncio driver.
+
+    Unlike ``MongoMetadataStore`` no call is offloaded to a thread: every
+    query is awaited on the event loop. The connection pool, timeouts and
+    read preference are read from the store config:
+
+        {
+            "uri": "mongodb+srv://...",
+            "db_name": "LearningAgent",
+            "max_pool_size": 50,
+            "min_pool_size": 0,
+            "max_idle_time_ms": 60000,
+            "wait_queue_timeout_ms": 2000,
+            "server_selection_timeout_ms": 5000,
+            "connect_timeout_ms": 5000,
+            "socket_timeout_ms": 10000,
+            "read_preference": "primaryPreferred"
+        }
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        self.config = config
+        # The client connects lazily on the first query, so the store can be
+        # built at import time, before any event loop is running.
+        self.client = AsyncMongoClient(
+            config["uri"],
+            maxPoolSize=config.get("max_pool_size", 50),
+            minPoolSize=config.get("min_pool_size", 0),
+            maxIdleTimeMS=config.get("max_idle_time_ms", 60000),
+            waitQueueTimeoutMS=config.get("wait_queue_timeout_ms", 2000),
+            serverSelectionTimeoutMS=config.get(
+                "server_selection_timeout_ms", 5000
+            ),
+            connectTimeoutMS=config.get("connect_timeout_ms", 5000),
+            socketTimeoutMS=config.get("socket_timeout_ms", 10000),
+            readPreference=config.get("read_preference", "primaryPreferred"),
+            appname=config.get("app_name", "learning-path-assistant"),
+        )
+
+        db_name = config.get("db_name", "LearningAgent")
+        self.db = self.client[db_name]
+        self.users = self.db["users"]
+        self.confluence_content = self.db["confluence_content"]
+        self.sessions = self.db["sessions"]
+
+    async def ping(self) -> bool:
+        try:
+            await self.client.admin.command("ping")
+            logger.info(
+                "Pinged your deployment.You successfully connected to MongoDB"
+            )
+            return True
+        except Exception as e:
+            logger.error(e)
+            return False
+
+    async def load_session(self, session_id: str) -> Optional[bytes]:
+        document = await self.sessions.find_one(
+            {"_id": session_id}, {"payload": 1}
+        )
+        return document["payload"] if document else None
+
+    async def save_session(
+        self,
+        session_id: str,
+        user_id: Optional[str],
+        payload: bytes,
+        version: int,
+    ) -> bool:
+        # A new session is inserted, which fails on the key if another turn
+        # created it first; sessions saved before versioning have none.
+        try:
+            result = await self.sessions.update_one(
+                {
+                    "_id": session_id,
+                    "version": version or {"$exists": False},
+                },
+                {
+                    "$set": {
+                        "user_id": user_id,
+                        "payload": payload,
+                        "version": version + 1,
+                        "updated_at": datetime.now(),
+                    }
+                },
+                upsert=not version,
+            )
+        except DuplicateKeyError:
+            return False
+        return bool(result.matched_count or result.upserted_id)
+
+    async def delete_session(self, session_id: str) -> None:
+        await self.sessions.delete_one({"_id": session_id})
+
+    async def load_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        document = await self.users.find_one({"_id": user_id}, {"profile": 1})
+        return document.get("profile") if document else None
+
+    async def update_profile(
+        self, user_id: str, fields: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Only the given fields are written, so concurrent sessions of the
+        # same user each keep the fields they updated.
+        update = {f"profile.{key}": value for key, value in fields.items()}
+        document = await self.users.find_one_and_update(
+            {"_id": user_id},
+            {"$set": update},
+            projection={"profile": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return document["profile"]
+
+    async def iter_documents(
+        self,
+        collection: str,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self.db[collection].find(
+            query or {}, projection, batch_size=batch_size
+        )
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            await cursor.close()
+
+    async def bulk_upsert(
+        self,
+        collection: str,
+        documents: Iterable[Dict[str, Any]],
+        key: str,
+        batch_size: int = 500,
+    ) -> int:
+        written = 0
+        documents = iter(documents)
+        while batch := list(islice(documents, batch_size)):
+            await self.db[collection].bulk_write(
+                [
+                    UpdateOne(
+                        {key: document[key]}, {"$set": document}, upsert=True
+                    )
+                    for document in batch
+                ],
+                ordered=False,
+            )
+            written += len(batch)
+        return written
+
+    async def close(self) -> None:
+        await self.client.close()
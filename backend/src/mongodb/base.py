@@ -1,10 +1,79 @@
-from abc import ABC
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
 
 from backend.src.utils.config import MetadataStoreConfig
 
 
 class BaseMetadataStore(ABC):
-    pass
+    """
+    Base class of the metadata stores.
+
+    Besides the Confluence content, the store holds the serialized state of
+    the conversations so that any worker can resume any session.
+    """
+
+    @abstractmethod
+    async def load_session(self, session_id: str) -> Optional[bytes]:
+        """Return the serialized state of a session, None if unknown."""
+
+    @abstractmethod
+    async def save_session(
+        self,
+        session_id: str,
+        user_id: Optional[str],
+        payload: bytes,
+        version: int,
+    ) -> bool:
+        """
+        Save the serialized state of a session as ``version + 1``, only if
+        the stored state is still at ``version`` (0 for a new session).
+
+        Returns:
+            False if another turn saved the session first.
+        """
+
+    @abstractmethod
+    async def delete_session(self, session_id: str) -> None:
+        """Forget a session."""
+
+    @abstractmethod
+    async def load_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the learner profile of a user, None if unknown."""
+
+    @abstractmethod
+    async def update_profile(
+        self, user_id: str, fields: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Set the given fields of a user's profile, creating it if needed,
+        and return the whole updated profile.
+        """
+
+    @abstractmethod
+    def iter_documents(
+        self,
+        collection: str,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the documents of a collection matching ``query`` without
+        loading them all in memory.
+        """
+
+    @abstractmethod
+    async def bulk_upsert(
+        self,
+        collection: str,
+        documents: Iterable[Dict[str, Any]],
+        key: str,
+        batch_size: int = 500,
+    ) -> int:
+        """
+        Insert or replace the fields of ``documents`` matched on ``key``,
+        in unordered batches. Returns the number of documents written.
+        """
 
 
 METADATA_STORE_REGISTRY = {}
@@ -1,5 +1,24 @@
-from backend.src.mongodb.base import get_metadata_store_client
+from functools import lru_cache
+
+from backend.src.mongodb.base import (BaseMetadataStore,
+                                      get_metadata_store_client)
 from backend.src.utils.config import settings
 
-METADATA_STORE_CLIENT = get_metadata_store_client(
-    config=settings.METADATA_STORE_CONFIG)
+
+@lru_cache(maxsize=1)
+def get_metadata_store() -> BaseMetadataStore:
+    """
+    Return the process-wide metadata store, built on first use.
+
+    Returns:
+        The metadata store described by METADATA_STORE_CONFIG.
+    """
+    return get_metadata_store_client(config=settings.METADATA_STORE_CONFIG)
+
+
+def __getattr__(name: str):
+    # Keeps `from backend.src.mongodb.client import METADATA_STORE_CLIENT`
+    # working while the store is only built when first asked for.
+    if name == "METADATA_STORE_CLIENT":
+        return get_metadata_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,11 @@
+import asyncio
 import logging
-from typing import Any, Dict
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
 
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from pymongo.mongo_client import MongoClient
 
 from backend.src.mongodb.base import BaseMetadataStore
@@ -26,3 +31,109 @@ class MongoMetadataStore(BaseMetadataStore):
         self.db = self.client[db_name]
         self.users = self.db["users"]
         self.confluence_content = self.db["confluence_content"]
+        self.sessions = self.db["sessions"]
+
+    async def load_session(self, session_id: str) -> Optional[bytes]:
+        document = await asyncio.to_thread(
+            self.sessions.find_one, {"_id": session_id}, {"payload": 1}
+        )
+        return document["payload"] if document else None
+
+    async def save_session(
+        self,
+        session_id: str,
+        user_id: Optional[str],
+        payload: bytes,
+        version: int,
+    ) -> bool:
+        # A new session is inserted, which fails on the key if another turn
+        # created it first; sessions saved before versioning have none.
+        try:
+            result = await asyncio.to_thread(
+                self.sessions.update_one,
+                {
+                    "_id": session_id,
+                    "version": version or {"$exists": False},
+                },
+                {
+                    "$set": {
+                        "user_id": user_id,
+                        "payload": payload,
+                        "version": version + 1,
+                        "updated_at": datetime.now(),
+                    }
+                },
+                upsert=not version,
+            )
+        except DuplicateKeyError:
+            return False
+        return bool(result.matched_count or result.upserted_id)
+
+    async def delete_session(self, session_id: str) -> None:
+        await asyncio.to_thread(self.sessions.delete_one, {"_id": session_id})
+
+    async def load_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        document = await asyncio.to_thread(
+            self.users.find_one, {"_id": user_id}, {"profile": 1}
+        )
+        return document.get("profile") if document else None
+
+    async def update_profile(
+        self, user_id: str, fields: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Only the given fields are written, so concurrent sessions of the
+        # same user each keep the fields they updated.
+        update = {f"profile.{key}": value for key, value in fields.items()}
+        document = await asyncio.to_thread(
+            self.users.find_one_and_update,
+            {"_id": user_id},
+            {"$set": update},
+            projection={"profile": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return document["profile"]
+
+    async def iter_documents(
+        self,
+        collection: str,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self.db[collection].find(
+            query or {}, projection, batch_size=batch_size
+        )
+        try:
+            while True:
+                batch = await asyncio.to_thread(
+                    lambda: list(islice(cursor, batch_size))
+                )
+                for document in batch:
+                    yield document
+                if len(batch) < batch_size:
+                    return
+        finally:
+            cursor.close()
+
+    async def bulk_upsert(
+        self,
+        collection: str,
+        documents: Iterable[Dict[str, Any]],
+        key: str,
+        batch_size: int = 500,
+    ) -> int:
+        written = 0
+        documents = iter(documents)
+        while batch := list(islice(documents, batch_size)):
+            operations = [
+                UpdateOne(
+                    {key: document[key]}, {"$set": document}, upsert=True
+                )
+                for document in batch
+            ]
+            await asyncio.to_thread(
+                self.db[collection].bulk_write, operations, ordered=False
+            )
+            written += len(batch)
+        return written
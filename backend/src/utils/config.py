@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Optional
 
 import orjson
@@ -17,6 +18,55 @@ class MetadataStoreConfig(BaseModel):
     config: Optional[dict] = None
 
 
+@lru_cache(maxsize=1)
+def load_metadata_store_config() -> MetadataStoreConfig:
+    """
+    Parse the METADATA_STORE_CONFIG environment variable.
+
+    Returns:
+        The validated metadata store configuration.
+    """
+    config = os.getenv("METADATA_STORE_CONFIG", "")
+    if not config:
+        raise ValueError("METADATA_STORE_CONFIG is not set")
+    try:
+        return MetadataStoreConfig.model_validate(orjson.loads(config))
+    except Exception as e:
+        raise ValueError(f"METADATA_STORE_CONFIG is invalid: {e}")
+
+
+class LazyMetadataStoreConfig:
+    """Class attribute resolving the metadata store config on access."""
+
+    def __get__(self, instance, owner) -> MetadataStoreConfig:
+        return load_metadata_store_config()
+
+
+class EmbeddingProviderConfig(BaseModel):
+    """
+    Embedding provider configuration
+    """
+
+    provider: str
+    config: Optional[dict] = None
+
+
+@lru_cache(maxsize=1)
+def load_embedding_provider_config() -> EmbeddingProviderConfig:
+    """
+    Parse the EMBEDDING_PROVIDER_CONFIG environment variable, defaulting
+    to the local hashing provider so ingestion also runs offline.
+
+    Returns:
+        The validated embedding provider configuration.
+    """
+    config = os.getenv("EMBEDDING_PROVIDER_CONFIG") or '{"provider":"hashing"}'
+    try:
+        return EmbeddingProviderConfig.model_validate(orjson.loads(config))
+    except Exception as e:
+        raise ValueError(f"EMBEDDING_PROVIDER_CONFIG is invalid: {e}")
+
+
 class Settings():
     CONFLUENCE_URL = os.getenv("CONFLUENCE_URL")
     CONFLUENCE_USERNAME = os.getenv("CONFLUENCE_USERNAME")
@@ -46,17 +96,194 @@ class Settings():
         "AZURE_SEARCH_API_KEY", "azure-search-api-key"
     )
 
-    METADATA_STORE_CONFIG: MetadataStoreConfig = os.getenv(
-        "METADATA_STORE_CONFIG", "")
+    TOOL_ROUTER_ENABLED = (
+        os.getenv("TOOL_ROUTER_ENABLED", "true").lower() == "true"
+    )
+    TOOL_ROUTER_TOP_K = int(os.getenv("TOOL_ROUTER_TOP_K") or "8")
+    TOOL_ROUTER_ALWAYS_INCLUDE = [
+        name.strip()
+        for name in os.getenv(
+            "TOOL_ROUTER_ALWAYS_INCLUDE",
+            "internal_content_rag-retrieve_documents,"
+            "google_calendar_plugin-GetCurrentDateTime",
+        ).split(",")
+        if name.strip()
+    ]
 
-    if not METADATA_STORE_CONFIG:
-        raise ValueError("METADATA_STORE_CONFIG is not set")
-    try:
-        METADATA_STORE_CONFIG = MetadataStoreConfig.model_validate(
-            orjson.loads(METADATA_STORE_CONFIG)
+    AZURE_OPENAI_TPM_LIMIT = int(os.getenv("AZURE_OPENAI_TPM_LIMIT") or "0")
+    AZURE_OPENAI_RPM_LIMIT = int(os.getenv("AZURE_OPENAI_RPM_LIMIT") or "0")
+    RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES") or "5")
+    EXPECTED_COMPLETION_TOKENS = int(
+        os.getenv("EXPECTED_COMPLETION_TOKENS") or "1000"
+    )
+    EXPECTED_TOKENS_PER_REQUEST = int(
+        os.getenv("EXPECTED_TOKENS_PER_REQUEST") or "8000"
+    )
+    EXPECTED_REQUEST_SECONDS = float(
+        os.getenv("EXPECTED_REQUEST_SECONDS") or "15"
+    )
+    MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS") or "0")
+    MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS") or "100")
+    QUEUE_TIMEOUT_SECONDS = float(os.getenv("QUEUE_TIMEOUT_SECONDS") or "60")
+    QUEUE_POSITION_INTERVAL_SECONDS = float(
+        os.getenv("QUEUE_POSITION_INTERVAL_SECONDS") or "1"
+    )
+
+    # Quotas above are for the whole deployment and are split between the
+    # worker processes.
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY") or "1")
+    SESSION_MAX_TOOL_TRACES = int(
+        os.getenv("SESSION_MAX_TOOL_TRACES") or "50"
+    )
+    SESSION_TOOL_ARGUMENTS_CHARS = int(
+        os.getenv("SESSION_TOOL_ARGUMENTS_CHARS") or "500"
+    )
+    # Stored learner profiles older than this are built again.
+    PROFILE_MAX_AGE_DAYS = int(os.getenv("PROFILE_MAX_AGE_DAYS") or "180")
+
+    GOOGLE_CREDENTIALS_FILE = os.getenv(
+        "GOOGLE_CREDENTIALS_FILE", "credentials.json"
+    )
+    GOOGLE_TOKEN_DIRECTORY = os.getenv(
+        "GOOGLE_TOKEN_DIRECTORY", ".google_tokens"
+    )
+    GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS = float(
+        os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN_SECONDS") or "300"
+    )
+    GOOGLE_TOKEN_REFRESH_INTERVAL_SECONDS = float(
+        os.getenv("GOOGLE_TOKEN_REFRESH_INTERVAL_SECONDS") or "60"
+    )
+
+    GMAIL_SEND_WORKERS = int(os.getenv("GMAIL_SEND_WORKERS") or "4")
+    GMAIL_RESUMABLE_THRESHOLD_BYTES = int(
+        os.getenv("GMAIL_RESUMABLE_THRESHOLD_BYTES") or "1000000"
+    )
+
+    DATE_PARSER_LANGUAGES = [
+        language.strip()
+        for language in os.getenv("DATE_PARSER_LANGUAGES", "en,fr").split(",")
+        if language.strip()
+    ]
+
+    # Skill graph built offline by backend.src.agents.skill_graph.build.
+    SKILL_GRAPH_PATH = os.getenv("SKILL_GRAPH_PATH") or "skill_graph.npz"
+    SKILL_GRAPH_SPEC = os.getenv("SKILL_GRAPH_SPEC") or os.path.join(
+        os.path.dirname(os.path.dirname(__file__)),
+        "agents/skill_graph/data/skills.json",
+    )
+
+    EMBEDDINGS_ENABLED = (
+        os.getenv("EMBEDDINGS_ENABLED", "true").lower() == "true"
+    )
+    EMBEDDING_MAX_CONCURRENCY = int(
+        os.getenv("EMBEDDING_MAX_CONCURRENCY") or "4"
+    )
+    # "float16" or "int8" (one scale per vector).
+    EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE") or "float16"
+    EMBEDDING_PASSAGE_WORDS = int(
+        os.getenv("EMBEDDING_PASSAGE_WORDS") or "200"
+    )
+    EMBEDDING_PASSAGE_OVERLAP_WORDS = int(
+        os.getenv("EMBEDDING_PASSAGE_OVERLAP_WORDS") or "40"
+    )
+
+    # retrieve_documents fetches this many pages, reranks their passages
+    # and keeps the best ones within the token budget.
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES") or "20")
+    RETRIEVAL_TOKEN_BUDGET = int(
+        os.getenv("RETRIEVAL_TOKEN_BUDGET") or "1500"
+    )
+    RETRIEVAL_MAX_PASSAGES_PER_PAGE = int(
+        os.getenv("RETRIEVAL_MAX_PASSAGES_PER_PAGE") or "1"
+    )
+
+    # Record/replay of the LLM and tool calls, off when no path is set.
+    # "record" starts a new cassette, "replay" never calls the services and
+    # "auto" replays what was recorded and records the rest. Recording
+    # needs a single worker.
+    LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH") or ""
+    LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE") or "auto"
+
+    # Event loop lag sampling and detection of the calls blocking the loop,
+    # exposed on /debug/event_loop when enabled.
+    DIAGNOSTICS_ENABLED = (
+        os.getenv("DIAGNOSTICS_ENABLED", "false").lower() == "true"
+    )
+    DIAGNOSTICS_LOOP_INTERVAL_SECONDS = float(
+        os.getenv("DIAGNOSTICS_LOOP_INTERVAL_SECONDS") or "0.05"
+    )
+    DIAGNOSTICS_BLOCKING_THRESHOLD_SECONDS = float(
+        os.getenv("DIAGNOSTICS_BLOCKING_THRESHOLD_SECONDS") or "0.1"
+    )
+    DIAGNOSTICS_MAX_EVENTS = int(os.getenv("DIAGNOSTICS_MAX_EVENTS") or "50")
+
+    # Characters of the inputs and outputs kept in the request traces.
+    TRACE_PREVIEW_CHARS = int(os.getenv("TRACE_PREVIEW_CHARS") or "300")
+
+    # Functions called with the topic of a learning request while the Host
+    # plans, their results served when the model asks for the same topic.
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_FUNCTIONS = [
+        name.strip()
+        for name in os.getenv(
+            "PREFETCH_FUNCTIONS",
+            "internal_content_rag-retrieve_documents,"
+            "learning_path_building_external_content_web-search_web",
+        ).split(",")
+        if name.strip()
+    ]
+    PREFETCH_MIN_OVERLAP = float(os.getenv("PREFETCH_MIN_OVERLAP") or "0.5")
+
+    # Model routing: each kind of LLM call, the Profile Builder
+    # ("profile"), the Host choosing its tools ("tool_selection") and the
+    # Host writing its answer ("synthesis"), goes to the "fast" or the
+    # "large" deployment. Without a fast deployment, all go to the large
+    # one, MODEL_DEPLOYMENT_NAME.
+    # The tool selection stays on the large deployment by default: a fast
+    # one that calls no tool, as on most follow-up turns, is asked again
+    # to the large one, and streamed answers wait for it. That costs a fast
+    # call on top of the large one and delays the first token.
+    FAST_MODEL_DEPLOYMENT_NAME = os.getenv("FAST_MODEL_DEPLOYMENT_NAME")
+    MODEL_ROUTES = {
+        route.strip(): tier.strip()
+        for route, tier in (
+            rule.split(":", 1)
+            for rule in os.getenv(
+                "MODEL_ROUTES",
+                "profile:fast,tool_selection:large,synthesis:large",
+            ).split(",")
+            if rule.strip()
         )
-    except Exception as e:
-        raise ValueError(f"METADATA_STORE_CONFIG is invalid: {e}")
+    }
+    # Prices in any currency per million prompt and completion tokens, as
+    # deployment:prompt:completion, for the cost of each route.
+    MODEL_PRICES = {
+        deployment.strip(): (float(prompt), float(completion))
+        for deployment, prompt, completion in (
+            price.split(":")
+            for price in os.getenv("MODEL_PRICES", "").split(",")
+            if price.strip()
+        )
+    }
+    # Quota of each deployment in tokens and requests per minute, as
+    # deployment:tpm:rpm. Deployments not listed get the
+    # AZURE_OPENAI_TPM_LIMIT and AZURE_OPENAI_RPM_LIMIT of the large one.
+    MODEL_QUOTAS = {
+        deployment.strip(): (int(tpm or "0"), int(rpm or "0"))
+        for deployment, tpm, rpm in (
+            quota.split(":")
+            for quota in os.getenv("MODEL_QUOTAS", "").split(",")
+            if quota.strip()
+        )
+    }
+
+    # Secret shared with the frontend, which signs the identity of the
+    # logged-in user. Without it every request is anonymous.
+    USER_TOKEN_SECRET = os.getenv("USER_TOKEN_SECRET") or ""
+
+    # Parsed on first access so that importing the settings never fails
+    # nor pays for the validation when the metadata store is not used.
+    METADATA_STORE_CONFIG: MetadataStoreConfig = LazyMetadataStoreConfig()
 
 
 settings = Settings()
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from backend.src.utils.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Frames of the blocked thread kept, innermost last.
+MAX_STACK_FRAMES = 30
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, ``q`` between 0 and 100."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+class EventLoopMonitor:
+    """
+    Measures the lag of an event loop and catches what blocks it.
+
+    A task on the loop sleeps ``interval`` seconds at a time and records
+    how late it wakes up. A watchdog thread checks that the task keeps
+    waking up: when the loop has not run it for ``threshold`` seconds, the
+    stack of the loop thread is captured, which points at the blocking
+    call, e.g. synchronous I/O in a plugin. The stall is logged and kept
+    with its duration once the loop resumes.
+
+    Args:
+        interval: Seconds between two lag samples.
+        threshold: Seconds the loop may be held before a stall is reported.
+        max_samples: Lag samples kept for the percentiles.
+        max_events: Stalls kept, the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        interval: float = Settings.DIAGNOSTICS_LOOP_INTERVAL_SECONDS,
+        threshold: float = Settings.DIAGNOSTICS_BLOCKING_THRESHOLD_SECONDS,
+        max_samples: int = 10000,
+        max_events: int = Settings.DIAGNOSTICS_MAX_EVENTS,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=max_samples)
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._beat = 0
+        self._beat_at = 0.0
+        self._open_event: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._beat_at = time.monotonic()
+        self._task = self._loop.create_task(
+            self._sample(), name="event-loop-monitor"
+        )
+        self._watchdog = threading.Thread(
+            target=self._watch, name="event-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        logger.info(
+            f"Monitoring the event loop every {self.interval * 1000:.0f} ms, "
+            f"reporting stalls over {self.threshold * 1000:.0f} ms."
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def reset(self) -> None:
+        """Forget the samples and stalls, e.g. between two load tests."""
+        with self._lock:
+            self.lags.clear()
+            self.events.clear()
+            self.stalls = 0
+            self.max_lag_ms = 0.0
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(loop.time() - start - self.interval, 0.0) * 1000
+            with self._lock:
+                self.lags.append(lag_ms)
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+                self._beat += 1
+                self._beat_at = time.monotonic()
+                if self._open_event is not None:
+                    self._open_event["duration_ms"] = round(lag_ms, 1)
+                    self._open_event = None
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            with self._lock:
+                beat, beat_at = self._beat, self._beat_at
+            held = time.monotonic() - beat_at - self.interval
+            if held < self.threshold or beat == reported:
+                continue
+            reported = beat
+            event = self._capture(held)
+            with self._lock:
+                # The loop may have resumed while the stack was captured.
+                if self._beat == beat:
+                    self._open_event = event
+                self.events.append(event)
+                self.stalls += 1
+            logger.warning(
+                f"Event loop blocked for over {held * 1000:.0f} ms in "
+                f"{event['task'] or 'a callback'}:\n" + "".join(event["stack"])
+            )
+
+    def _capture(self, held: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        task = asyncio.current_task(self._loop)
+        return {
+            "at": time.time(),
+            "held_ms": round(held * 1000, 1),
+            # Filled in when the loop runs the monitor again.
+            "duration_ms": None,
+            "task": task.get_name() if task is not None else None,
+            "coroutine": (
+                getattr(task.get_coro(), "__qualname__", None)
+                if task is not None
+                else None
+            ),
+            "stack": stack[-MAX_STACK_FRAMES:],
+        }
+
+    def stats(self, with_stacks: bool = True) -> Dict[str, Any]:
+        """
+        Lag percentiles in milliseconds and the stalls caught so far.
+
+        Args:
+            with_stacks: Include the captured stacks of the stalls.
+        """
+        with self._lock:
+            lags = list(self.lags)
+            events = [dict(event) for event in self.events]
+            stalls = self.stalls
+            max_lag_ms = self.max_lag_ms
+        if not with_stacks:
+            for event in events:
+                del event["stack"]
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "samples": len(lags),
+            "lag_ms": {
+                **{f"p{q}": percentile(lags, q) for q in (50, 95, 99)},
+                "max": max_lag_ms,
+            },
+            "stalls": stalls,
+            "events": events,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_event_loop_monitor() -> EventLoopMonitor:
+    """Return the process-wide event loop monitor."""
+    return EventLoopMonitor()
@@ -0,0 +1,32 @@
+import re
+from typing import List
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for",
+    "from", "give", "how", "i", "in", "is", "it", "me", "my", "of", "on",
+    "or", "please", "the", "this", "to", "used", "using", "want", "what",
+    "with", "you", "your",
+}
+
+_CAMEL_CASE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase, lightly stemmed keywords.
+
+    CamelCase and snake_case identifiers are split so that function names
+    such as ``CreateCalendarEvent`` or ``search_web`` match plain words.
+    """
+    text = _CAMEL_CASE.sub(" ", text or "").lower()
+    words = []
+    for word in _WORD.findall(text):
+        if word in STOPWORDS:
+            continue
+        for suffix in ("ing", "es", "s"):
+            if len(word) > len(suffix) + 2 and word.endswith(suffix):
+                word = word[: -len(suffix)]
+                break
+        words.append(word)
+    return words
@@ -0,0 +1,31 @@
+from contextvars import ContextVar
+from typing import Any, Optional
+
+# User on whose behalf the current request is served. Set by the chat
+# handler and read by the plugins acting on the user's own accounts.
+current_user_id: ContextVar[Optional[str]] = ContextVar(
+    "current_user_id", default=None
+)
+
+# Session state of the current request, for the plugins working from what
+# the conversation already produced.
+current_session: ContextVar[Optional[Any]] = ContextVar(
+    "current_session", default=None
+)
+
+# Trace of the current request, recording its LLM and tool calls.
+current_trace: ContextVar[Optional[Any]] = ContextVar(
+    "current_trace", default=None
+)
+
+# Calls prefetched for the current request, served to the model by the
+# prefetch function filter.
+current_prefetch: ContextVar[Optional[Any]] = ContextVar(
+    "current_prefetch", default=None
+)
+
+# Route of the LLM call being made, e.g. "tool_selection", set by the
+# routed chat completion service.
+current_model_route: ContextVar[Optional[str]] = ContextVar(
+    "current_model_route", default=None
+)
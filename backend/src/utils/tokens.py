@@ -0,0 +1,28 @@
+from typing import Any
+
+import orjson
+
+# Rough average for English prose and JSON schemas with the GPT tokenizers.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text without a tokenizer.
+
+    Args:
+        text: The text to measure.
+
+    Returns:
+        The estimated token count.
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_json_tokens(payload: Any) -> int:
+    """
+    Estimate the number of tokens of a payload once serialized as JSON.
+    """
+    return estimate_tokens(orjson.dumps(payload, default=str).decode())
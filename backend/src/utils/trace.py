@@ -0,0 +1,298 @@
+import functools
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import (Any, AsyncGenerator, Awaitable, Callable, Dict, Iterator,
+                    List, Optional)
+
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
+
+from backend.src.utils.config import Settings
+from backend.src.utils.request_context import (current_model_route,
+                                               current_trace)
+
+# Span the code currently runs in, parent of the spans it starts.
+_current_span: ContextVar[Optional["TraceSpan"]] = ContextVar(
+    "current_span", default=None
+)
+
+
+def preview(value: Any) -> str:
+    text = value if isinstance(value, str) else str(value)
+    limit = Settings.TRACE_PREVIEW_CHARS
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+class TraceSpan(BaseModel):
+    """
+    One step of a request: an LLM call, a tool call or the admission
+    wait. Times are milliseconds from the start of the request.
+    """
+
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    kind: str
+    name: str
+    start_ms: float
+    end_ms: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    # Prompt tokens served from the provider's prompt cache.
+    cached_tokens: Optional[int] = None
+    input_chars: int = 0
+    output_chars: int = 0
+    input_preview: str = ""
+    output_preview: str = ""
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+
+    @computed_field
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ms is None:
+            return None
+        return round(self.end_ms - self.start_ms, 1)
+
+
+class RequestTrace(BaseModel):
+    """
+    Timeline of the LLM and tool calls made while serving one request.
+
+    The trace of the running request is held in ``current_trace``, so the
+    chat services and the function filter record into it without it being
+    passed around, and concurrent requests never share one.
+    """
+
+    trace_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    session_id: Optional[str] = None
+    started_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+    duration_ms: Optional[float] = None
+    spans: List[TraceSpan] = Field(default_factory=list)
+    _origin: float = PrivateAttr(default_factory=time.perf_counter)
+
+    def now_ms(self) -> float:
+        return round((time.perf_counter() - self._origin) * 1000, 1)
+
+    @contextmanager
+    def span(self, kind: str, name: str, **fields) -> Iterator[TraceSpan]:
+        """
+        Record the enclosed code as a span, child of the enclosing one.
+
+        The span is marked with the error the code raised, if any.
+        """
+        parent = _current_span.get()
+        span = TraceSpan(
+            kind=kind,
+            name=name,
+            parent_id=parent.id if parent is not None else None,
+            start_ms=self.now_ms(),
+            **fields,
+        )
+        self.spans.append(span)
+        _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = repr(e)
+            raise
+        finally:
+            # Not a token reset: a stream closed by the garbage collector
+            # ends its span in another context.
+            _current_span.set(parent)
+            span.end_ms = self.now_ms()
+
+    def finish(self) -> "RequestTrace":
+        self.duration_ms = self.now_ms()
+        return self
+
+    def summary(self) -> str:
+        """One line per span, indented under its parent, for the logs."""
+        children: Dict[Optional[str], List[TraceSpan]] = {}
+        for span in self.spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        lines = [f"Trace {self.trace_id}: {self.duration_ms} ms"]
+
+        def add(parent_id: Optional[str], depth: int) -> None:
+            for span in children.get(parent_id, []):
+                tokens = (
+                    f", {span.prompt_tokens}+{span.completion_tokens} tokens"
+                    if span.prompt_tokens is not None
+                    else ""
+                )
+                if span.cached_tokens:
+                    tokens += f" ({span.cached_tokens} cached)"
+                route = (
+                    f" ({span.attributes['route']})"
+                    if "route" in span.attributes
+                    else ""
+                )
+                lines.append(
+                    f"{'  ' * depth}- {span.kind} {span.name}{route}: "
+                    f"{span.duration_ms} ms at {span.start_ms} ms{tokens}, "
+                    f"{span.input_chars} chars in, {span.output_chars} out"
+                    + (f", {span.error}" if span.error else "")
+                )
+                add(span.id, depth + 1)
+
+        add(None, 1)
+        return "\n".join(lines)
+
+
+@contextmanager
+def trace_span(
+    kind: str, name: str, **fields
+) -> Iterator[Optional[TraceSpan]]:
+    """Span of the current request's trace, nothing outside of a request."""
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(kind, name, **fields) as span:
+        yield span
+
+
+def annotate_span(**attributes) -> None:
+    """Add attributes to the span the code runs in, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def _untraced_llm_call() -> bool:
+    # Services wrapping another one, like the cassette, make one call.
+    span = _current_span.get()
+    return current_trace.get() is None or (
+        span is not None and span.kind == "llm"
+    )
+
+
+def _request_fields(chat_history) -> Dict[str, Any]:
+    last = chat_history.messages[-1] if chat_history.messages else None
+    attributes: Dict[str, Any] = {"messages": len(chat_history.messages)}
+    if current_model_route.get() is not None:
+        attributes["route"] = current_model_route.get()
+    return {
+        "input_chars": sum(
+            len(str(item)) for m in chat_history.messages for item in m.items
+        ),
+        "input_preview": (
+            preview(" ".join(str(item) for item in last.items)) if last else ""
+        ),
+        "attributes": attributes,
+    }
+
+
+def _record_response(span: TraceSpan, messages: List[Any]) -> None:
+    from semantic_kernel.contents import FunctionCallContent
+
+    content = "".join(message.content or "" for message in messages)
+    calls = [
+        item.name
+        for message in messages
+        for item in message.items
+        if isinstance(item, FunctionCallContent) and item.name
+    ]
+    span.output_chars = len(content) + sum(
+        len(str(item.arguments or ""))
+        for message in messages
+        for item in message.items
+        if isinstance(item, FunctionCallContent)
+    )
+    span.output_preview = preview(content) if content else ", ".join(calls)
+    if calls:
+        span.attributes["function_calls"] = calls
+    for message in messages:
+        usage = message.metadata.get("usage") if message.metadata else None
+        if usage is not None:
+            span.prompt_tokens = usage.prompt_tokens
+            span.completion_tokens = usage.completion_tokens
+            span.cached_tokens = message.metadata.get("cached_tokens")
+
+
+def trace_chat_completion(
+    func: Callable[..., Awaitable[List[Any]]],
+) -> Callable[..., Awaitable[List[Any]]]:
+    """Record the ``_inner_get_chat_message_contents`` calls of a service."""
+
+    @functools.wraps(func)
+    async def wrapper(self, chat_history, settings, *args, **kwargs):
+        if _untraced_llm_call():
+            return await func(self, chat_history, settings, *args, **kwargs)
+        with current_trace.get().span(
+            "llm", self.ai_model_id, **_request_fields(chat_history)
+        ) as span:
+            messages = await func(
+                self, chat_history, settings, *args, **kwargs
+            )
+            _record_response(span, messages)
+            return messages
+
+    return wrapper
+
+
+def trace_streaming_chat_completion(
+    func: Callable[..., AsyncGenerator[List[Any], Any]],
+) -> Callable[..., AsyncGenerator[List[Any], Any]]:
+    """
+    Record the ``_inner_get_streaming_chat_message_contents`` calls of a
+    service, with the time to their first chunk.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, chat_history, settings, *args, **kwargs):
+        if _untraced_llm_call():
+            async for chunks in func(
+                self, chat_history, settings, *args, **kwargs
+            ):
+                yield chunks
+            return
+        trace = current_trace.get()
+        with trace.span(
+            "llm", self.ai_model_id, **_request_fields(chat_history)
+        ) as span:
+            streamed = []
+            async for chunks in func(
+                self, chat_history, settings, *args, **kwargs
+            ):
+                if "first_chunk_ms" not in span.attributes:
+                    span.attributes["first_chunk_ms"] = round(
+                        trace.now_ms() - span.start_ms, 1
+                    )
+                streamed.extend(
+                    chunk for chunk in chunks if chunk.choice_index == 0
+                )
+                yield chunks
+            _record_response(span, streamed)
+
+    return wrapper
+
+
+async def trace_filter(
+    context,
+    next: Callable[[Any], Awaitable[None]],
+) -> None:
+    """function_invocation filter recording the tool calls of a request."""
+    if current_trace.get() is None:
+        await next(context)
+        return
+    arguments = {
+        parameter.name: context.arguments[parameter.name]
+        for parameter in context.function.metadata.parameters
+        if parameter.name in context.arguments
+    }
+    with trace_span(
+        "tool",
+        f"{context.function.plugin_name}-{context.function.name}",
+        input_chars=len(str(arguments)),
+        input_preview=preview(arguments),
+    ) as span:
+        await next(context)
+        if context.result is not None:
+            output = str(context.result.value)
+            span.output_chars = len(output)
+            span.output_preview = preview(output)
@@ -1,4 +1,10 @@
+import base64
+import hashlib
+import hmac
+import json
 import logging
+import os
+import time
 from typing import AsyncGenerator
 
 import httpx
@@ -6,6 +12,34 @@ import requests
 
 logger = logging.getLogger("routes")
 
+# Lifetime of the identity tokens, signed anew for each request.
+USER_TOKEN_TTL_SECONDS = 300
+
+
+def auth_headers(user_id: str | None) -> dict:
+    """
+    Vouch for the logged-in user with a token signed with the secret
+    shared with the backend, which ignores any unsigned identity.
+    """
+    secret = os.getenv("USER_TOKEN_SECRET")
+    if not user_id or not secret:
+        return {}
+    encoded = base64.urlsafe_b64encode(user_id.encode()).decode()
+    payload = f"{encoded}.{int(time.time() + USER_TOKEN_TTL_SECONDS)}"
+    signature = hmac.new(
+        secret.encode(), payload.encode(), hashlib.sha256
+    ).hexdigest()
+    return {"Authorization": f"Bearer {payload}.{signature}"}
+
+
+def busy(response) -> dict:
+    """Reply of the backend when it sheds a request, with its retry delay."""
+    return {
+        "busy": True,
+        "detail": response.json().get("detail", ""),
+        "retry_after": response.headers.get("Retry-After"),
+    }
+
 
 def root():
     url = "http://localhost:8080/"
@@ -18,10 +52,18 @@ def root():
         return None
 
 
-def chat(message: str):
+def chat(
+    message: str, user_id: str | None = None, session_id: str | None = None
+):
     url = "http://localhost:8080/invoke"
     try:
-        response = requests.post(url, json={"text": message})
+        response = requests.post(
+            url,
+            json={"text": message, "session_id": session_id},
+            headers=auth_headers(user_id),
+        )
+        if response.status_code == 429:
+            return busy(response)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -40,12 +82,49 @@ def cleanup():
         return None
 
 
-async def chat_streaming(message: str) -> AsyncGenerator[str, None]:
+async def chat_streaming(
+    message: str, user_id: str | None = None, session_id: str | None = None
+) -> AsyncGenerator[str, None]:
     url = "http://localhost:8000/ainvoke"
     async with httpx.AsyncClient(timeout=None) as client:
         async with client.stream(
-            "POST", url, json={"text": message}
+            "POST",
+            url,
+            json={"text": message, "session_id": session_id},
+            headers=auth_headers(user_id),
         ) as response:
             async for line in response.aiter_lines():
                 if line.strip():
                     yield line
+
+
+async def learning_path_streaming(
+    message: str, user_id: str | None = None, session_id: str | None = None
+) -> AsyncGenerator[tuple[str, dict], None]:
+    url = "http://localhost:8080/learning_path/ainvoke"
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream(
+            "POST",
+            url,
+            json={"text": message, "session_id": session_id},
+            headers=auth_headers(user_id),
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                if response.status_code == 429:
+                    yield "busy", busy(response)
+                else:
+                    logger.error(
+                        f"Learning path request failed: {response.status_code}"
+                    )
+                    yield "error", {
+                        "detail": "The learning path could not be built."
+                    }
+                return
+            event = "message"
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    yield event, json.loads(line[len("data: "):])
+                    event = "message"
@@ -1,14 +1,21 @@
 import hashlib
 import json
 import logging
+from datetime import datetime, timedelta
 
 import chainlit as cl
 
-from apis.routes import chat
+from apis.routes import chat, learning_path_streaming
 
 logging.basicConfig(level=logging.INFO)
 
 
+def busy_message(reply: dict) -> str:
+    retry_after = reply.get("retry_after")
+    delay = f" in {retry_after} s" if retry_after else " later"
+    return f"The agent is busy, please retry{delay}."
+
+
 def load_users_from_file() -> list:
     logging.info("Loading users from file")
     with open("data/users.json", "r") as f:
@@ -45,34 +52,166 @@ async def on_chat_resume(thread):
     pass
 
 
-@cl.step(type="tool", show_input=True)
-async def tool():
-    await cl.sleep(2)
-    return cl.user_session.get("fcc")
+STEP_TYPES = {"llm": "llm", "tool": "tool"}
+
+
+def describe_span(span: dict) -> str:
+    details = [f"{span['duration_ms']:.0f} ms"]
+    if "route" in span["attributes"]:
+        details.append(f"{span['attributes']['route']} route")
+    if "first_chunk_ms" in span["attributes"]:
+        details.append(
+            f"first chunk after {span['attributes']['first_chunk_ms']:.0f} ms"
+        )
+    if span["prompt_tokens"] is not None:
+        details.append(
+            f"{span['prompt_tokens']} prompt + "
+            f"{span['completion_tokens']} completion tokens"
+        )
+    if span.get("cached_tokens"):
+        details.append(f"{span['cached_tokens']} prompt tokens cached")
+    details.append(
+        f"{span['input_chars']} chars in, {span['output_chars']} out"
+    )
+    return " · ".join(details)
+
+
+async def show_trace(trace: dict, parent_id: str) -> None:
+    """
+    Render the LLM and tool calls of a request as nested steps under a
+    message, with the timings they had on the backend.
+    """
+    started_at = datetime.fromisoformat(trace["started_at"])
+    children = {}
+    for span in trace["spans"]:
+        children.setdefault(span["parent_id"], []).append(span)
+
+    def timestamp(ms: float) -> str:
+        moment = started_at + timedelta(milliseconds=ms)
+        return moment.replace(tzinfo=None).isoformat() + "Z"
+
+    async def send(span: dict, parent_id: str) -> None:
+        step = cl.Step(
+            name=span["name"],
+            type=STEP_TYPES.get(span["kind"], "undefined"),
+            parent_id=parent_id,
+            show_input=True,
+        )
+        step.start = timestamp(span["start_ms"])
+        step.end = timestamp(span["end_ms"] or span["start_ms"])
+        step.input = span["input_preview"]
+        step.output = (
+            f"{describe_span(span)}\n\n"
+            f"{span['error'] or span['output_preview']}"
+        )
+        step.is_error = bool(span["error"])
+        await step.send()
+        for child in children.get(span["id"], []):
+            await send(child, step.id)
+
+    for span in children.get(None, []):
+        await send(span, parent_id)
+
+
+def format_module(index: int, module: dict) -> str:
+    lines = [
+        f"### {index + 1}. {module['title']} "
+        f"({module['duration_hours']:g} h)",
+        module["description"],
+    ]
+    if module["prerequisites"]:
+        lines.append(f"*Prerequisites:* {', '.join(module['prerequisites'])}")
+    for resource in module["resources"]:
+        source = "internal" if resource["internal"] else resource["kind"]
+        link = (
+            f"[{resource['title']}]({resource['url']})"
+            if resource["url"]
+            else resource["title"]
+        )
+        lines.append(f"- {link} ({source})")
+    return "\n\n".join(lines)
+
+
+async def build_learning_path(message: cl.Message) -> None:
+    user = cl.user_session.get("user")
+    header = await cl.Message(
+        "Building your learning path...", author="agent"
+    ).send()
+    async for event, payload in learning_path_streaming(
+        message.content,
+        user_id=user.identifier if user else None,
+        session_id=cl.user_session.get("id"),
+    ):
+        if event == "module":
+            await cl.Message(
+                format_module(payload["index"], payload["module"]),
+                author="agent",
+            ).send()
+        elif event == "queue":
+            header.content = (
+                f"Waiting for the agent ({payload['position']} ahead)..."
+            )
+            await header.update()
+        elif event == "learning_path":
+            total = sum(m["duration_hours"] for m in payload["modules"])
+            header.content = (
+                f"**{payload['goal']}**\n\n{payload['summary']}\n\n"
+                f"{len(payload['modules'])} modules, {total:g} hours."
+            )
+            await header.update()
+        elif event == "error":
+            header.content = payload["detail"]
+            await header.update()
+        elif event == "busy":
+            header.content = busy_message(payload)
+            await header.update()
+        elif event == "trace":
+            await show_trace(payload, header.id)
 
 
 @cl.on_chat_start
 async def on_chat_start() -> None:
     logging.info("Chat session started.")
-    cl.user_session.set("fcc", "")
+    await cl.context.emitter.set_commands(
+        [
+            {
+                "id": "LearningPath",
+                "icon": "route",
+                "description": "Build a structured learning path",
+            }
+        ]
+    )
 
 
 @cl.on_message
 async def main(message: cl.Message):
     logging.info(f"Received message: {message.content}")
+    if message.command == "LearningPath":
+        await build_learning_path(message)
+        return
     thinking = await cl.Message("Thinking...", author="agent").send()
     logging.info("Sent 'Thinking...' message to user.")
     logging.info(f"Received message: {message.content}")
 
-    response = chat(message.content)
+    user = cl.user_session.get("user")
+    response = chat(
+        message.content,
+        user_id=user.identifier if user else None,
+        session_id=cl.user_session.get("id"),
+    )
+    if response is None:
+        thinking.content = "Sorry, the agent could not be reached."
+        await thinking.update()
+        return
+    if response.get("busy"):
+        thinking.content = busy_message(response)
+        await thinking.update()
+        return
     logging.info(f"fcc : {response.get("fcc")}")
-    fcc = response.get("fcc")
-    cl.user_session.set("fcc", fcc)
     response_text = response.get(
         "response", "Sorry, No response from agent handler.")
 
     thinking.content = response_text
     await thinking.update()
-    tool_res = await tool()
-
-    await cl.Message(content=tool_res).send()
+    if response.get("trace"):
+        await show_trace(response["trace"], thinking.id)
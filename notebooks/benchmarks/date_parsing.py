@@ -0,0 +1,86 @@
+"""
+Micro-benchmark of the date parsing done by the calendar plugin.
+
+Compares, per call, dateparser.parse with a fresh settings dict (how
+create_event used to parse dates) with normalize_datetime, cold (first
+call for a phrase) and warm (cached).
+Example usages:
+uv run python -m notebooks.benchmarks.date_parsing
+uv run python -m notebooks.benchmarks.date_parsing --repeat 50
+"""
+
+import argparse
+import statistics
+import time
+
+import dateparser
+
+from backend.src.agents.google import date_normalizer
+from backend.src.agents.google.date_normalizer import normalize_datetime
+from notebooks.utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__)
+
+TIMEZONE = "Europe/Paris"
+
+PHRASES = [
+    "2025-06-01T14:00:00+02:00",
+    "2025-06-01 14:00",
+    "tomorrow at 1pm",
+    "in 2 days",
+    "demain à 13h",
+    "June 3 2025 10:30",
+]
+
+
+def dateparser_baseline(text: str):
+    return dateparser.parse(
+        text,
+        settings={
+            "TIMEZONE": TIMEZONE,
+            "RETURN_AS_TIMEZONE_AWARE": True,
+            "PREFER_DATES_FROM": "future",
+        },
+    )
+
+
+def per_call_us(fn, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Warm dateparser's own lazy loading so only per-call costs remain.
+    dateparser_baseline("tomorrow")
+    normalize_datetime("tomorrow", TIMEZONE)
+
+    logger.info(
+        f"{'phrase':<28}{'dateparser':>14}{'cold':>12}{'warm':>12}  (us)"
+    )
+    for text in PHRASES:
+        baseline = per_call_us(dateparser_baseline, text, args.repeat)
+        cold = []
+        for _ in range(args.repeat):
+            date_normalizer._parse_phrase.cache_clear()
+            cold.append(
+                per_call_us(lambda t: normalize_datetime(t, TIMEZONE), text, 1)
+            )
+        warm = per_call_us(
+            lambda t: normalize_datetime(t, TIMEZONE), text, args.repeat
+        )
+        logger.info(
+            f"{text:<28}{baseline:>14.1f}{statistics.median(cold):>12.1f}"
+            f"{warm:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
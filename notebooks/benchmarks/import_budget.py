@@ -0,0 +1,184 @@
+"""
+Import-time budget check for the entry points of the project.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``
+and the check fails when its cumulative import time exceeds its budget, or
+when it loads one of the heavy clients that must only be imported on first
+use.
+Example usages:
+uv run python -m notebooks.benchmarks.import_budget
+uv run python -m notebooks.benchmarks.import_budget backend.src.apis.chat \
+    --budget-ms 2000 --repeat 5
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from notebooks.utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Budgets in milliseconds, measured on a warm file-system cache.
+DEFAULT_BUDGETS_MS = {
+    "backend.src.utils.config": 250,
+    "backend.src.mongodb.client": 400,
+    # Mostly semantic_kernel itself (prompt template engines, openai types).
+    "backend.src.apis.chat": 3500,
+    "notebooks.evaluation.launch_eval": 250,
+}
+
+# Modules that the entry points above must not load at import time.
+DEFERRED_MODULES = (
+    "atlassian",
+    "azure.ai.projects",
+    "azure.search.documents",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "mcp",
+    "semantic_kernel.connectors.ai.open_ai",
+    "semantic_kernel.connectors.mcp",
+)
+
+IMPORTTIME_LINE = re.compile(
+    r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$"
+)
+
+
+@dataclass
+class ImportProfile:
+    module: str
+    total_ms: float
+    # (self time in ms, module name), slowest first.
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+    loaded: List[str] = field(default_factory=list)
+
+
+def profile_import(module: str) -> ImportProfile:
+    """
+    Import ``module`` in a new interpreter and parse its importtime report.
+
+    Args:
+        module: Dotted name of the module to import.
+
+    Returns:
+        The cumulative import time and the modules loaded on the way.
+    """
+    env = dict(os.environ)
+    # Settings are read at import; a dummy store config keeps the check
+    # independent of the local .env file.
+    env.setdefault(
+        "METADATA_STORE_CONFIG",
+        '{"provider": "mongo", "config": {"uri": "mongodb://localhost"}}',
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if completed.returncode:
+        raise RuntimeError(
+            f"Importing {module} failed:\n{completed.stderr[-2000:]}"
+        )
+
+    total_us = 0
+    self_times = []
+    loaded = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        loaded.append(name)
+        self_times.append((int(self_us) / 1000, name))
+        # Top-level imports are indented by a single space; their
+        # cumulative times add up to the whole import.
+        if len(indent) == 1:
+            total_us += int(cumulative_us)
+    self_times.sort(reverse=True)
+    return ImportProfile(
+        module=module,
+        total_ms=total_us / 1000,
+        slowest=self_times[:10],
+        loaded=loaded,
+    )
+
+
+def check_budgets(budgets: Dict[str, float], repeat: int = 3) -> List[str]:
+    """
+    Profile every module and collect the budget violations.
+
+    Args:
+        budgets: Import budget in milliseconds per module.
+        repeat: Imports per module; the median time is compared.
+
+    Returns:
+        A description of each violation, empty when all budgets hold.
+    """
+    failures = []
+    for module, budget_ms in budgets.items():
+        profiles = [profile_import(module) for _ in range(repeat)]
+        median_ms = statistics.median(p.total_ms for p in profiles)
+        logger.info(
+            f"{module}: {median_ms:.0f} ms (budget {budget_ms:.0f} ms)"
+        )
+        for self_ms, name in profiles[-1].slowest[:5]:
+            logger.info(f"    {self_ms:8.1f} ms  {name}")
+        if median_ms > budget_ms:
+            failures.append(
+                f"{module} imports in {median_ms:.0f} ms, "
+                f"over its {budget_ms:.0f} ms budget"
+            )
+        eager = sorted(
+            {
+                name
+                for name in profiles[-1].loaded
+                for deferred in DEFERRED_MODULES
+                if name == deferred or name.startswith(f"{deferred}.")
+            }
+        )
+        if eager:
+            failures.append(f"{module} eagerly imports {', '.join(eager[:5])}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        help="Modules to check, all the entry points by default.",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="Budget applied to the given modules.",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.modules:
+        budgets = {
+            module: args.budget_ms or DEFAULT_BUDGETS_MS.get(module, 1000)
+            for module in args.modules
+        }
+    else:
+        budgets = {
+            module: args.budget_ms or budget_ms
+            for module, budget_ms in DEFAULT_BUDGETS_MS.items()
+        }
+
+    failures = check_budgets(budgets, repeat=args.repeat)
+    for failure in failures:
+        logger.error(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,615 @@
+"""
+Load test of the chat endpoints of backend.src.main with simulated learners.
+
+The real FastAPI app is served by uvicorn in a background thread, its
+Host agent built by the real initialisation but running on a fake chat
+completion service, with stub retrieve_documents and search_web tools
+whose latencies follow the given distributions in place of the content
+plugins, and its sessions kept in memory. Learner sessions arrive
+as a Poisson process and each sends several turns to /invoke or
+/ainvoke, the first one triggering both tools like a learning path
+request. The report gives the throughput, the time to first token and
+end-to-end latency percentiles, the rejections, the lag of the server
+event loop with the stalls caught by its monitor, and the memory held per
+session. Admission limits come from the settings, e.g.
+MAX_CONCURRENT_REQUESTS, and so do the MODEL_ROUTES sending calls to the
+fast fake deployment when one is given. The report has the latency,
+tokens and prompt cache hit rate of each route.
+
+Latencies are given as seconds, or as "lognormal:MEDIAN:SIGMA",
+"uniform:LOW:HIGH" or "exp:MEAN".
+Example usages:
+uv run python -m notebooks.benchmarks.load_test
+uv run python -m notebooks.benchmarks.load_test --sessions 200 \
+    --arrival-rate 10 --turns 3 --endpoint ainvoke \
+    --llm-latency lognormal:1.2:0.4 --tool-latency uniform:0.3:1.5
+uv run python -m notebooks.benchmarks.load_test --blocking-threshold 0.05 \
+    --max-stalls 0
+MODEL_ROUTES=tool_selection:fast uv run python -m \
+    notebooks.benchmarks.load_test --fast-llm-latency lognormal:0.3:0.3
+uv run python -m notebooks.benchmarks.load_test --tool-router
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import resource
+import socket
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+import uvicorn
+from semantic_kernel.contents import (AuthorRole, ChatHistory,
+                                      FunctionCallContent,
+                                      FunctionResultContent)
+from semantic_kernel.contents.chat_message_content import ChatMessageContent
+from semantic_kernel.functions import kernel_function
+
+from backend.src.agents.orchestrator_agent.prefetch import Prefetcher
+from backend.src.agents.orchestrator_agent.semantic_kernel_agent import \
+    ChatAgentHandler
+from backend.src.agents.orchestrator_agent.session_state import SessionStore
+from backend.src.agents.profile_builder.profile import ProfileStore
+from backend.src.llm.fake_chat_completion import FakeChatCompletion
+from backend.src.llm.routing import FAST, LARGE, get_route_stats
+from backend.src.mongodb.base import BaseMetadataStore
+from backend.src.utils.config import Settings
+from backend.src.utils.diagnostics import EventLoopMonitor, percentile
+from backend.src.utils.user_token import sign_user_token
+from notebooks.utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__)
+
+RAG_PLUGIN = "internal_content_rag"
+WEB_PLUGIN = "learning_path_building_external_content_web"
+TOPICS = ["python", "kubernetes", "data science", "terraform", "react"]
+LEARNER_PROFILE = {
+    "current_position": "Data analyst",
+    "target_role": "Data engineer",
+    "learning_obstacles": "Little time during the week",
+    "time_limit": "3 months",
+    "preferred_learning_style": ["videos", "hands-on labs"],
+}
+FOLLOW_UPS = [
+    "Can you make the second module shorter?",
+    "Which of these resources are free?",
+    "How many hours a week should I plan?",
+    "Add a project at the end.",
+]
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """A sampler of seconds from a latency distribution spec."""
+    kind, _, params = spec.partition(":")
+    if not params:
+        value = float(kind)
+        return lambda: value
+    values = [float(p) for p in params.split(":")]
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    if kind == "uniform":
+        low, high = values
+        return lambda: random.uniform(low, high)
+    if kind == "exp":
+        (mean,) = values
+        return lambda: random.expovariate(1 / mean)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    return {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+
+
+class InMemoryMetadataStore(BaseMetadataStore):
+    """Sessions and profiles in dictionaries, for the load test only."""
+
+    def __init__(self) -> None:
+        self.sessions: Dict[str, bytes] = {}
+        self.versions: Dict[str, int] = {}
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+
+    async def load_session(self, session_id: str) -> Optional[bytes]:
+        return self.sessions.get(session_id)
+
+    async def save_session(
+        self,
+        session_id: str,
+        user_id: Optional[str],
+        payload: bytes,
+        version: int,
+    ) -> bool:
+        if self.versions.get(session_id, 0) != version:
+            return False
+        self.sessions[session_id] = payload
+        self.versions[session_id] = version + 1
+        return True
+
+    async def delete_session(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+        self.versions.pop(session_id, None)
+
+    async def load_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.profiles.get(user_id)
+
+    async def update_profile(
+        self, user_id: str, fields: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        self.profiles.setdefault(user_id, {}).update(fields)
+        return self.profiles[user_id]
+
+    async def iter_documents(
+        self, collection, query=None, projection=None, batch_size=500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        for document in ():
+            yield document
+
+    async def bulk_upsert(
+        self, collection, documents, key, batch_size=500
+    ) -> int:
+        return len(list(documents))
+
+
+class StubRetrieval:
+    def __init__(self, latency: Callable[[], float], size: int) -> None:
+        self.latency = latency
+        self.size = size
+
+    @kernel_function(
+        name="retrieve_documents",
+        description="Retrieve documents from the Azure Search service.",
+    )
+    async def retrieve_documents(self, query: str) -> str:
+        await asyncio.sleep(self.latency())
+        return f"Document: {query} " + "x" * self.size
+
+
+class StubWebSearch:
+    def __init__(self, latency: Callable[[], float], size: int) -> None:
+        self.latency = latency
+        self.size = size
+
+    @kernel_function(
+        name="search_web", description="Search the web for resources."
+    )
+    async def search_web(self, query: str) -> str:
+        await asyncio.sleep(self.latency())
+        return f"Results for {query}: " + "y" * self.size
+
+
+def learner_responder(answer_words: int):
+    """
+    Answers the first message of a session with calls to both tools,
+    tool results with a learning path, and other messages directly.
+    """
+
+    def respond(chat_history: ChatHistory, settings) -> Any:
+        last = chat_history.messages[-1]
+        if any(isinstance(item, FunctionResultContent) for item in last.items):
+            return " ".join(["module"] * answer_words)
+        users = [m for m in chat_history.messages if m.role == AuthorRole.USER]
+        if len(users) == 1:
+            arguments = json.dumps({"query": last.content})
+            return ChatMessageContent(
+                role=AuthorRole.ASSISTANT,
+                items=[
+                    FunctionCallContent(
+                        id=f"call_{uuid.uuid4().hex[:8]}",
+                        name=f"{plugin}-{function}",
+                        arguments=arguments,
+                    )
+                    for plugin, function in (
+                        (RAG_PLUGIN, "retrieve_documents"),
+                        (WEB_PLUGIN, "search_web"),
+                    )
+                ],
+            )
+        return " ".join(["sure"] * (answer_words // 3))
+
+    return respond
+
+
+class LoadTestAgentHandler(ChatAgentHandler):
+    """
+    Chat handler initialised like the real one, on the fake chat
+    completion services and with stub tools serving the learning content.
+    """
+
+    def __init__(
+        self,
+        services: Dict[str, FakeChatCompletion],
+        tool_latency: Callable[[], float],
+        tool_result_chars: int,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(user_id=None, **kwargs)
+        self.services = services
+        self.tool_latency = tool_latency
+        self.tool_result_chars = tool_result_chars
+
+    def _create_services(self) -> Dict[str, FakeChatCompletion]:
+        return self.services
+
+    async def _create_content_plugins(self) -> Dict[str, Any]:
+        return {
+            RAG_PLUGIN: StubRetrieval(
+                self.tool_latency, self.tool_result_chars
+            ),
+            WEB_PLUGIN: StubWebSearch(
+                self.tool_latency, self.tool_result_chars
+            ),
+        }
+
+
+class ServerThread(threading.Thread):
+    """Serves the app on its own event loop, with an event loop monitor."""
+
+    def __init__(self, app, port: int, blocking_threshold: float) -> None:
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(
+            uvicorn.Config(
+                app, host="127.0.0.1", port=port, log_level="warning"
+            )
+        )
+        self.monitor = EventLoopMonitor(threshold=blocking_threshold)
+
+    def run(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        self.monitor.start()
+        try:
+            await self.server.serve()
+        finally:
+            await self.monitor.stop()
+
+    def start_and_wait(self) -> None:
+        self.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.join()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@dataclass
+class RequestResult:
+    endpoint: str
+    turn: int
+    status: int
+    ttft: Optional[float]
+    latency: float
+
+
+async def send_turn(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    turn: int,
+) -> RequestResult:
+    start = time.perf_counter()
+    if endpoint == "invoke":
+        response = await client.post("/invoke", json=payload, headers=headers)
+        latency = time.perf_counter() - start
+        return RequestResult(
+            endpoint,
+            turn,
+            response.status_code,
+            latency if response.status_code == 200 else None,
+            latency,
+        )
+
+    ttft = None
+    async with client.stream(
+        "POST", "/ainvoke", json=payload, headers=headers
+    ) as response:
+        async for chunk in response.aiter_text():
+            # Session and queue events come first, then the answer chunks.
+            if ttft is None and "data: " in chunk and "event:" not in chunk:
+                ttft = time.perf_counter() - start
+    return RequestResult(
+        endpoint, turn, response.status_code, ttft, time.perf_counter() - start
+    )
+
+
+async def learner_session(
+    client: httpx.AsyncClient,
+    index: int,
+    turns: int,
+    endpoint: str,
+    think_time: Callable[[], float],
+    results: List[RequestResult],
+) -> None:
+    session_id = uuid.uuid4().hex
+    messages = [
+        f"I want a learning path to learn {TOPICS[index % len(TOPICS)]}."
+    ] + [
+        FOLLOW_UPS[(index + turn) % len(FOLLOW_UPS)]
+        for turn in range(1, turns)
+    ]
+    for turn, text in enumerate(messages):
+        chosen = endpoint
+        if endpoint == "mixed":
+            chosen = random.choice(["invoke", "ainvoke"])
+        payload = {"text": text, "session_id": session_id}
+        token = sign_user_token(
+            f"learner-{index}", Settings.USER_TOKEN_SECRET
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+        try:
+            results.append(
+                await send_turn(client, chosen, payload, headers, turn)
+            )
+        except httpx.HTTPError as e:
+            logger.warning(f"Session {index} turn {turn} failed: {e!r}")
+            results.append(RequestResult(chosen, turn, 0, None, float("nan")))
+        if turn < len(messages) - 1:
+            await asyncio.sleep(think_time())
+
+
+async def drive(
+    base_url: str,
+    sessions: int,
+    arrival_rate: float,
+    turns: int,
+    endpoint: str,
+    think_time: Callable[[], float],
+) -> tuple:
+    results: List[RequestResult] = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=300, limits=limits
+    ) as client:
+        start = time.perf_counter()
+        tasks = []
+        for index in range(sessions):
+            tasks.append(
+                asyncio.create_task(
+                    learner_session(
+                        client, index, turns, endpoint, think_time, results
+                    )
+                )
+            )
+            await asyncio.sleep(random.expovariate(arrival_rate))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def report(
+    results: List[RequestResult],
+    elapsed: float,
+    event_loop: Dict[str, Any],
+    services: List[FakeChatCompletion],
+    store: InMemoryMetadataStore,
+    memory_per_session: Optional[float],
+    rss_growth_kb: int,
+    prefetcher: Optional[Prefetcher] = None,
+) -> Dict[str, Any]:
+    ok = [r for r in results if r.status == 200]
+    by_endpoint = defaultdict(list)
+    for result in ok:
+        by_endpoint[result.endpoint].append(result)
+    stored = list(store.sessions.values())
+    return {
+        "requests": len(results),
+        "statuses": dict(Counter(r.status for r in results)),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed,
+        "llm_calls": sum(service.calls for service in services),
+        "routes": get_route_stats().stats(),
+        "prefetch": dict(prefetcher.stats) if prefetcher else None,
+        "endpoints": {
+            endpoint: {
+                "requests": len(items),
+                "ttft_s": percentiles(
+                    [r.ttft for r in items if r.ttft is not None]
+                ),
+                "latency_s": percentiles([r.latency for r in items]),
+                "first_turn_latency_s": percentiles(
+                    [r.latency for r in items if r.turn == 0]
+                ),
+            }
+            for endpoint, items in by_endpoint.items()
+        },
+        "event_loop": event_loop,
+        "memory": {
+            "sessions": len(stored),
+            "stored_bytes_per_session": (
+                sum(map(len, stored)) / len(stored) if stored else None
+            ),
+            "traced_bytes_per_session": memory_per_session,
+            "max_rss_growth_kb": rss_growth_kb,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument(
+        "--arrival-rate", type=float, default=5.0, help="Sessions per second."
+    )
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument(
+        "--endpoint", choices=["invoke", "ainvoke", "mixed"], default="mixed"
+    )
+    parser.add_argument("--llm-latency", default="lognormal:0.8:0.4")
+    parser.add_argument("--chunk-latency", type=float, default=0.005)
+    parser.add_argument("--tool-latency", default="uniform:0.2:1.0")
+    parser.add_argument("--think-time", default="exp:1.0")
+    parser.add_argument("--answer-words", type=int, default=150)
+    parser.add_argument("--tool-result-chars", type=int, default=4000)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Measure the memory held per session with tracemalloc, which "
+        "slows the server down.",
+    )
+    parser.add_argument(
+        "--server-log-level",
+        default="WARNING",
+        help="Level of the app and Semantic Kernel logs.",
+    )
+    parser.add_argument(
+        "--blocking-threshold",
+        type=float,
+        default=Settings.DIAGNOSTICS_BLOCKING_THRESHOLD_SECONDS,
+        help="Seconds the server loop may be held before a stall is "
+        "reported with the stack of the blocking call.",
+    )
+    parser.add_argument(
+        "--max-stalls",
+        type=int,
+        help="Exit with an error when the server loop stalls more often, "
+        "to catch blocking calls in CI.",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Give the learners a complete profile and prefetch the tools "
+        "of their learning path requests.",
+    )
+    parser.add_argument(
+        "--fast-llm-latency",
+        help="Latency of a fast fake deployment answering the routes "
+        "MODEL_ROUTES sends to the fast tier, e.g. the tool selection with "
+        "MODEL_ROUTES=tool_selection:fast.",
+    )
+    parser.add_argument(
+        "--prompt-cache-entries",
+        type=int,
+        default=10000,
+        help="Prompt prefixes kept by the simulated provider prompt cache "
+        "of the fake deployments, 0 to disable it.",
+    )
+    parser.add_argument(
+        "--tool-router",
+        action="store_true",
+        help="Pick the tools of each turn with the tool router.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report as JSON.")
+    args = parser.parse_args()
+    random.seed(args.seed)
+    for name in ("backend", "semantic_kernel", "ingestions", "httpx"):
+        logging.getLogger(name).setLevel(args.server_log_level)
+
+    from backend.src.apis import chat
+    from backend.src.main import app
+
+    # The learners sign their identity like the frontend does.
+    Settings.USER_TOKEN_SECRET = Settings.USER_TOKEN_SECRET or uuid.uuid4().hex
+    # The Host is built by the real initialisation, with these features.
+    Settings.PREFETCH_ENABLED = args.prefetch
+    Settings.TOOL_ROUTER_ENABLED = args.tool_router
+    store = InMemoryMetadataStore()
+    service = FakeChatCompletion(
+        service_id=LARGE,
+        ai_model_id="fake-load-test",
+        responder=learner_responder(args.answer_words),
+        latency=parse_latency(args.llm_latency),
+        chunk_latency=args.chunk_latency,
+        prompt_cache_entries=args.prompt_cache_entries,
+    )
+    fast_service = None
+    if args.fast_llm_latency:
+        fast_service = FakeChatCompletion(
+            service_id=FAST,
+            ai_model_id="fake-load-test-fast",
+            responder=learner_responder(args.answer_words),
+            latency=parse_latency(args.fast_llm_latency),
+            chunk_latency=args.chunk_latency,
+            prompt_cache_entries=args.prompt_cache_entries,
+        )
+    services = {LARGE: service}
+    if fast_service is not None:
+        services[FAST] = fast_service
+    chat.chat_handler = LoadTestAgentHandler(
+        services,
+        parse_latency(args.tool_latency),
+        args.tool_result_chars,
+        session_store=SessionStore(store),
+        profile_store=ProfileStore(store),
+    )
+    if args.prefetch:
+        for index in range(args.sessions):
+            store.profiles[f"learner-{index}"] = dict(
+                LEARNER_PROFILE, updated_at=datetime.now()
+            )
+
+    port = free_port()
+    server = ServerThread(app, port, args.blocking_threshold)
+    server.start_and_wait()
+    logger.info(
+        f"Serving on port {port}: {args.sessions} sessions of {args.turns} "
+        f"turns at {args.arrival_rate}/s on {args.endpoint}"
+    )
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if args.trace_memory:
+        tracemalloc.start()
+        traced_before = tracemalloc.get_traced_memory()[0]
+    try:
+        results, elapsed = asyncio.run(
+            drive(
+                f"http://127.0.0.1:{port}",
+                args.sessions,
+                args.arrival_rate,
+                args.turns,
+                args.endpoint,
+                parse_latency(args.think_time),
+            )
+        )
+        memory_per_session = None
+        if args.trace_memory:
+            traced = tracemalloc.get_traced_memory()[0] - traced_before
+            memory_per_session = traced / max(len(store.sessions), 1)
+            tracemalloc.stop()
+    finally:
+        server.stop()
+
+    summary = report(
+        results,
+        elapsed,
+        server.monitor.stats(with_stacks=False),
+        [service] + ([fast_service] if fast_service else []),
+        store,
+        memory_per_session,
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+        chat.chat_handler.prefetcher,
+    )
+    logger.info(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "report": summary}, f, indent=2)
+        logger.info(f"Report written to {args.output}")
+    if args.max_stalls is not None and summary["event_loop"]["stalls"] > (
+        args.max_stalls
+    ):
+        raise SystemExit(
+            f"The server event loop stalled {summary['event_loop']['stalls']}"
+            f" times, over the {args.max_stalls} allowed."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+Benchmark of the retrieval behind retrieve_documents: quality and latency.
+
+Labelled queries are run against a retrieval backend, the search ranking
+and the passages kept by the reranker are scored with recall@k and MRR,
+and the latency percentiles of each stage and the throughput of the
+SearchPlugin are reported. The local backend is an in-memory BM25 index of
+a seeded synthetic corpus, or of an exported one, so runs are reproducible
+and need no network; the azure backend queries the Confluence index.
+
+Exported corpora are JSON lines of {"id", "title", "content"} pages, and
+queries JSON lines of {"query", "page_ids"}.
+Example usages:
+uv run python -m notebooks.benchmarks.retrieval
+uv run python -m notebooks.benchmarks.retrieval --pages 5000 \
+    --queries 500 --candidates 50 --output retrieval.json
+uv run python -m notebooks.benchmarks.retrieval --backends local azure \
+    --corpus pages.jsonl --query-file queries.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from backend.src.agents.confluence.rerank import Reranker
+from backend.src.embeddings.pipeline import html_to_text
+from backend.src.utils.diagnostics import percentile
+from backend.src.utils.keywords import tokenize
+from notebooks.utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__)
+
+AZURE_INDEX_NAME = "confluence-pages-index"
+RECALL_AT = (1, 5, 10)
+
+TOPICS = [
+    "python",
+    "kubernetes",
+    "terraform",
+    "airflow",
+    "spark",
+    "docker",
+    "security",
+    "testing",
+    "azure",
+    "mlops",
+    "sql",
+    "react",
+]
+FILLER = (
+    "team project process guide page update meeting review example "
+    "document note owner step overview setup access request support "
+    "release plan sprint client delivery onboarding training internal"
+).split()
+
+
+@dataclass
+class LabelledQuery:
+    query: str
+    page_ids: List[str]
+
+
+def pseudo_word(rng: random.Random) -> str:
+    return "".join(
+        rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou")
+        for _ in range(rng.randint(3, 4))
+    )
+
+
+def synthetic_corpus(
+    pages: int,
+    queries: int,
+    words_per_page: int = 600,
+    noise: float = 0.3,
+    seed: int = 0,
+):
+    """
+    Confluence-like pages and queries labelled with the page they target.
+
+    Every page belongs to a topic shared with many others and has a few
+    key terms drawn from a vocabulary shared with other pages. A query
+    names the topic and two key terms of its page, one of them replaced
+    by an unrelated term for a share of the queries, plus a common word.
+
+    Returns:
+        The pages and the labelled queries.
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({pseudo_word(rng) for _ in range(max(pages, 50))})
+    documents = []
+    for index in range(pages):
+        topic = TOPICS[index % len(TOPICS)]
+        keys = rng.sample(vocabulary, 4)
+        body = [rng.choice(FILLER) for _ in range(words_per_page)]
+        for _ in range(words_per_page // 40):
+            body[rng.randrange(words_per_page)] = topic
+        for key in keys:
+            for _ in range(rng.randint(2, 5)):
+                body[rng.randrange(words_per_page)] = key
+        paragraphs = [
+            " ".join(body[start : start + 100])
+            for start in range(0, words_per_page, 100)
+        ]
+        documents.append(
+            {
+                "id": str(index),
+                "title": f"{topic.capitalize()} {keys[0]} {keys[1]}",
+                "content": "".join(f"<p>{p}</p>" for p in paragraphs),
+                "keys": keys,
+                "topic": topic,
+            }
+        )
+
+    labelled = []
+    for _ in range(queries):
+        document = rng.choice(documents)
+        words = [document["topic"]] + rng.sample(document["keys"][1:], 2)
+        if rng.random() < noise:
+            words[-1] = rng.choice(vocabulary)
+        words.append(rng.choice(FILLER))
+        rng.shuffle(words)
+        labelled.append(LabelledQuery(" ".join(words), [document["id"]]))
+    return documents, labelled
+
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class LocalSearchClient:
+    """
+    In-memory BM25 index over the title and content of the pages, with the
+    ``search`` signature of the Azure SearchClient used by SearchPlugin.
+    """
+
+    def __init__(
+        self, documents: Sequence[Dict[str, Any]], k1=1.2, b=0.75
+    ) -> None:
+        self.documents = list(documents)
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+        self.lengths = []
+        for index, document in enumerate(self.documents):
+            terms = tokenize(document.get("title") or "") + tokenize(
+                html_to_text(document.get("content") or "")
+            )
+            self.lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((index, frequency))
+        self.average_length = sum(self.lengths) / len(self.lengths) or 1.0
+
+    def search(
+        self,
+        search_text: str,
+        top: int = 50,
+        select: Optional[List[str]] = None,
+        **kwargs,
+    ) -> List[Dict[str, Any]]:
+        scores: Dict[int, float] = defaultdict(float)
+        total = len(self.documents)
+        for term in set(tokenize(search_text)):
+            postings = self.postings.get(term, ())
+            idf = math.log(
+                1 + (total - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for index, frequency in postings:
+                norm = (
+                    1
+                    - self.b
+                    + self.b * (self.lengths[index] / self.average_length)
+                )
+                scores[index] += (
+                    idf
+                    * frequency
+                    * (self.k1 + 1)
+                    / (frequency + self.k1 * norm)
+                )
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:top]
+        return [
+            {
+                **{
+                    key: value
+                    for key, value in self.documents[index].items()
+                    if select is None or key in select
+                },
+                "@search.score": score,
+            }
+            for index, score in ranked
+        ]
+
+
+def azure_search_client():
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+
+    from backend.src.utils.config import Settings
+
+    return SearchClient(
+        endpoint=Settings.AZURE_SEARCH_SERVICE_ENDPOINT,
+        index_name=AZURE_INDEX_NAME,
+        credential=AzureKeyCredential(Settings.AZURE_SEARCH_API_KEY),
+    )
+
+
+def quality(
+    rankings: List[List[str]], queries: List[LabelledQuery]
+) -> Dict[str, float]:
+    """Mean recall@k and MRR of page rankings."""
+    metrics = {f"recall@{k}": 0.0 for k in RECALL_AT}
+    metrics["mrr"] = 0.0
+    for ranking, query in zip(rankings, queries):
+        relevant = set(query.page_ids)
+        for k in RECALL_AT:
+            found = relevant.intersection(ranking[:k])
+            metrics[f"recall@{k}"] += len(found) / len(relevant)
+        rank = next(
+            (i for i, page_id in enumerate(ranking, 1) if page_id in relevant),
+            None,
+        )
+        metrics["mrr"] += 1 / rank if rank else 0.0
+    return {name: value / len(queries) for name, value in metrics.items()}
+
+
+def latency(timings: List[float]) -> Dict[str, Optional[float]]:
+    return {f"p{q}_ms": percentile(timings, q) for q in (50, 95, 99)}
+
+
+def run_backend(
+    client, queries: List[LabelledQuery], reranker: Reranker, candidates: int
+) -> Dict[str, Any]:
+    """Score the search ranking and the reranked passages of each query."""
+    search_rankings, rerank_rankings = [], []
+    timings = defaultdict(list)
+    for query in queries:
+        start = time.perf_counter()
+        results = list(
+            client.search(
+                query.query,
+                top=candidates,
+                select=["id", "title", "content"],
+            )
+        )
+        timings["search"].append((time.perf_counter() - start) * 1000)
+        search_rankings.append([str(result["id"]) for result in results])
+
+        passages, stages = reranker.rerank(query.query, results)
+        for stage, ms in stages.items():
+            timings[stage.removesuffix("_ms")].append(ms)
+        timings["total"].append(timings["search"][-1] + sum(stages.values()))
+        rerank_rankings.append(
+            list(dict.fromkeys(passage.page_id for passage in passages))
+        )
+    return {
+        "search": quality(search_rankings, queries),
+        "rerank": quality(rerank_rankings, queries),
+        "latency": {
+            stage: latency(values) for stage, values in timings.items()
+        },
+    }
+
+
+async def throughput(
+    client,
+    queries: List[LabelledQuery],
+    reranker: Reranker,
+    candidates: int,
+    concurrency: int,
+) -> float:
+    """Queries per second of SearchPlugin.get_retrieval_context."""
+    from backend.src.agents.confluence.academy_rag import SearchPlugin
+
+    plugin = SearchPlugin(client, reranker=reranker, candidates=candidates)
+    # The plugin logs the timings of every query.
+    logging.getLogger("ingestions").setLevel(logging.WARNING)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def retrieve(query: LabelledQuery) -> None:
+        async with semaphore:
+            await plugin.get_retrieval_context(query.query)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(retrieve(query) for query in queries))
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--backends", nargs="+", choices=["local", "azure"], default=["local"]
+    )
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", help="Exported pages, JSON lines.")
+    parser.add_argument("--query-file", help="Labelled queries, JSON lines.")
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--token-budget", type=int, default=1500)
+    parser.add_argument("--max-per-page", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", help="Write the report as JSON.")
+    args = parser.parse_args()
+
+    if args.corpus or args.query_file:
+        if not (args.corpus and args.query_file):
+            parser.error("--corpus and --query-file go together.")
+        documents = load_jsonl(args.corpus)
+        queries = [
+            LabelledQuery(item["query"], [str(i) for i in item["page_ids"]])
+            for item in load_jsonl(args.query_file)
+        ]
+    elif "azure" in args.backends:
+        parser.error("The azure backend needs --corpus and --query-file.")
+    else:
+        documents, queries = synthetic_corpus(
+            args.pages, args.queries, seed=args.seed
+        )
+    logger.info(f"{len(documents)} pages, {len(queries)} labelled queries")
+
+    reranker = Reranker(
+        token_budget=args.token_budget, max_per_page=args.max_per_page
+    )
+    report = {}
+    for backend in args.backends:
+        start = time.perf_counter()
+        if backend == "local":
+            client = LocalSearchClient(documents)
+        else:
+            client = azure_search_client()
+        logger.info(
+            f"[{backend}] client ready in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+
+        result = run_backend(client, queries, reranker, args.candidates)
+        result["throughput_qps"] = asyncio.run(
+            throughput(
+                client, queries, reranker, args.candidates, args.concurrency
+            )
+        )
+        report[backend] = result
+
+        for stage in ("search", "rerank"):
+            logger.info(
+                f"[{backend}] {stage}: "
+                + ", ".join(
+                    f"{name} {value:.3f}"
+                    for name, value in result[stage].items()
+                )
+            )
+        for stage, values in result["latency"].items():
+            logger.info(
+                f"[{backend}] {stage} latency: "
+                + ", ".join(
+                    f"{name} {value:.2f}" for name, value in values.items()
+                )
+            )
+        logger.info(
+            f"[{backend}] throughput: {result['throughput_qps']:.1f} "
+            f"queries/s at concurrency {args.concurrency}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "report": report}, f, indent=2)
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
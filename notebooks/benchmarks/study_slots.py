@@ -0,0 +1,138 @@
+"""
+Benchmark of the study slot placement over months of dense calendars.
+
+Compares the interval index of backend.src.agents.google.scheduler with a
+linear scan of the busy events, the way the slots were found by reading
+raw event lists, and checks both place the same sessions.
+Example usages:
+uv run python -m notebooks.benchmarks.study_slots
+uv run python -m notebooks.benchmarks.study_slots --months 12 \
+    --events-per-day 12 --sessions 120
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+from dateutil.tz import gettz
+
+from backend.src.agents.google.scheduler import (BusyIndex, Interval,
+                                                 SchedulingConstraints,
+                                                 place_sessions)
+from notebooks.utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def dense_calendar(
+    start: datetime, days: int, events_per_day: int, seed: int = 0
+) -> List[Interval]:
+    """
+    Random, possibly overlapping, meetings of 15 to 120 minutes between
+    07:00 and 21:00, weekends included.
+    """
+    rng = random.Random(seed)
+    events = []
+    for day in range(days):
+        day_start = (start + timedelta(days=day)).replace(
+            hour=7, minute=0, second=0, microsecond=0
+        )
+        for _ in range(events_per_day):
+            begin = day_start + timedelta(minutes=15 * rng.randrange(56))
+            events.append(
+                (begin, begin + timedelta(minutes=15 * rng.randint(1, 8)))
+            )
+    return events
+
+
+class LinearBusy:
+    """Busy events scanned in full for every query."""
+
+    def __init__(self, intervals: List[Interval]) -> None:
+        self.intervals = list(intervals)
+
+    def earliest_free(
+        self,
+        after: datetime,
+        duration: timedelta,
+        before: Optional[datetime] = None,
+    ) -> Optional[datetime]:
+        candidate = after
+        moved = True
+        while moved:
+            moved = False
+            for start, end in self.intervals:
+                if start < candidate + duration and end > candidate:
+                    candidate = end
+                    moved = True
+        if before is not None and candidate + duration > before:
+            return None
+        return candidate
+
+
+def bench(fn, repeat: int) -> Tuple[List[float], Any]:
+    """Milliseconds of each run, and the result of the last one."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--events-per-day", type=int, default=10)
+    parser.add_argument("--sessions", type=int, default=60)
+    parser.add_argument("--max-per-day", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    constraints = SchedulingConstraints(
+        timezone="Europe/Paris", max_sessions_per_day=args.max_per_day
+    )
+    horizon_start = datetime(2025, 1, 6, 8, 0, tzinfo=gettz("Europe/Paris"))
+    horizon_end = horizon_start + timedelta(days=30 * args.months)
+    events = dense_calendar(
+        horizon_start, 30 * args.months, args.events_per_day
+    )
+    durations = [
+        timedelta(minutes=random.Random(i).choice([30, 45, 60, 90]))
+        for i in range(args.sessions)
+    ]
+    logger.info(
+        f"{len(events)} busy events over {args.months} months, "
+        f"{args.sessions} sessions to place"
+    )
+
+    build_ms, index = bench(lambda: BusyIndex(events), args.repeat)
+    logger.info(
+        f"index build: {statistics.median(build_ms):.2f} ms "
+        f"({len(index)} merged intervals)"
+    )
+
+    def place(busy):
+        return lambda: place_sessions(
+            busy, durations, horizon_start, horizon_end, constraints
+        )
+
+    indexed_ms, indexed = bench(place(index), args.repeat)
+    linear_ms, linear = bench(place(LinearBusy(events)), args.repeat)
+    assert indexed == linear, "The index and the scan disagree."
+
+    logger.info(
+        f"placement with index: {statistics.median(indexed_ms):.2f} ms"
+    )
+    logger.info(f"placement with scan:  {statistics.median(linear_ms):.2f} ms")
+    logger.info(
+        f"placed {len(indexed)}/{args.sessions}, last session on "
+        f"{indexed[-1][0].date() if indexed else '-'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -84,3 +84,12 @@ class AgentEvaluator:
 def run_evaluation():
     evaluator = AgentEvaluator()
     asyncio.run(evaluator.evaluate())
+
+
+def score(case, run):
+    """Toxicity of the response of one case of the evaluation runner."""
+    metric = ToxicityMetric()
+    metric.measure(
+        LLMTestCase(input=case.query, actual_output=run.response, context=[])
+    )
+    return {"score": metric.score, "reason": metric.reason}
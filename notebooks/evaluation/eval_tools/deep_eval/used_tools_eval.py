@@ -50,3 +50,16 @@ def run_evaluation():
     evaluator = ToolEvaluation(user_id="test_user", test_query=test_query)
     evaluation_result = evaluator.evaluate(expected_tools=expected_tools)
     print(f"Evaluation Result: {evaluation_result}")
+
+
+def score(case, run):
+    """Tool correctness of one case of the evaluation runner."""
+    test_case = LLMTestCase(
+        input=case.query,
+        actual_output=run.response,
+        tools_called=[ToolCall(name=name) for name in run.tools],
+        expected_tools=[ToolCall(name=name) for name in case.expected_tools],
+    )
+    metric = ToolCorrectnessMetric()
+    metric.measure(test_case)
+    return {"score": metric.score, "reason": metric.reason}
@@ -2,9 +2,11 @@ from notebooks.utils.logging_utils import setup_logger
 from backend.src.agents.orchestrator_agent.semantic_kernel_agent import \
     ChatAgentHandler
 import asyncio
+import json
 import sys
 import time
 from pathlib import Path
+from typing import Any, Dict
 
 import openai
 
@@ -90,3 +92,18 @@ def run_evaluation():
     user_goal = "I am proficient in Python and SQL. I want to learn how to build and deploy machine learning models without creating my profile."
     eval_tool = EvaluationTool(user_goal)
     eval_tool.evaluate()
+
+
+def score(case, run) -> Dict[str, Any]:
+    """Judge scores of one case of the evaluation runner."""
+    eval_tool = EvaluationTool(case.query)
+    eval_tool.agent_output = run.response
+    eval_tool.latency = run.latency_s
+    evaluation = eval_tool.evaluate_response()
+    # The judge sometimes wraps the JSON object in a code block.
+    try:
+        return json.loads(
+            evaluation[evaluation.index("{") : evaluation.rindex("}") + 1]
+        )
+    except ValueError:
+        return {"error": "Unparsable judge output", "raw": evaluation}
@@ -32,7 +32,9 @@ class PhonixEvaluator:
     def evaluate(self):
         # Run the agent response asynchronously
         response = asyncio.run(self.get_agent_response())
+        return self.classify(response)
 
+    def classify(self, response):
         # Prepare the DataFrame
         df = pd.DataFrame(
             {
@@ -78,3 +80,15 @@ def run_evaluation():
         user_id="test_user", test_query=test_query, reference=reference)
     results = evaluator.evaluate()
     logger.info(results)
+
+
+def score(case, run):
+    """Hallucination label of one case of the evaluation runner."""
+    evaluator = PhonixEvaluator(
+        user_id="eval_user", test_query=case.query, reference=case.reference)
+    result = evaluator.classify(run.response).iloc[0]
+    return {
+        "label": result["label"],
+        "factual": float(result["label"] == "factual"),
+        "explanation": result.get("explanation"),
+    }
@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 from trulens_eval import Feedback, Tru
 from trulens_eval.feedback.provider.openai import OpenAI as EvalOpenAI
 import asyncio
+from functools import lru_cache
 
 from backend.src.agents.orchestrator_agent.semantic_kernel_agent import \
     ChatAgentHandler
@@ -99,3 +100,13 @@ def run_evaluation():
             ]
         )
     )
+
+
+@lru_cache(maxsize=None)
+def get_evaluator() -> LearningPathEvaluator:
+    return LearningPathEvaluator()
+
+
+def score(case, run) -> Dict[str, Any]:
+    """Groundedness of one case of the evaluation runner in its contexts."""
+    return get_evaluator().groundedness_direct(run.response, case.contexts)
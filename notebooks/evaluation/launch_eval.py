@@ -1,44 +1,47 @@
 """
 Launch evaluation script for different evaluation tools.
+
+With --dataset, the test cases of a dataset are run concurrently against
+one agent and scored by all the evaluations given, resuming from the
+results file when it exists (see notebooks/evaluation/runner.py).
 Example usages:
 uv run  notebooks/evaluation/launch_eval.py geval
 uv run  notebooks/evaluation/launch_eval.py arize
+uv run  notebooks/evaluation/launch_eval.py geval phoenix deep_tools \
+    deep_toxicity trulens --dataset \
+    notebooks/evaluation/datasets/learning_paths.jsonl --concurrency 4
 """
 
-from notebooks.evaluation.eval_tools.trulens_evaluation import run_evaluation as run_trulens_eval
-from notebooks.evaluation.eval_tools.phonix_eval import \
-    run_evaluation as run_phoenix
-from notebooks.evaluation.eval_tools.g_eval import run_evaluation as run_geval
-from notebooks.evaluation.eval_tools.deep_eval.used_tools_eval import \
-    run_evaluation as run_deep_tools
-from notebooks.evaluation.eval_tools.deep_eval.response_toxicity_eval import \
-    run_evaluation as run_deep_toxicity
+import argparse
 import asyncio
-import sys
+import importlib
+
 from notebooks.utils.logging_utils import setup_logger
 
 logger = setup_logger(__name__)
-# Import all evaluation modules directly
-# from eval_tools.arize_evaluation import \
-#     run_evaluation as run_arize
+
+
+# Evaluation modules are imported on demand: each one pulls in its own
+# evaluation framework and the agent, which would otherwise all be loaded
+# whatever evaluation is run.
+EVAL_MODULES = {
+    # "arize": "notebooks.evaluation.eval_tools.arize_evaluation",
+    "deep_tools": "notebooks.evaluation.eval_tools.deep_eval.used_tools_eval",
+    "deep_toxicity":
+        "notebooks.evaluation.eval_tools.deep_eval.response_toxicity_eval",
+    "phoenix": "notebooks.evaluation.eval_tools.phonix_eval",
+    "geval": "notebooks.evaluation.eval_tools.g_eval",
+    "trulens": "notebooks.evaluation.eval_tools.trulens_evaluation",
+}
 
 
 def run_evaluation(eval_name: str):
     """Import and run the specified evaluation."""
-    eval_map = {
-        # "arize": run_arize,
-        "deep_tools": run_deep_tools,
-        "deep_toxicity": run_deep_toxicity,
-        "phoenix": run_phoenix,
-        "geval": run_geval,
-        "trulens": run_trulens_eval
-    }
-
-    if eval_name not in eval_map:
+    if eval_name not in EVAL_MODULES:
         logger.info(f"Unknown evaluation: {eval_name}")
         return None
 
-    func = eval_map[eval_name]
+    func = importlib.import_module(EVAL_MODULES[eval_name]).run_evaluation
 
     if eval_name == "trulens":
         return asyncio.run(func())
@@ -46,6 +49,33 @@ def run_evaluation(eval_name: str):
 
 
 if __name__ == "__main__":
-    eval_name = sys.argv[1] if len(sys.argv) > 1 else "geval"
-    result = run_evaluation(eval_name)
-    logger.info(f"Evaluation '{eval_name}' completed with result: {result}")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("evals", nargs="*", default=["geval"])
+    parser.add_argument(
+        "--dataset", help="Run the evaluations over a JSON lines dataset."
+    )
+    parser.add_argument(
+        "--output", help="Results file, also the checkpoint to resume from."
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--cases-per-minute", type=int, default=0, help="0 for no limit."
+    )
+    args = parser.parse_args()
+
+    if args.dataset:
+        from notebooks.evaluation.runner import run_dataset
+
+        run_dataset(
+            args.evals,
+            dataset=args.dataset,
+            output=args.output,
+            concurrency=args.concurrency,
+            cases_per_minute=args.cases_per_minute,
+        )
+    else:
+        eval_name = args.evals[0]
+        result = run_evaluation(eval_name)
+        logger.info(
+            f"Evaluation '{eval_name}' completed with result: {result}"
+        )
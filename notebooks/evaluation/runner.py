@@ -0,0 +1,337 @@
+"""
+Dataset-driven evaluation of the agent.
+
+The test cases of a JSON lines dataset are run concurrently against one
+warm ChatAgentHandler, each in its own session, then scored by the
+evaluations selected among EVAL_MODULES. Every finished case is appended
+to a JSON lines checkpoint, so an interrupted run resumes where it
+stopped: answered cases are not sent to the agent again, and only the
+scores they miss are computed. A report consolidating the scores, the
+latencies and the failures is written next to the checkpoint.
+
+Dataset lines look like:
+{"id": "ds-1", "query": "...", "reference": "...", "contexts": ["..."],
+ "expected_tools": ["internal_content_rag-retrieve_documents"],
+ "evals": ["geval", "phoenix"]}
+where everything but "id" and "query" is optional.
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from backend.src.llm.rate_limiter import TokenBucket
+from backend.src.utils.diagnostics import percentile
+from notebooks.utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_DATASET = os.path.join(
+    os.path.dirname(__file__), "datasets", "learning_paths.jsonl"
+)
+
+
+@dataclass
+class EvalCase:
+    id: str
+    query: str
+    reference: str = ""
+    contexts: List[str] = field(default_factory=list)
+    expected_tools: List[str] = field(default_factory=list)
+    # Evaluations that apply to the case, all the selected ones if empty.
+    evals: List[str] = field(default_factory=list)
+
+
+@dataclass
+class AgentRun:
+    response: str
+    tools: List[str]
+    latency_s: float
+
+
+def load_dataset(path: str) -> List[EvalCase]:
+    with open(path) as f:
+        cases = [EvalCase(**json.loads(line)) for line in f if line.strip()]
+    ids = [case.id for case in cases]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate case ids in {path}")
+    return cases
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """The last record of each case, by case id."""
+    records = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["case_id"]] = record
+    return records
+
+
+def tools_called(chat_history) -> List[str]:
+    """Names, as plugin-function, of the functions called in a session."""
+    from semantic_kernel.contents import FunctionCallContent
+
+    return [
+        item.name
+        for message in chat_history.messages
+        for item in message.items
+        if isinstance(item, FunctionCallContent)
+    ]
+
+
+class EvaluationRunner:
+    """
+    Runs a dataset through the agent and the evaluations.
+
+    Args:
+        evals: Names of EVAL_MODULES whose ``score(case, run)`` is applied.
+        checkpoint_path: JSON lines file of the case records.
+        concurrency: Cases in flight at once, agent and scoring included.
+        cases_per_minute: Rate at which cases are started, 0 for no limit.
+    """
+
+    def __init__(
+        self,
+        evals: List[str],
+        checkpoint_path: str,
+        concurrency: int = 4,
+        cases_per_minute: int = 0,
+        agent=None,
+    ) -> None:
+        from notebooks.evaluation.launch_eval import EVAL_MODULES
+
+        unknown = set(evals) - set(EVAL_MODULES)
+        if unknown:
+            raise ValueError(f"Unknown evaluations: {sorted(unknown)}")
+        self.scorers = {
+            name: importlib.import_module(EVAL_MODULES[name]).score
+            for name in evals
+        }
+        self.checkpoint_path = checkpoint_path
+        self.concurrency = concurrency
+        self.bucket = (
+            TokenBucket(cases_per_minute, cases_per_minute / 60)
+            if cases_per_minute
+            else None
+        )
+        self.agent = agent
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        self._write_lock = asyncio.Lock()
+
+    async def _start_agent(self):
+        if self.agent is None:
+            from backend.src.agents.orchestrator_agent.semantic_kernel_agent import \
+                ChatAgentHandler
+
+            self.agent = ChatAgentHandler(user_id="eval_user")
+        # Ingestion and the MCP server start once for the whole run.
+        await self.agent.initialise()
+
+    async def _run_agent(self, case: EvalCase) -> AgentRun:
+        session_id = f"eval-{self.run_id}-{case.id}"
+        start = time.perf_counter()
+        response, _ = await self.agent.handle_message(
+            case.query, session_id=session_id
+        )
+        latency = time.perf_counter() - start
+        # Read from the session rather than the handler's return value,
+        # which is not isolated between concurrent messages.
+        state = await self.agent.sessions.load(
+            session_id, self.agent.user_id
+        )
+        await self.agent.end_session(session_id)
+        return AgentRun(response, tools_called(state.chat_history), latency)
+
+    async def _score(
+        self, name: str, case: EvalCase, run: AgentRun
+    ) -> Dict[str, Any]:
+        try:
+            # The evaluation frameworks call their judges synchronously.
+            return await asyncio.to_thread(self.scorers[name], case, run)
+        except Exception as e:
+            logger.exception(f"[{case.id}] {name} failed")
+            return {"error": repr(e)}
+
+    async def _write(self, record: Dict[str, Any]) -> None:
+        async with self._write_lock:
+            with open(self.checkpoint_path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    async def _evaluate_case(
+        self,
+        case: EvalCase,
+        previous: Optional[Dict[str, Any]],
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        evals = [e for e in self.scorers if not case.evals or e in case.evals]
+        async with semaphore:
+            if self.bucket:
+                await asyncio.sleep(self.bucket.reserve(1))
+            record = {
+                "case_id": case.id,
+                "query": case.query,
+                "scores": {},
+                "error": None,
+            }
+            if previous and not previous.get("error"):
+                record.update(previous)
+                run = AgentRun(
+                    previous["response"],
+                    previous["tools"],
+                    previous["latency_s"],
+                )
+            else:
+                try:
+                    run = await self._run_agent(case)
+                except Exception as e:
+                    logger.exception(f"[{case.id}] agent failed")
+                    record["error"] = repr(e)
+                    await self._write(record)
+                    return record
+                record.update(asdict(run))
+
+            missing = [
+                name
+                for name in evals
+                if name not in record["scores"]
+                or "error" in record["scores"][name]
+            ]
+            results = await asyncio.gather(
+                *(self._score(name, case, run) for name in missing)
+            )
+            record["scores"] = {
+                **record["scores"],
+                **dict(zip(missing, results)),
+            }
+            record["run_id"] = self.run_id
+            await self._write(record)
+            logger.info(
+                f"[{case.id}] {run.latency_s:.1f}s, scored by "
+                f"{', '.join(missing) or 'nothing new'}"
+            )
+            return record
+
+    def _is_done(self, case: EvalCase, record: Dict[str, Any]) -> bool:
+        if record.get("error"):
+            return False
+        return all(
+            name in record["scores"] and "error" not in record["scores"][name]
+            for name in self.scorers
+            if not case.evals or name in case.evals
+        )
+
+    async def run(self, cases: List[EvalCase]) -> Dict[str, Any]:
+        """
+        Evaluate the cases not already done, then report on all of them.
+        """
+        previous = load_checkpoint(self.checkpoint_path)
+        pending = [
+            case
+            for case in cases
+            if case.id not in previous
+            or not self._is_done(case, previous[case.id])
+        ]
+        logger.info(
+            f"{len(cases) - len(pending)} cases already done, "
+            f"{len(pending)} to run"
+        )
+        if pending:
+            if any(
+                not previous.get(case.id) or previous[case.id].get("error")
+                for case in pending
+            ):
+                await self._start_agent()
+            semaphore = asyncio.Semaphore(self.concurrency)
+            try:
+                await asyncio.gather(
+                    *(
+                        self._evaluate_case(
+                            case, previous.get(case.id), semaphore
+                        )
+                        for case in pending
+                    )
+                )
+            finally:
+                if self.agent is not None:
+                    await self.agent.cleanup()
+
+        records = load_checkpoint(self.checkpoint_path)
+        report = build_report(
+            [records[case.id] for case in cases if case.id in records]
+        )
+        report_path = (
+            f"{os.path.splitext(self.checkpoint_path)[0]}.report.json"
+        )
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {report_path}")
+        return report
+
+
+def build_report(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Mean of every numeric score field per evaluation, latency percentiles
+    and failures across the case records.
+    """
+    latencies = [r["latency_s"] for r in records if not r.get("error")]
+    evaluations: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        for name, scores in record.get("scores", {}).items():
+            summary = evaluations.setdefault(
+                name, {"cases": 0, "errors": 0, "means": {}}
+            )
+            summary["cases"] += 1
+            if "error" in scores:
+                summary["errors"] += 1
+                continue
+            for key, value in scores.items():
+                if isinstance(value, (int, float)):
+                    summary["means"].setdefault(key, []).append(float(value))
+    for summary in evaluations.values():
+        summary["means"] = {
+            key: sum(values) / len(values)
+            for key, values in summary["means"].items()
+        }
+    return {
+        "cases": len(records),
+        "agent_errors": [r["case_id"] for r in records if r.get("error")],
+        "latency_s": {f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+        "evaluations": evaluations,
+    }
+
+
+def run_dataset(
+    evals: List[str],
+    dataset: str = DEFAULT_DATASET,
+    output: Optional[str] = None,
+    concurrency: int = 4,
+    cases_per_minute: int = 0,
+) -> Dict[str, Any]:
+    cases = load_dataset(dataset)
+    if output is None:
+        name = os.path.splitext(os.path.basename(dataset))[0]
+        output = f"{name}.results.jsonl"
+    runner = EvaluationRunner(
+        evals,
+        output,
+        concurrency=concurrency,
+        cases_per_minute=cases_per_minute,
+    )
+    report = asyncio.run(runner.run(cases))
+    for name, summary in report["evaluations"].items():
+        logger.info(
+            f"{name}: {summary['cases']} cases, {summary['errors']} errors, "
+            + ", ".join(
+                f"{key} {value:.3f}" for key, value in summary["means"].items()
+            )
+        )
+    logger.info(f"latency: {report['latency_s']}")
+    return report